@@ -1,18 +1,50 @@
-from fastapi import APIRouter, Request
+import time
+from datetime import datetime
+from typing import Optional
 
-from .db import Lead, SessionLocal
-from .domain.orchestrator import handle_chat
-from .domain.tools import calculate_quote_range, check_tech_availability, validate_territory
-from .integrations.nlu_client import analyze_text, nlu_to_signals
-from .integrations.watsonx_client import generate_message
+from fastapi import APIRouter, HTTPException, Query, Request, Response
+from fastapi.responses import PlainTextResponse, StreamingResponse
+
+from .cache import cache_key
+from .coalesce import IdempotencyConflict
+from .db import SessionLocal, rebuild_rollups
+from .domain.orchestrator import DispatchContext
+from .domain.technicians import AVAILABLE
+from .leads import (
+    decode_cursor,
+    export_csv,
+    export_ndjson,
+    iter_export_rows,
+    lead_stats,
+    page_leads,
+)
+from .metrics import render as render_metrics
 from .models import (
+    ChatBatchRequest,
+    ChatBatchResponse,
     ChatRequest,
     ChatResponse,
     SkillAssignResponse,
+    SkillDispatchResponse,
     SkillQuoteResponse,
     SkillSignals,
     SkillTerritoryResponse,
+    SkillTriageBatchRequest,
+    SkillTriageBatchResponse,
     SkillTriageResponse,
+    TechUpdate,
+)
+from .pipeline import (
+    attach_signals,
+    complete_reply,
+    dispatch_batch,
+    lead_row,
+    persist_lead,
+    prepare_dispatch,
+    release_reservation,
+    request_deadline,
+    run_llm,
+    stream_chat,
 )
 
 router = APIRouter()
@@ -24,105 +56,250 @@ def health() -> dict:
 
 
 @router.post("/chat", response_model=ChatResponse)
-def chat(req: ChatRequest, request: Request):
-    signals = {"keywords": [], "entities": []}
-    nlu_error = None
-    nlu_client = request.app.state.nlu_client
-    if nlu_client:
+async def chat(req: ChatRequest, request: Request):
+    state = request.app.state
+    locale = _locale(request, req.channel, req.message)
+    deadline = request_deadline(state.settings, request.headers.get("X-Timeout-Ms"))
+
+    async def dispatch() -> dict:
+        response, signals, nlu_error = await prepare_dispatch(
+            state, locale, req.message, req.when_iso, deadline, req.session_id
+        )
         try:
-            nlu_json = analyze_text(nlu_client, req.message)
-            signals = nlu_to_signals(nlu_json)
-        except Exception as exc:
-            nlu_error = str(exc)
-
-    response = handle_chat(
-        message=req.message,
-        when_iso=req.when_iso,
-        locale=request.app.state.locale,
-        territory=request.app.state.territory,
-        techs=request.app.state.techs,
-        signals=signals,
-    )
+            await complete_reply(
+                state,
+                req.message,
+                response,
+                use_cache=req.use_cache is not False,
+                deadline=deadline,
+            )
+            attach_signals(response["metadata"], signals, nlu_error)
+            lead = lead_row(req.message, response["metadata"])
+            await persist_lead(state, lead)
+        except BaseException:
+            # No lead, no dispatch: give the technician back instead of waiting out the lease.
+            await release_reservation(state, response["metadata"])
+            raise
+        response["metadata"]["lead_id"] = lead["id"]
+        return response
 
+    coalescer = state.chat_coalescer
+    idempotency_key = request.headers.get("Idempotency-Key")
+    caller = req.session_id
+    if coalescer is None:
+        return await dispatch()
+    if not caller:
+        # Without a caller identity two people typing the same words are not duplicates.
+        if idempotency_key:
+            raise HTTPException(400, "Idempotency-Key requires a session_id")
+        return await dispatch()
+    # Double taps and client retries share the first request's NLU, LLM call and lead.
     try:
-        response["agent_message"] = generate_message(
-            api_key=request.app.state.settings.WATSONX_API_KEY,
-            base_url=request.app.state.settings.WATSONX_URL,
-            project_id=request.app.state.settings.WATSONX_PROJECT_ID,
-            model_id=request.app.state.settings.WATSONX_MODEL_ID,
-            user_message=req.message,
-            metadata=response["metadata"],
-            version=request.app.state.settings.WATSONX_VERSION,
-        )
-        if response["metadata"].get("safety_alert") and "switch off" not in response[
-            "agent_message"
-        ].lower():
-            response["agent_message"] = (
-                "If safe, switch off the unit and keep clear of smoke or sparks. "
-                + response["agent_message"]
+        if idempotency_key:
+            response, shared = await coalescer.run_idempotent(
+                coalescer.idempotency_key(caller, idempotency_key),
+                cache_key(locale, req.model_dump(mode="json")),
+                dispatch,
             )
-        response["metadata"]["watsonx_used"] = True
-    except Exception as exc:
-        response["metadata"]["watsonx_error"] = str(exc)
-        response["metadata"]["watsonx_used"] = False
-
-    if signals["keywords"] or signals["entities"]:
-        response["metadata"]["nlu_keywords"] = signals["keywords"]
-        response["metadata"]["nlu_entities"] = signals["entities"]
-    if nlu_error:
-        response["metadata"]["nlu_error"] = nlu_error
-
-    metadata = response["metadata"]
-    lead = Lead(
-        customer_message=req.message,
-        intent=metadata.get("intent"),
-        priority=metadata.get("priority"),
-        revenue_tier=metadata.get("revenue_tier"),
-        territory_code=metadata.get("territory_code"),
-        zone_id=metadata.get("zone_id"),
-        service_tier=metadata.get("service_tier"),
-        tech_assigned=metadata.get("tech_assigned"),
-        quote_min=metadata.get("quote_min"),
-        quote_max=metadata.get("quote_max"),
-        status="new",
+        else:
+            response, shared = await coalescer.run(
+                coalescer.key(req.message, locale, caller, req.when_iso), dispatch
+            )
+    except IdempotencyConflict as exc:
+        raise HTTPException(422, str(exc)) from exc
+    if shared:
+        response = {**response, "metadata": {**response["metadata"], "coalesced": True}}
+    return response
+
+
+@router.post("/chat/batch", response_model=ChatBatchResponse)
+async def chat_batch(req: ChatBatchRequest, request: Request):
+    state = request.app.state
+    _check_batch_size(len(req.messages), state.settings)
+    header = _locale(request) if request.headers.get("X-Locale") else None
+    results = await dispatch_batch(state, req.messages, state.settings.BATCH_CONCURRENCY, header)
+    return _batch_response(results)
+
+
+@router.post("/chat/stream")
+async def chat_stream(req: ChatRequest, request: Request) -> StreamingResponse:
+    state = request.app.state
+    events = stream_chat(
+        state,
+        _locale(request, req.channel, req.message),
+        req.message,
+        req.when_iso,
+        use_cache=req.use_cache is not False,
+        deadline=request_deadline(state.settings, request.headers.get("X-Timeout-Ms")),
+        session_id=req.session_id,
+    )
+    return StreamingResponse(
+        events,
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
     )
 
+
+@router.get("/leads")
+def get_leads(
+    response: Response,
+    limit: int = Query(50, ge=1, le=500),
+    cursor: Optional[str] = None,
+    priority: Optional[str] = None,
+    status: Optional[str] = None,
+    zone_id: Optional[str] = None,
+    intent: Optional[str] = None,
+    tech_assigned: Optional[str] = None,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+) -> list[dict]:
     db = SessionLocal()
     try:
-        db.add(lead)
-        db.commit()
+        leads, next_cursor = page_leads(
+            db,
+            limit=limit,
+            cursor=cursor,
+            since=since,
+            until=until,
+            priority=priority,
+            status=status,
+            zone_id=zone_id,
+            intent=intent,
+            tech_assigned=tech_assigned,
+        )
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
     finally:
         db.close()
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    return [lead.to_dict() for lead in leads]
 
-    return response
 
+@router.get("/leads/export")
+def export_leads(
+    format: str = Query("ndjson", pattern="^(ndjson|csv)$"),
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    cursor: Optional[str] = None,
+) -> StreamingResponse:
+    if cursor:
+        try:
+            decode_cursor(cursor)
+        except ValueError as exc:
+            raise HTTPException(status_code=400, detail=str(exc))
 
-@router.get("/leads")
-def get_leads() -> list[dict]:
+    def body():
+        # The session lives as long as the stream and is closed even if the client
+        # disconnects halfway.
+        db = SessionLocal()
+        try:
+            rows = iter_export_rows(db, since=since, until=until, cursor=cursor)
+            yield from (export_csv(rows) if format == "csv" else export_ndjson(rows))
+        finally:
+            db.close()
+
+    media_type = "text/csv" if format == "csv" else "application/x-ndjson"
+    filename = f"leads.{format}"
+    return StreamingResponse(
+        body(),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
+
+
+@router.get("/leads/stats")
+def get_lead_stats(hours: int = Query(24, ge=1, le=24 * 90)) -> dict:
     db = SessionLocal()
     try:
-        leads = (
-            db.query(Lead)
-            .order_by(Lead.created_at.desc())
-            .limit(50)
-            .all()
-        )
-        return [lead.to_dict() for lead in leads]
+        return lead_stats(db, hours)
     finally:
         db.close()
 
 
+@router.post("/leads/stats/rebuild")
+def rebuild_lead_stats() -> dict:
+    start = time.perf_counter()
+    leads = rebuild_rollups()
+    return {"leads": leads, "rebuild_ms": round((time.perf_counter() - start) * 1000, 3)}
+
+
+@router.patch("/techs/{tech_id}")
+def update_tech(tech_id: str, payload: TechUpdate, request: Request) -> dict:
+    locale = _locale(request)
+    data = request.app.state.locales.snapshot(locale)
+    tech = data.tech_registry.update(
+        tech_id,
+        current_status=payload.current_status,
+        base_location=payload.base_location,
+    )
+    if tech is None:
+        raise HTTPException(status_code=404, detail=f"Unknown technician {tech_id}")
+    reservations = request.app.state.reservations
+    if reservations is not None and payload.current_status == AVAILABLE:
+        # Marking a technician available again means the job is done.
+        reservations.release(locale, tech_id)
+    return tech
+
+
+@router.delete("/techs/{tech_id}/reservation")
+def release_tech(tech_id: str, request: Request, reservation_id: Optional[str] = None) -> dict:
+    reservations = request.app.state.reservations
+    if reservations is None:
+        raise HTTPException(status_code=404, detail="Technician reservations are disabled")
+    if not reservations.release(_locale(request), tech_id, reservation_id):
+        raise HTTPException(status_code=404, detail=f"No matching reservation for {tech_id}")
+    return {"tech_id": tech_id, "released": True}
+
+
+@router.get("/metrics", response_class=PlainTextResponse)
+def metrics() -> PlainTextResponse:
+    return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4")
+
+
+@router.get("/stats")
+def stats(request: Request) -> dict:
+    locales = request.app.state.locales
+    data = locales.snapshot(locales.default)
+    return {
+        "data": locales.stats(),
+        "iam_token": request.app.state.token_manager.stats(),
+        "stages": request.app.state.stage_limiter.stats(),
+        "technicians": data.tech_registry.stats(),
+        "reservations": (
+            request.app.state.reservations.stats() if request.app.state.reservations else None
+        ),
+        "scheduler": data.scheduler.stats(),
+        "lead_writer": request.app.state.lead_writer.stats(),
+        "nlu": request.app.state.nlu.stats() if request.app.state.nlu else None,
+        "chat_coalesce": (
+            request.app.state.chat_coalescer.stats()
+            if request.app.state.chat_coalescer
+            else None
+        ),
+        "message_cache": (
+            request.app.state.message_cache.stats() if request.app.state.message_cache else None
+        ),
+        "rag": request.app.state.rag_store.stats() if request.app.state.rag_store else None,
+        "breakers": {
+            name: breaker.stats() for name, breaker in request.app.state.breakers.items()
+        },
+    }
+
+
+@router.get("/rag/query")
+def rag_query(request: Request, q: str, k: int = Query(4, ge=1, le=50)) -> list[dict]:
+    store = request.app.state.rag_store
+    if store is None:
+        raise HTTPException(status_code=404, detail="RAG is disabled")
+    return store.query(q, k)
+
+
 @router.get("/watsonx/test")
-def watsonx_test(request: Request) -> dict:
+async def watsonx_test(request: Request) -> dict:
     try:
-        msg = generate_message(
-            api_key=request.app.state.settings.WATSONX_API_KEY,
-            base_url=request.app.state.settings.WATSONX_URL,
-            project_id=request.app.state.settings.WATSONX_PROJECT_ID,
-            model_id=request.app.state.settings.WATSONX_MODEL_ID,
-            user_message="Test message for watsonx.",
-            metadata={"priority": "NORMAL"},
-            version=request.app.state.settings.WATSONX_VERSION,
+        msg = await run_llm(
+            request.app.state, "Test message for watsonx.", {"priority": "NORMAL"}
         )
         return {"status": "ok", "message": msg}
     except Exception as exc:
@@ -136,73 +313,112 @@ def _signals_from_skill(payload: SkillSignals) -> dict:
     }
 
 
-@router.post("/skill/triage", response_model=SkillTriageResponse)
-def skill_triage(payload: SkillSignals, request: Request):
-    signals = _signals_from_skill(payload)
-    response = handle_chat(
-        message=payload.message,
-        when_iso=None,
-        locale=request.app.state.locale,
-        territory=request.app.state.territory,
-        techs=request.app.state.techs,
-        signals=signals,
+def _locale(request: Request, channel: str | None = None, message: str | None = None) -> str:
+    try:
+        return request.app.state.locales.resolve(
+            request.headers.get("X-Locale"), channel, message
+        )
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
+
+
+def _skill_context(payload: SkillSignals, state, locale: str) -> DispatchContext:
+    data = state.locales.snapshot(locale)
+    return DispatchContext(
+        payload.message,
+        data.locale,
+        data.territory,
+        data.techs,
+        signals=_signals_from_skill(payload),
+        triage_matcher=data.triage_matcher,
+        territory_index=data.territory_index,
+        tech_registry=data.tech_registry,
+        reservations=state.reservations,
+        locale_name=locale,
+        conversation=payload.session_id,
+        scheduler=data.scheduler,
     )
-    meta = response["metadata"]
+
+
+def _dispatch_context(payload: SkillSignals, request: Request) -> DispatchContext:
+    locale = _locale(request, payload.channel, payload.message)
+    return _skill_context(payload, request.app.state, locale)
+
+
+def _assignment(context: DispatchContext) -> dict:
+    return {
+        "tech_id": context.tech.get("tech_id"),
+        "eta_minutes": context.eta_minutes if context.tech else None,
+        "service_tier": context.territory_result["service_tier"],
+        **(context.reservation or {}),
+    }
+
+
+def _quote(context: DispatchContext) -> dict:
     return {
-        "intent": meta["intent"],
-        "priority": meta["priority"],
-        "revenue_tier": meta["revenue_tier"],
+        "quote_min": context.quote["min"],
+        "quote_max": context.quote["max"],
+        "currency": context.quote["currency"],
     }
 
 
+def _check_batch_size(size: int, settings) -> None:
+    if not size:
+        raise HTTPException(status_code=400, detail="Batch is empty")
+    if size > settings.BATCH_MAX_ITEMS:
+        raise HTTPException(
+            status_code=413,
+            detail=f"Batch of {size} exceeds BATCH_MAX_ITEMS ({settings.BATCH_MAX_ITEMS})",
+        )
+
+
+def _batch_response(results: list[dict]) -> dict:
+    succeeded = sum(1 for result in results if result["ok"])
+    return {"results": results, "succeeded": succeeded, "failed": len(results) - succeeded}
+
+
+@router.post("/skill/triage", response_model=SkillTriageResponse)
+def skill_triage(payload: SkillSignals, request: Request):
+    return _dispatch_context(payload, request).triage
+
+
+@router.post("/skill/triage/batch", response_model=SkillTriageBatchResponse)
+def skill_triage_batch(req: SkillTriageBatchRequest, request: Request):
+    state = request.app.state
+    _check_batch_size(len(req.items), state.settings)
+    header = _locale(request) if request.headers.get("X-Locale") else None
+    results = []
+    for index, payload in enumerate(req.items):
+        try:
+            locale = state.locales.resolve(header, payload.channel, payload.message)
+            triage = _skill_context(payload, state, locale).triage
+            results.append({"index": index, "ok": True, "result": triage})
+        except Exception as exc:
+            results.append({"index": index, "ok": False, "error": str(exc)})
+    return _batch_response(results)
+
+
 @router.post("/skill/resolve_territory", response_model=SkillTerritoryResponse)
 def skill_resolve_territory(payload: SkillSignals, request: Request):
-    signals = _signals_from_skill(payload)
-    combined = f"{payload.message} {' '.join(signals['keywords'] + signals['entities'])}".strip()
-    result = validate_territory(combined, request.app.state.territory)
-    return result
+    return _dispatch_context(payload, request).territory_result
 
 
 @router.post("/skill/assign_technician", response_model=SkillAssignResponse)
 def skill_assign_technician(payload: SkillSignals, request: Request):
-    signals = _signals_from_skill(payload)
-    combined = f"{payload.message} {' '.join(signals['keywords'] + signals['entities'])}".strip()
-    territory = validate_territory(combined, request.app.state.territory)
-    base_text = " ".join(signals["keywords"] + signals["entities"]).lower() or payload.message.lower()
-    required_skill = "cold_room" if any(t in base_text for t in ["cold room", "chiller", "freezer"]) else "hvac_ac"
-    tech = check_tech_availability(required_skill, territory["service_tier"], request.app.state.techs)
-    traffic_padding = request.app.state.locale.get("traffic", {}).get("default_padding_minutes", 20)
-    base_travel = 35 if territory["zone_id"] == "A" else 25
-    eta_minutes = int(base_travel + traffic_padding)
-    return {
-        "tech_id": tech.get("tech_id"),
-        "eta_minutes": eta_minutes,
-        "service_tier": territory["service_tier"],
-    }
+    return _assignment(_dispatch_context(payload, request))
 
 
 @router.post("/skill/calculate_quote", response_model=SkillQuoteResponse)
 def skill_calculate_quote(payload: SkillSignals, request: Request):
-    signals = _signals_from_skill(payload)
-    response = handle_chat(
-        message=payload.message,
-        when_iso=None,
-        locale=request.app.state.locale,
-        territory=request.app.state.territory,
-        techs=request.app.state.techs,
-        signals=signals,
-    )
-    meta = response["metadata"]
-    combined = f"{payload.message} {' '.join(signals['keywords'] + signals['entities'])}".strip()
-    territory = validate_territory(combined, request.app.state.territory)
-    quote = calculate_quote_range(
-        problem_type=meta["intent"],
-        priority=meta["priority"],
-        tier_multiplier=territory["multiplier"],
-        locale=request.app.state.locale,
-    )
+    return _quote(_dispatch_context(payload, request))
+
+
+@router.post("/skill/dispatch", response_model=SkillDispatchResponse)
+def skill_dispatch(payload: SkillSignals, request: Request):
+    context = _dispatch_context(payload, request)
     return {
-        "quote_min": quote["min"],
-        "quote_max": quote["max"],
-        "currency": quote["currency"],
+        "triage": context.triage,
+        "territory": context.territory_result,
+        "assignment": _assignment(context),
+        "quote": _quote(context),
     }
@@ -0,0 +1,125 @@
+from __future__ import annotations
+
+import asyncio
+import time
+from typing import Awaitable, Callable
+
+from .cache import SQLiteCacheBackend, TTLCache, cache_key, normalize_text
+from .singleflight import SingleFlight
+
+
+class IdempotencyConflict(Exception):
+    pass
+
+
+class ChatCoalescer:
+    def __init__(
+        self,
+        records: SQLiteCacheBackend,
+        window_seconds: float = 5.0,
+        idempotency_ttl_seconds: float = 86400.0,
+        pending_seconds: float = 20.0,
+        max_entries: int = 10000,
+        poll_seconds: float = 0.05,
+    ) -> None:
+        self.records = records
+        self.window_seconds = window_seconds
+        self.idempotency_ttl_seconds = idempotency_ttl_seconds
+        self.pending_seconds = pending_seconds
+        self.poll_seconds = poll_seconds
+        self.flight = SingleFlight()
+        # Finished responses, so a duplicate that lands just after the first request
+        # completes is answered the same way.
+        self.recent = TTLCache(max_entries, window_seconds)
+        self.replayed = 0
+        self.conflicts = 0
+
+    def key(self, message: str, locale: str, caller: str, when_iso: str | None = None) -> str:
+        return cache_key("chat", locale, caller, when_iso or "", normalize_text(message))
+
+    def idempotency_key(self, caller: str, key: str) -> str:
+        # Keys are only unique per caller; two callers picking the same key must not
+        # see each other's replies.
+        return cache_key("idempotency", caller, key)
+
+    async def run(self, key: str, fn: Callable[[], Awaitable[dict]]) -> tuple[dict, bool]:
+        response = self.recent.get(key)
+        if response is not None:
+            self.replayed += 1
+            return response, True
+
+        async def lead() -> dict:
+            response = await fn()
+            # Stored before the flight ends, so there is no gap for a duplicate to
+            # slip through between the two.
+            self.recent.set(key, response, self.window_seconds)
+            return response
+
+        return await self.flight.do(key, lead)
+
+    async def run_idempotent(
+        self, key: str, body: str, fn: Callable[[], Awaitable[dict]]
+    ) -> tuple[dict, bool]:
+        # Retries in this process share one flight; the record in the shared store
+        # covers retries that land on another worker or after the first one finished.
+        (response, replayed), shared = await self.flight.do(
+            (key, body), lambda: self._claim(key, body, fn)
+        )
+        return response, shared or replayed
+
+    async def _claim(
+        self, key: str, body: str, fn: Callable[[], Awaitable[dict]]
+    ) -> tuple[dict, bool]:
+        while True:
+            record = await asyncio.to_thread(self.records.get, key)
+            if record is None:
+                # The pending marker expires on its own if its worker dies mid-request.
+                pending = {"body": body, "claimed_at": time.time()}
+                if await asyncio.to_thread(self.records.add, key, pending, self.pending_seconds):
+                    break
+                continue
+            if record["body"] != body:
+                self.conflicts += 1
+                raise IdempotencyConflict("Idempotency-Key was already used with a different body")
+            if "response" in record:
+                self.replayed += 1
+                return record["response"], True
+            await asyncio.sleep(self.poll_seconds)
+        try:
+            response = await fn()
+        except BaseException:
+            # Nothing was committed under the key, so a retry should run for real.
+            await asyncio.shield(asyncio.to_thread(self.records.delete, key))
+            raise
+        record = {"body": body, "response": response}
+        await asyncio.to_thread(self.records.set, key, record, self.idempotency_ttl_seconds)
+        return response, False
+
+    def stats(self) -> dict:
+        flight = self.flight.stats()
+        return {
+            "leaders": flight["leaders"],
+            "coalesced": flight["shared"],
+            "replayed": self.replayed,
+            "idempotency_conflicts": self.conflicts,
+            "in_flight": flight["in_flight"],
+            "recent": len(self.recent),
+        }
+
+
+def build_chat_coalescer(settings) -> ChatCoalescer | None:
+    if not settings.CHAT_COALESCE_ENABLED:
+        return None
+    records = SQLiteCacheBackend(
+        settings.CHAT_IDEMPOTENCY_PATH,
+        settings.CHAT_IDEMPOTENCY_MAX_ENTRIES,
+        table="idempotency_keys",
+    )
+    return ChatCoalescer(
+        records,
+        settings.CHAT_COALESCE_WINDOW_SECONDS,
+        settings.CHAT_IDEMPOTENCY_TTL_SECONDS,
+        # A claim outlives any request that could still be holding it.
+        settings.CHAT_BUDGET_MS / 1000 * 2,
+        settings.CHAT_COALESCE_MAX_ENTRIES,
+    )
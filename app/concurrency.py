@@ -0,0 +1,67 @@
+from __future__ import annotations
+
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+
+
+class StageLimiter:
+    def __init__(self, limits: dict[str, int], blocking: tuple[str, ...] = ()) -> None:
+        self._limits = dict(limits)
+        self._semaphores = {name: asyncio.Semaphore(n) for name, n in limits.items()}
+        # Blocking stages get their own threads so a stalled SDK cannot
+        # exhaust the shared default executor used by the other stages.
+        self._executors = {
+            name: ThreadPoolExecutor(max_workers=limits[name], thread_name_prefix=f"stage-{name}")
+            for name in blocking
+        }
+        self._in_flight = {name: 0 for name in limits}
+        self._waiting = {name: 0 for name in limits}
+
+    @asynccontextmanager
+    async def slot(self, stage: str):
+        semaphore = self._semaphores[stage]
+        self._waiting[stage] += 1
+        try:
+            await semaphore.acquire()
+        finally:
+            self._waiting[stage] -= 1
+        self._in_flight[stage] += 1
+        try:
+            yield
+        finally:
+            self._in_flight[stage] -= 1
+            semaphore.release()
+
+    async def run_blocking(self, stage: str, fn, *args):
+        async with self.slot(stage):
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._executors.get(stage), fn, *args)
+
+    def executor(self, stage: str) -> ThreadPoolExecutor | None:
+        return self._executors.get(stage)
+
+    def shutdown(self) -> None:
+        for executor in self._executors.values():
+            executor.shutdown(wait=True)
+
+    def stats(self) -> dict:
+        return {
+            name: {
+                "limit": self._limits[name],
+                "in_flight": self._in_flight[name],
+                "waiting": self._waiting[name],
+            }
+            for name in self._limits
+        }
+
+
+def build_stage_limiter(settings) -> StageLimiter:
+    return StageLimiter(
+        {
+            "nlu": settings.NLU_CONCURRENCY,
+            "llm": settings.LLM_CONCURRENCY,
+            "db": settings.DB_CONCURRENCY,
+        },
+        blocking=("nlu", "db"),
+    )
@@ -11,16 +11,37 @@ def _load_json(path: Path) -> dict:
         return json.load(f)
 
 
-def load_locale() -> dict:
+def default_paths() -> dict[str, Path]:
     base = _base_dir()
-    return _load_json(base / "config" / "locale_entebbe.json")
+    return {
+        "locale": base / "config" / "locale_entebbe.json",
+        "territory": base / "data" / "territory_entebbe.json",
+        "roster": base / "data" / "technician_roster.json",
+    }
 
 
-def load_territory() -> dict:
-    base = _base_dir()
-    return _load_json(base / "data" / "territory_entebbe.json")
+def default_catalog_path() -> Path:
+    return _base_dir() / "config" / "locales.json"
 
 
-def load_techs() -> dict:
+def load_catalog(path: Path | None = None) -> dict:
+    path = path or default_catalog_path()
+    catalog = _load_json(path)
+    # Catalog paths are relative to the repository root, like the defaults above.
     base = _base_dir()
-    return _load_json(base / "data" / "technician_roster.json")
+    for spec in catalog["locales"].values():
+        for name in ("locale", "territory", "roster"):
+            spec[name] = base / spec[name]
+    return catalog
+
+
+def load_locale(path: Path | None = None) -> dict:
+    return _load_json(path or default_paths()["locale"])
+
+
+def load_territory(path: Path | None = None) -> dict:
+    return _load_json(path or default_paths()["territory"])
+
+
+def load_techs(path: Path | None = None) -> dict:
+    return _load_json(path or default_paths()["roster"])
@@ -0,0 +1,326 @@
+from __future__ import annotations
+
+import logging
+import sys
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from pathlib import Path
+
+from ..domain.keywords import KeywordMatcher
+from .load import default_catalog_path, default_paths, load_catalog
+from .snapshot import DataSnapshot, SnapshotStore
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class LocaleSpec:
+    name: str
+    paths: dict[str, Path]
+    channels: tuple[str, ...] = ()
+    aliases: tuple[str, ...] = ()
+
+
+@dataclass
+class _LocaleStats:
+    hits: int = 0
+    loads: int = 0
+    evictions: int = 0
+    load_ms: float = 0.0
+    memory_bytes: int = 0
+    last_used: float = 0.0
+    last_error: str | None = None
+
+
+@dataclass
+class _LiveState:
+    stamps: dict[str, tuple[int, int]]
+    tech_updates: dict[str, dict]
+    bookings: list[tuple[str, float, int]]
+
+
+@dataclass
+class _Resident:
+    store: SnapshotStore
+    # None until measured; see _load.
+    memory_bytes: int | None
+
+
+class LocaleRegistry:
+    def __init__(
+        self,
+        specs: list[LocaleSpec],
+        default: str,
+        max_resident: int = 8,
+        memory_budget_bytes: int = 256 * 1024 * 1024,
+        poll_interval: float = 2.0,
+    ) -> None:
+        self.specs = {spec.name: spec for spec in specs}
+        if default not in self.specs:
+            raise ValueError(f"Default locale {default} is not in the catalog")
+        self.default = default
+        self.max_resident = max(1, max_resident)
+        self.memory_budget_bytes = memory_budget_bytes
+        self.poll_interval = poll_interval
+        self._channels = {
+            channel.lower(): spec.name for spec in specs for channel in spec.channels
+        }
+        self._aliases = KeywordMatcher({spec.name: spec.aliases for spec in specs})
+        self._resident: OrderedDict[str, _Resident] = OrderedDict()
+        self._stats = {name: _LocaleStats() for name in self.specs}
+        # PATCH /techs updates and bookings of evicted locales, replayed when they reload.
+        self._live: dict[str, _LiveState] = {}
+        self._lock = threading.Lock()
+        self._load_locks = {name: threading.Lock() for name in self.specs}
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+        self.evictions = 0
+        # The default locale serves every request that names no other, so it is
+        # loaded up front and never evicted.
+        self.snapshot(default)
+
+    def resolve(
+        self, header: str | None = None, channel: str | None = None, message: str | None = None
+    ) -> str:
+        if header:
+            name = header.strip().upper()
+            if name not in self.specs:
+                raise ValueError(f"Unknown locale {header}")
+            return name
+        if channel:
+            key = channel.strip().lower()
+            name = self._channels.get(key) or key.upper()
+            if name in self.specs:
+                return name
+        if message:
+            matched = self._aliases.match(message)
+            if matched:
+                # Catalog order breaks ties when a message names several cities.
+                return next(name for name in self.specs if name in matched)
+        return self.default
+
+    def peek(self, name: str) -> DataSnapshot | None:
+        with self._lock:
+            resident = self._resident.get(name)
+            if resident is None:
+                return None
+            self._resident.move_to_end(name)
+            stats = self._stats[name]
+            stats.hits += 1
+            stats.last_used = time.time()
+        return resident.store.current
+
+    def snapshot(self, name: str) -> DataSnapshot:
+        data = self.peek(name)
+        if data is not None:
+            return data
+        if name not in self.specs:
+            raise ValueError(f"Unknown locale {name}")
+        # One build per locale even when many requests miss at once.
+        with self._load_locks[name]:
+            data = self.peek(name)
+            if data is not None:
+                return data
+            return self._load(name)
+
+    def _load(self, name: str) -> DataSnapshot:
+        stats = self._stats[name]
+        start = time.perf_counter()
+        try:
+            store = SnapshotStore(self.specs[name].paths)
+        except Exception as exc:
+            stats.last_error = f"{type(exc).__name__}: {exc}"
+            raise
+        with self._lock:
+            live = self._live.pop(name, None)
+        data = store.current
+        if live is not None:
+            _restore(data, live)
+        # Walking a large roster costs more than loading it, so when the watcher runs it
+        # measures new locales off the request path and enforces the budget then.
+        memory_bytes = None if self._thread is not None else estimate_bytes(data)
+        with self._lock:
+            self._resident[name] = _Resident(store, memory_bytes)
+            stats.loads += 1
+            stats.hits += 1
+            stats.last_used = time.time()
+            stats.load_ms = round((time.perf_counter() - start) * 1000, 3)
+            stats.memory_bytes = memory_bytes or 0
+            stats.last_error = None
+            evicted = self._evict(keep=name)
+        logger.info("Loaded locale %s in %.1f ms", name, stats.load_ms)
+        for victim in evicted:
+            logger.info("Evicted locale %s", victim)
+        return data
+
+    def _evict(self, keep: str) -> list[str]:
+        evicted = []
+        while (
+            len(self._resident) > self.max_resident
+            or self.memory_bytes > self.memory_budget_bytes
+        ):
+            victim = next(
+                (name for name in self._resident if name not in (self.default, keep)), None
+            )
+            if victim is None:
+                break
+            live = _live_state(self._resident.pop(victim).store.current)
+            if live is not None:
+                self._live[victim] = live
+            self._stats[victim].evictions += 1
+            self.evictions += 1
+            evicted.append(victim)
+        return evicted
+
+    @property
+    def memory_bytes(self) -> int:
+        return sum(resident.memory_bytes or 0 for resident in self._resident.values())
+
+    def poll(self) -> None:
+        with self._lock:
+            residents = list(self._resident.items())
+        for name, resident in residents:
+            if not resident.store.poll() and resident.memory_bytes is not None:
+                continue
+            memory_bytes = estimate_bytes(resident.store.current)
+            with self._lock:
+                resident.memory_bytes = memory_bytes
+                self._stats[name].memory_bytes = memory_bytes
+                evicted = self._evict(keep=name)
+            for victim in evicted:
+                logger.info("Evicted locale %s", victim)
+
+    def start(self) -> None:
+        if self._thread is not None or self.poll_interval <= 0:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="data-watcher", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        if self._thread is None:
+            return
+        self._stop.set()
+        self._thread.join()
+        self._thread = None
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.poll_interval):
+            self.poll()
+
+    def stats(self) -> dict:
+        now = time.time()
+        with self._lock:
+            residents = dict(self._resident)
+            locales = {}
+            for name in self.specs:
+                stats = self._stats[name]
+                locales[name] = {
+                    "resident": name in residents,
+                    "hits": stats.hits,
+                    "loads": stats.loads,
+                    "evictions": stats.evictions,
+                    "load_ms": stats.load_ms,
+                    "memory_bytes": stats.memory_bytes if name in residents else 0,
+                    "idle_seconds": round(now - stats.last_used, 1) if stats.last_used else None,
+                    "last_error": stats.last_error,
+                }
+        for name, resident in residents.items():
+            locales[name]["snapshot"] = resident.store.stats()
+        return {
+            "default": self.default,
+            "resident": list(residents),
+            "max_resident": self.max_resident,
+            "memory_bytes": sum(r.memory_bytes or 0 for r in residents.values()),
+            "memory_budget_bytes": self.memory_budget_bytes,
+            "evictions": self.evictions,
+            "watching": self._thread is not None,
+            "locales": locales,
+        }
+
+
+def _live_state(data: DataSnapshot) -> _LiveState | None:
+    tech_updates = data.tech_registry.updates()
+    bookings = data.scheduler.bookings()
+    if not tech_updates and not bookings:
+        return None
+    return _LiveState(dict(data.stamps), tech_updates, bookings)
+
+
+def _restore(data: DataSnapshot, live: _LiveState) -> None:
+    # Same rule as a reload in place: status updates survive unless the roster has
+    # changed since, and bookings always do, re-checked against the new calendars.
+    if data.stamps.get("roster") == live.stamps.get("roster"):
+        data.tech_registry.apply(live.tech_updates)
+    data.scheduler.restore(live.bookings)
+
+
+_ATOMIC = (str, int, float, bool, bytes, type(None))
+
+
+def estimate_bytes(root) -> int:
+    # Deep size of the loaded data and compiled indexes; shared objects count once.
+    getsizeof = sys.getsizeof
+    seen: set[int] = set()
+    stack = [root]
+    total = 0
+    while stack:
+        obj = stack.pop()
+        key = id(obj)
+        if key in seen:
+            continue
+        seen.add(key)
+        total += getsizeof(obj)
+        if isinstance(obj, _ATOMIC):
+            continue
+        if isinstance(obj, dict):
+            stack.extend(obj.keys())
+            stack.extend(obj.values())
+        elif isinstance(obj, (list, tuple, set, frozenset)):
+            stack.extend(obj)
+        elif not isinstance(obj, type) and not callable(obj):
+            if hasattr(obj, "__dict__"):
+                stack.append(obj.__dict__)
+            for slot in getattr(type(obj), "__slots__", ()):
+                if hasattr(obj, slot):
+                    stack.append(getattr(obj, slot))
+    return total
+
+
+def build_locale_registry(settings) -> LocaleRegistry:
+    catalog_path = Path(settings.LOCALE_CATALOG_PATH or default_catalog_path())
+    if catalog_path.exists():
+        catalog = load_catalog(catalog_path)
+    else:
+        catalog = {"default": "DEFAULT", "locales": {"DEFAULT": default_paths()}}
+    default = (settings.DEFAULT_LOCALE or catalog["default"]).upper()
+    specs = []
+    for name, spec in catalog["locales"].items():
+        paths = {key: Path(spec[key]) for key in ("locale", "territory", "roster")}
+        if name.upper() == default:
+            # The single-file settings still override the default locale's data.
+            overrides = {
+                "locale": settings.LOCALE_PATH,
+                "territory": settings.TERRITORY_PATH,
+                "roster": settings.ROSTER_PATH,
+            }
+            for key, value in overrides.items():
+                if value:
+                    paths[key] = Path(value)
+        specs.append(
+            LocaleSpec(
+                name=name.upper(),
+                paths=paths,
+                channels=tuple(spec.get("channels", ())),
+                aliases=tuple(spec.get("aliases", ())),
+            )
+        )
+    return LocaleRegistry(
+        specs,
+        default,
+        max_resident=settings.LOCALE_CACHE_SIZE,
+        memory_budget_bytes=int(settings.LOCALE_MEMORY_BUDGET_MB * 1024 * 1024),
+        poll_interval=settings.DATA_RELOAD_INTERVAL_SECONDS,
+    )
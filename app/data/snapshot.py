@@ -0,0 +1,165 @@
+from __future__ import annotations
+
+import logging
+import threading
+import time
+from dataclasses import dataclass
+from datetime import datetime
+from pathlib import Path
+
+from ..domain.keywords import KeywordMatcher
+from ..domain.orchestrator import build_triage_matcher
+from ..domain.scheduling import Scheduler
+from ..domain.technicians import TechRegistry
+from ..domain.territory import TerritoryIndex
+from ..domain.tools import build_territory_index
+from .load import load_locale, load_techs, load_territory
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class DataSnapshot:
+    version: int
+    loaded_at: datetime
+    load_ms: float
+    changed: tuple[str, ...]
+    stamps: dict[str, tuple[int, int]]
+    locale: dict
+    territory: dict
+    techs: dict
+    triage_matcher: KeywordMatcher
+    territory_index: TerritoryIndex
+    tech_registry: TechRegistry
+    scheduler: Scheduler
+
+
+def file_stamp(path: Path) -> tuple[int, int]:
+    stat = path.stat()
+    return stat.st_mtime_ns, stat.st_size
+
+
+def build_snapshot(
+    paths: dict[str, Path], previous: DataSnapshot | None = None
+) -> DataSnapshot:
+    start = time.perf_counter()
+    # Stamps are taken before reading, so a write that lands mid-load is seen again
+    # on the next poll instead of being marked as already loaded.
+    stamps = {name: file_stamp(path) for name, path in paths.items()}
+    changed = tuple(
+        name for name in paths if previous is None or previous.stamps.get(name) != stamps[name]
+    )
+    locale = load_locale(paths["locale"]) if "locale" in changed else previous.locale
+    territory = (
+        load_territory(paths["territory"]) if "territory" in changed else previous.territory
+    )
+    techs = load_techs(paths["roster"]) if "roster" in changed else previous.techs
+
+    # Only the structures derived from a changed file are rebuilt; the rest, including
+    # live technician status updates, carry over from the previous snapshot.
+    if "locale" in changed:
+        triage_matcher = build_triage_matcher(locale)
+    else:
+        triage_matcher = previous.triage_matcher
+    if "territory" in changed:
+        territory_index = build_territory_index(territory)
+    else:
+        territory_index = previous.territory_index
+    if "roster" in changed:
+        tech_registry = TechRegistry(techs)
+    else:
+        tech_registry = previous.tech_registry
+    if "roster" in changed or "locale" in changed:
+        scheduler = Scheduler(techs, locale)
+        if previous is not None:
+            # Confirmed bookings outlive any edit; book() re-checks each against the new
+            # calendars and hours, so only those the edit made impossible are dropped.
+            # Requests still on the previous snapshot book through to the new scheduler.
+            previous.scheduler.hand_over(scheduler)
+    else:
+        scheduler = previous.scheduler
+
+    return DataSnapshot(
+        version=previous.version + 1 if previous else 1,
+        loaded_at=datetime.utcnow(),
+        load_ms=round((time.perf_counter() - start) * 1000, 3),
+        changed=changed,
+        stamps=stamps,
+        locale=locale,
+        territory=territory,
+        techs=techs,
+        triage_matcher=triage_matcher,
+        territory_index=territory_index,
+        tech_registry=tech_registry,
+        scheduler=scheduler,
+    )
+
+
+class SnapshotStore:
+    def __init__(self, paths: dict[str, Path]) -> None:
+        self.paths = paths
+        self._current = build_snapshot(paths)
+        self._reload_lock = threading.Lock()
+        self._failed_stamps: dict[str, tuple[int, int]] | None = None
+        self.reloads = 0
+        self.errors = 0
+        self.last_error: str | None = None
+
+    @property
+    def current(self) -> DataSnapshot:
+        return self._current
+
+    def reload(self) -> bool:
+        with self._reload_lock:
+            previous = self._current
+            stamps = {name: file_stamp(path) for name, path in self.paths.items()}
+            if stamps == previous.stamps or stamps == self._failed_stamps:
+                return False
+            try:
+                snapshot = build_snapshot(self.paths, previous)
+            except Exception:
+                # Do not retry the same broken files on every poll; wait for another edit.
+                self._failed_stamps = stamps
+                raise
+            # A single reference assignment: requests that already hold the previous
+            # snapshot keep using it, new requests see the new one.
+            self._current = snapshot
+            self._failed_stamps = None
+            self.reloads += 1
+            self.last_error = None
+        logger.info(
+            "Reloaded data snapshot v%s (%s) in %.1f ms",
+            snapshot.version,
+            ", ".join(snapshot.changed),
+            snapshot.load_ms,
+        )
+        return True
+
+    def stats(self) -> dict:
+        snapshot = self._current
+        return {
+            "version": snapshot.version,
+            "loaded_at": snapshot.loaded_at.isoformat(),
+            "load_ms": snapshot.load_ms,
+            "changed": list(snapshot.changed),
+            "reloads": self.reloads,
+            "errors": self.errors,
+            "last_error": self.last_error,
+        }
+
+    def poll(self) -> bool:
+        try:
+            return self.reload()
+        except Exception as exc:
+            # A half-written or invalid file keeps the last good snapshot in service.
+            error = f"{type(exc).__name__}: {exc}"
+            self.errors += 1
+            if error != self.last_error:
+                logger.warning(
+                    "Data reload failed; keeping snapshot v%s: %s",
+                    self._current.version,
+                    error,
+                )
+            self.last_error = error
+            return False
+
@@ -1,21 +1,73 @@
+import logging
 import uuid
+from collections.abc import Iterable, Mapping
 from datetime import datetime
 
-from sqlalchemy import Column, DateTime, Integer, String, Text, create_engine
-from sqlalchemy.orm import declarative_base, sessionmaker
+from sqlalchemy import (
+    Column,
+    DateTime,
+    Index,
+    Integer,
+    String,
+    Text,
+    create_engine,
+    delete,
+    event,
+    insert,
+    select,
+)
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session, declarative_base, sessionmaker
+
+from .settings import settings
+
+logger = logging.getLogger(__name__)
+
+DATABASE_URL = settings.DATABASE_URL
 
-DATABASE_URL = "sqlite:///app.db"
+SQLITE_PRAGMAS = {
+    "journal_mode": "WAL",
+    "synchronous": "NORMAL",
+    "busy_timeout": 5000,
+    "temp_store": "MEMORY",
+    "cache_size": -20000,
+    "mmap_size": 268435456,
+}
 
+# Only the sqlite3 driver understands check_same_thread; other drivers reject it.
 engine = create_engine(
     DATABASE_URL,
-    connect_args={"check_same_thread": False},
+    connect_args={"check_same_thread": False} if DATABASE_URL.startswith("sqlite") else {},
 )
+
+
+@event.listens_for(engine, "connect")
+def _apply_sqlite_pragmas(dbapi_connection, _record) -> None:
+    if engine.dialect.name != "sqlite":
+        return
+    cursor = dbapi_connection.cursor()
+    try:
+        for name, value in SQLITE_PRAGMAS.items():
+            cursor.execute(f"PRAGMA {name}={value}")
+    finally:
+        cursor.close()
+
+
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 Base = declarative_base()
 
 
 class Lead(Base):
     __tablename__ = "leads"
+    # Every listing is ordered by (created_at, id), so each filter index ends with it.
+    __table_args__ = (
+        Index("ix_leads_created_at_id", "created_at", "id"),
+        Index("ix_leads_priority_created_at", "priority", "created_at", "id"),
+        Index("ix_leads_status_created_at", "status", "created_at", "id"),
+        Index("ix_leads_zone_id_created_at", "zone_id", "created_at", "id"),
+        Index("ix_leads_intent_created_at", "intent", "created_at", "id"),
+        Index("ix_leads_tech_assigned_created_at", "tech_assigned", "created_at", "id"),
+    )
 
     id = Column(String, primary_key=True, default=lambda: str(uuid.uuid4()))
     created_at = Column(DateTime, default=datetime.utcnow)
@@ -49,5 +101,138 @@ class Lead(Base):
         }
 
 
+class LeadRollup(Base):
+    __tablename__ = "lead_rollups"
+
+    # dimension is "all", a Lead column in ROLLUP_DIMENSIONS, or "hour" (value is
+    # the UTC hour, e.g. "2026-01-31T14:00"); a NULL column value is stored as "".
+    dimension = Column(String, primary_key=True)
+    value = Column(String, primary_key=True)
+    count = Column(Integer, nullable=False, default=0)
+    quote_min_sum = Column(Integer, nullable=False, default=0)
+    quote_max_sum = Column(Integer, nullable=False, default=0)
+
+
+ROLLUP_DIMENSIONS = ("priority", "intent", "zone_id", "tech_assigned")
+
+
+def rollup_deltas(rows: Iterable[Mapping]) -> dict[tuple[str, str], list[int]]:
+    deltas: dict[tuple[str, str], list[int]] = {}
+    for row in rows:
+        created_at = row.get("created_at") or datetime.utcnow()
+        quote_min = row.get("quote_min") or 0
+        quote_max = row.get("quote_max") or 0
+        keys = [("all", ""), ("hour", created_at.strftime("%Y-%m-%dT%H:00"))]
+        keys.extend((name, row.get(name) or "") for name in ROLLUP_DIMENSIONS)
+        for key in keys:
+            delta = deltas.get(key)
+            if delta is None:
+                delta = deltas[key] = [0, 0, 0]
+            delta[0] += 1
+            delta[1] += quote_min
+            delta[2] += quote_max
+    return deltas
+
+
+def apply_rollups(db: Session, deltas: dict[tuple[str, str], list[int]]) -> None:
+    if not deltas:
+        return
+    dialect = postgresql if db.get_bind().dialect.name == "postgresql" else sqlite
+    stmt = dialect.insert(LeadRollup)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[LeadRollup.dimension, LeadRollup.value],
+        set_={
+            "count": LeadRollup.count + stmt.excluded.count,
+            "quote_min_sum": LeadRollup.quote_min_sum + stmt.excluded.quote_min_sum,
+            "quote_max_sum": LeadRollup.quote_max_sum + stmt.excluded.quote_max_sum,
+        },
+    )
+    db.execute(
+        stmt,
+        [
+            {
+                "dimension": dimension,
+                "value": value,
+                "count": count,
+                "quote_min_sum": quote_min,
+                "quote_max_sum": quote_max,
+            }
+            for (dimension, value), (count, quote_min, quote_max) in deltas.items()
+        ],
+    )
+
+
+def insert_leads(db: Session, rows: list[dict]) -> None:
+    if rows:
+        db.execute(insert(Lead), rows)
+        # Same transaction as the leads, so the rollups can never drift from them.
+        apply_rollups(db, rollup_deltas(rows))
+
+
+ROLLUP_COLUMNS = (
+    LeadRollup.dimension,
+    LeadRollup.value,
+    LeadRollup.count,
+    LeadRollup.quote_min_sum,
+    LeadRollup.quote_max_sum,
+)
+
+
+def rebuild_rollups(batch_size: int = 5000) -> int:
+    # The scan runs in a read-only snapshot, which holds no write lock, so the lead
+    # writer keeps committing while a large table is read. Leads committed since the
+    # snapshot already moved the live rollups, so the difference between the live rows
+    # now and in the snapshot is added back when the new totals are swapped in.
+    columns = [Lead.created_at, Lead.quote_min, Lead.quote_max]
+    columns.extend(getattr(Lead, name) for name in ROLLUP_DIMENSIONS)
+    with _snapshot_connection() as conn:
+        before = _rollup_rows(conn.execute(select(*ROLLUP_COLUMNS)))
+        rows = conn.execute(select(*columns).execution_options(yield_per=batch_size))
+        totals = rollup_deltas(rows.mappings())
+        conn.rollback()
+    # The swap is the only write and is as short as the rollup table.
+    with SessionLocal() as db:
+        after = _rollup_rows(db.execute(delete(LeadRollup).returning(*ROLLUP_COLUMNS)))
+        for key in before.keys() | after.keys():
+            now = after.get(key, (0, 0, 0))
+            then = before.get(key, (0, 0, 0))
+            total = totals.setdefault(key, [0, 0, 0])
+            for i in range(3):
+                total[i] += now[i] - then[i]
+        apply_rollups(db, {key: total for key, total in totals.items() if total[0]})
+        db.commit()
+    return totals.get(("all", ""), [0])[0]
+
+
+def _snapshot_connection():
+    conn = engine.connect()
+    if conn.dialect.name == "sqlite":
+        # pysqlite runs each SELECT in its own implicit transaction; an explicit one
+        # keeps every read on the same snapshot.
+        conn.exec_driver_sql("BEGIN")
+    else:
+        conn = conn.execution_options(isolation_level="REPEATABLE READ")
+    return conn
+
+
+def _rollup_rows(result) -> dict[tuple[str, str], tuple[int, int, int]]:
+    return {
+        (dimension, value): (count, quote_min, quote_max)
+        for dimension, value, count, quote_min, quote_max in result
+    }
+
+
 def init_db() -> None:
     Base.metadata.create_all(bind=engine)
+    # create_all skips existing tables, so add indexes missing from older databases.
+    for index in Lead.__table__.indexes:
+        index.create(bind=engine, checkfirst=True)
+    with SessionLocal() as db:
+        has_rollups = db.scalar(select(LeadRollup.dimension).limit(1))
+        has_leads = db.scalar(select(Lead.id).limit(1))
+    if has_leads and not has_rollups:
+        # A database from before rollups existed. Rebuilding scans every lead, which is
+        # not something each worker start should do on its own.
+        logger.warning(
+            "Lead rollups are empty; POST /leads/stats/rebuild to backfill /leads/stats"
+        )
@@ -0,0 +1,97 @@
+from __future__ import annotations
+
+from collections import deque
+from typing import Hashable, Iterable
+
+# Endings a term may carry and still count as that term: "cold rooms", "chillers",
+# "cleaning", "serviced". Anything longer is a different word ("gasket" is not "gas").
+INFLECTIONS = frozenset({"", "s", "es", "d", "ed", "ing", "er", "ers"})
+
+
+class KeywordMatcher:
+    def __init__(self, terms: dict[Hashable, Iterable[str]]) -> None:
+        self._goto: list[dict[str, int]] = [{}]
+        self._fail: list[int] = [0]
+        # Each match is (term, length matched); a term ending in a silent "e" is also
+        # inserted without it plus "ing", so "servicing" reports "service".
+        self._out: list[tuple[tuple[str, int], ...]] = [()]
+        self._categories: dict[str, set] = {}
+        for category, words in terms.items():
+            for word in words:
+                term = word.strip().lower()
+                if not term:
+                    continue
+                self._categories.setdefault(term, set()).add(category)
+                self._insert(term, term)
+                if term.endswith("e") and len(term) > 2:
+                    self._insert(term[:-1] + "ing", term)
+        self._build_links()
+
+    def __len__(self) -> int:
+        return len(self._categories)
+
+    def find(self, text: str) -> set[str]:
+        text = text.lower()
+        size = len(text)
+        goto, fail, out = self._goto, self._fail, self._out
+        found: set[str] = set()
+        node = 0
+        for i, ch in enumerate(text):
+            while node and ch not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(ch, 0)
+            if not out[node]:
+                continue
+            # Read one character past the longest inflection, so a longer tail fails.
+            end = i + 1
+            while end < size and end <= i + 4 and _is_word_char(text[end]):
+                end += 1
+            if text[i + 1 : end] not in INFLECTIONS:
+                continue
+            for term, length in out[node]:
+                start = i - length + 1
+                if start == 0 or not _is_word_char(text[start - 1]):
+                    found.add(term)
+        return found
+
+    def match(self, text: str) -> dict[Hashable, set[str]]:
+        return self.group(self.find(text))
+
+    def group(self, found: Iterable[str]) -> dict[Hashable, set[str]]:
+        matched: dict[Hashable, set[str]] = {}
+        for term in found:
+            for category in self._categories[term]:
+                matched.setdefault(category, set()).add(term)
+        return matched
+
+    def _insert(self, pattern: str, term: str) -> None:
+        node = 0
+        for ch in pattern:
+            nxt = self._goto[node].get(ch)
+            if nxt is None:
+                nxt = len(self._goto)
+                self._goto[node][ch] = nxt
+                self._goto.append({})
+                self._fail.append(0)
+                self._out.append(())
+            node = nxt
+        match = (term, len(pattern))
+        if match not in self._out[node]:
+            self._out[node] = self._out[node] + (match,)
+
+    def _build_links(self) -> None:
+        queue = deque(self._goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for ch, child in self._goto[node].items():
+                queue.append(child)
+                fallback = self._fail[node]
+                while fallback and ch not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                target = self._goto[fallback].get(ch, 0)
+                self._fail[child] = target if target != child else 0
+                self._out[child] = self._out[child] + self._out[self._fail[child]]
+
+
+def _is_word_char(ch: str) -> bool:
+    return ch.isalnum() or ch == "_"
@@ -1,6 +1,163 @@
-from .triage import detect_intent, detect_priority, detect_revenue_tier
+from __future__ import annotations
+
+from datetime import datetime, timedelta
+from functools import cached_property
+from typing import TYPE_CHECKING, Callable
+
+from ..metrics import timed
+from .keywords import KeywordMatcher
+from .scheduling import Scheduler, job_minutes, parse_when
+from .technicians import AVAILABLE, TechRegistry
+from .territory import TerritoryIndex
 from .tools import calculate_quote_range, check_tech_availability, validate_territory
 
+if TYPE_CHECKING:
+    from ..reservations import TechReservations
+
+# Intents that send a technician out, and so take one off the board.
+DISPATCH_INTENTS = ("emergency_repair", "maintenance")
+
+TRIAGE_TERMS = {
+    "critical": [
+        "cold room",
+        "server room",
+        "warehouse",
+        "export",
+        "chiller",
+        "compressor down",
+    ],
+    "maintenance": ["maintenance", "service", "clean", "tune-up", "inspection"],
+    "commercial": ["warehouse", "hotel", "export"],
+    "cold": ["cold room", "chiller", "freezer"],
+    "safety": ["smoke", "fire", "sparks", "gas"],
+}
+
+
+def build_triage_matcher(locale: dict) -> KeywordMatcher:
+    terms = {category: list(words) for category, words in TRIAGE_TERMS.items()}
+    for category, words in locale.get("triage_terms", {}).items():
+        terms.setdefault(category, []).extend(words)
+    return KeywordMatcher(terms)
+
+
+class DispatchContext:
+    def __init__(
+        self,
+        message: str,
+        locale: dict,
+        territory: dict,
+        techs: dict,
+        signals: dict | None = None,
+        triage_matcher: KeywordMatcher | None = None,
+        territory_index: TerritoryIndex | None = None,
+        tech_registry: TechRegistry | None = None,
+        reservations: TechReservations | None = None,
+        locale_name: str = "",
+        conversation: str | None = None,
+        scheduler: Scheduler | None = None,
+    ) -> None:
+        self.message = message
+        self.locale = locale
+        self.territory = territory
+        self.techs = techs
+        self.triage_matcher = triage_matcher or build_triage_matcher(locale)
+        self.territory_index = territory_index
+        self.tech_registry = tech_registry
+        self.reservations = reservations
+        self.locale_name = locale_name
+        self.conversation = conversation
+        self.scheduler = scheduler
+        self.reservation: dict | None = None
+        signals = signals or {"keywords": [], "entities": []}
+        keywords = [k.lower() for k in signals.get("keywords", [])]
+        entities = [e.lower() for e in signals.get("entities", [])]
+        signal_text = " ".join(keywords + entities)
+        self.base_text = signal_text if signal_text else message.lower()
+        self.combined_text = f"{message} {signal_text}".strip()
+
+    @cached_property
+    def matched(self) -> dict:
+        return self.triage_matcher.match(self.base_text)
+
+    @cached_property
+    def triage(self) -> dict:
+        priority = "CRITICAL" if "critical" in self.matched else "NORMAL"
+        if priority == "CRITICAL":
+            intent = "emergency_repair"
+        elif "maintenance" in self.matched:
+            intent = "maintenance"
+        else:
+            intent = "general_inquiry"
+        revenue_tier = (
+            "high" if priority == "CRITICAL" or "commercial" in self.matched else "low"
+        )
+        return {"intent": intent, "priority": priority, "revenue_tier": revenue_tier}
+
+    @cached_property
+    def territory_result(self) -> dict:
+        with timed("territory"):
+            return validate_territory(self.combined_text, self.territory, self.territory_index)
+
+    @cached_property
+    def required_skill(self) -> str:
+        return "cold_room" if "cold" in self.matched else "hvac_ac"
+
+    @cached_property
+    def tech(self) -> dict:
+        service_tier = self.territory_result["service_tier"]
+        intent = self.triage["intent"]
+        # Out for the drive and the job itself, starting now.
+        minutes = self.eta_minutes + job_minutes(intent, self.locale)
+        bookable = _free_now(self.scheduler, minutes) if self.scheduler is not None else None
+        with timed("tech_lookup"):
+            if self.reservations is not None and self.tech_registry is not None:
+                if intent not in DISPATCH_INTENTS:
+                    return self.reservations.suggest(
+                        self.locale_name,
+                        self.tech_registry,
+                        self.required_skill,
+                        service_tier,
+                        bookable,
+                    )
+                # The lease adds a grace on top to cover overruns.
+                tech, self.reservation = self.reservations.reserve(
+                    self.locale_name,
+                    self.tech_registry,
+                    self.required_skill,
+                    service_tier,
+                    minutes * 60,
+                    self.conversation,
+                    bookable,
+                )
+                return tech
+            return check_tech_availability(
+                self.required_skill, service_tier, self.techs, self.tech_registry, bookable
+            )
+
+    @cached_property
+    def eta_minutes(self) -> int:
+        traffic_padding = self.locale.get("traffic", {}).get("default_padding_minutes", 20)
+        base_travel = 35 if self.territory_result["zone_id"] == "A" else 25
+        return int(base_travel + traffic_padding)
+
+    @cached_property
+    def quote(self) -> dict:
+        return calculate_quote_range(
+            problem_type=self.triage["intent"],
+            priority=self.triage["priority"],
+            tier_multiplier=self.territory_result["multiplier"],
+            locale=self.locale,
+        )
+
+    @cached_property
+    def safety_alert(self) -> bool:
+        return self.triage["priority"] == "CRITICAL" and (
+            "safety"
+            in _combined_matches(
+                self.triage_matcher, self.combined_text, self.base_text, self.matched
+            )
+        )
+
 
 def handle_chat(
     message: str,
@@ -9,69 +166,101 @@ def handle_chat(
     territory: dict,
     techs: dict,
     signals: dict | None = None,
+    triage_matcher: KeywordMatcher | None = None,
+    territory_index: TerritoryIndex | None = None,
+    tech_registry: TechRegistry | None = None,
+    scheduler: Scheduler | None = None,
+    context: DispatchContext | None = None,
+    reservations: TechReservations | None = None,
+    locale_name: str = "",
+    conversation: str | None = None,
 ) -> dict:
-    signals = signals or {"keywords": [], "entities": []}
-    keywords = [k.lower() for k in signals.get("keywords", [])]
-    entities = [e.lower() for e in signals.get("entities", [])]
-    signal_text = " ".join(keywords + entities)
-    base_text = signal_text if signal_text else message.lower()
-    combined_text = f"{message} {signal_text}".strip()
-
-    critical_terms = {
-        "cold room",
-        "server room",
-        "warehouse",
-        "export",
-        "chiller",
-        "compressor down",
-    }
-    priority = "CRITICAL" if any(t in base_text for t in critical_terms) else "NORMAL"
-
-    maintenance_terms = {"maintenance", "service", "clean", "tune-up", "inspection"}
-    if priority == "CRITICAL":
-        intent = "emergency_repair"
-    elif any(t in base_text for t in maintenance_terms):
-        intent = "maintenance"
-    else:
-        intent = "general_inquiry"
-
-    commercial_terms = {"warehouse", "hotel", "export"}
-    revenue_tier = "high" if priority == "CRITICAL" or any(
-        t in base_text for t in commercial_terms
-    ) else "low"
-
-    territory_result = validate_territory(combined_text, territory)
-    cold_terms = {"cold room", "chiller", "freezer"}
-    required_skill = "cold_room" if any(t in base_text for t in cold_terms) else "hvac_ac"
-    tech = check_tech_availability(
-        required_skill, territory_result["service_tier"], techs
+    context = context or DispatchContext(
+        message,
+        locale,
+        territory,
+        techs,
+        signals=signals,
+        triage_matcher=triage_matcher,
+        territory_index=territory_index,
+        tech_registry=tech_registry,
+        reservations=reservations,
+        locale_name=locale_name,
+        conversation=conversation,
+        scheduler=scheduler,
     )
+    triage = context.triage
+    intent = triage["intent"]
+    territory_result = context.territory_result
+    schedule = {}
+    scheduled_tech = None
+    if when_iso and scheduler is not None:
+        scheduled_tech, schedule = _schedule(
+            scheduler,
+            when_iso,
+            intent,
+            context.required_skill,
+            territory_result["service_tier"],
+            context.locale,
+            context.tech_registry,
+        )
+    if scheduled_tech:
+        registry = context.tech_registry
+        live = registry.get(scheduled_tech["tech_id"]) if registry else None
+        tech = live or scheduled_tech
+    elif schedule:
+        # The customer asked for a later time that could not be booked; nobody is sent
+        # now, they are offered the next openings instead.
+        tech = {}
+    else:
+        # Only an immediate dispatch takes a technician off the board.
+        tech = context.tech
+        if not tech and intent in DISPATCH_INTENTS:
+            # Everyone who could go is already out on a job: nobody is sent and no ETA
+            # is given; the customer is offered the next openings instead.
+            schedule = _no_technician(
+                scheduler,
+                intent,
+                context.required_skill,
+                territory_result["service_tier"],
+                context.locale,
+                context.tech_registry,
+                context.eta_minutes,
+            )
 
-    traffic_padding = (
-        locale.get("traffic", {}).get("default_padding_minutes", 20)
-    )
-    base_travel = 35 if territory_result["zone_id"] == "A" else 25
-    eta_minutes = int(base_travel + traffic_padding)
-
-    quote = calculate_quote_range(
-        problem_type=intent,
-        priority=priority,
-        tier_multiplier=territory_result["multiplier"],
-        locale=locale,
-    )
+    eta_minutes = None if schedule else context.eta_minutes
+    quote = context.quote
 
     tech_name = tech.get("display_name", "a technician")
     tech_location = tech.get("base_location", {}).get("name", "your area")
-    agent_message = (
-        f"I understand. I am dispatching {tech_name} now. "
-        f"They are near {tech_location} and should arrive in about {eta_minutes} minutes. "
-        "Please share a location pin or nearby landmark."
-    )
+    schedule_status = schedule.get("schedule_status")
+    if schedule_status == "booked":
+        start = parse_when(schedule["scheduled_start"], scheduler.tz)
+        agent_message = (
+            f"I understand. I have scheduled {tech_name} for {start:%A %d %B at %H:%M}. "
+            "Please share a location pin or nearby landmark."
+        )
+    elif schedule_status == "invalid_when_iso":
+        agent_message = (
+            "I understand. I could not read the time you asked for. "
+            "Please tell me the day and time that suits you."
+        )
+    elif schedule_status == "unavailable":
+        agent_message = "I understand. No technician is free at that time. " + _offer(
+            schedule, scheduler, "Please suggest another day and time."
+        )
+    elif schedule_status == "no_technician_free":
+        agent_message = "I understand. No technician is free right now. " + _offer(
+            schedule, scheduler, "We will contact you as soon as one is free."
+        )
+    else:
+        agent_message = (
+            f"I understand. I am dispatching {tech_name} now. "
+            f"They are near {tech_location} and should arrive in about {eta_minutes} minutes. "
+            "Please share a location pin or nearby landmark."
+        )
 
-    safety_terms = {"smoke", "fire", "sparks", "gas"}
-    safety_alert = priority == "CRITICAL" and any(
-        t in combined_text.lower() for t in safety_terms
-    )
+    safety_alert = context.safety_alert
     if safety_alert:
         agent_message = (
             "If safe, switch off the unit and keep clear of smoke or sparks. "
@@ -87,17 +276,20 @@ def handle_chat(
         "agent_message": agent_message,
         "metadata": {
             "intent": intent,
-            "priority": priority,
-            "revenue_tier": revenue_tier,
+            "priority": triage["priority"],
+            "revenue_tier": triage["revenue_tier"],
             "territory_code": territory_result["territory_code"],
             "zone_id": territory_result["zone_id"],
             "service_tier": territory_result["service_tier"],
             "tech_assigned": tech.get("tech_id"),
+            "tech_name": tech.get("display_name"),
             "eta_minutes": eta_minutes,
             "quote_min": quote["min"],
             "quote_max": quote["max"],
             "currency": quote["currency"],
             "safety_alert": safety_alert,
+            **schedule,
+            **(context.reservation or {}),
         },
         "ui_trigger": ui_trigger,
         "tech_card": {
@@ -108,3 +300,102 @@ def handle_chat(
             "skills": tech.get("skills", []),
         } if ui_trigger == "show_technician_card" else None,
     }
+
+
+def _combined_matches(
+    matcher: KeywordMatcher, combined_text: str, base_text: str, base_matched: dict
+) -> dict:
+    if combined_text.lower() == base_text:
+        return base_matched
+    return matcher.match(combined_text)
+
+
+def _schedule(
+    scheduler: Scheduler,
+    when_iso: str,
+    intent: str,
+    skill: str,
+    service_tier: str,
+    locale: dict,
+    registry: TechRegistry | None = None,
+) -> tuple[dict | None, dict]:
+    try:
+        start = parse_when(when_iso, scheduler.tz)
+    except ValueError:
+        return None, {"schedule_status": "invalid_when_iso"}
+    minutes = job_minutes(intent, locale)
+    bookable = _bookable(registry) if registry is not None else None
+    now = datetime.now(scheduler.tz)
+    if start < now:
+        # A time that has already gone cannot be booked; offer what is open from now.
+        return None, {
+            "schedule_status": "unavailable",
+            "next_slots": scheduler.next_slots(skill, service_tier, now, minutes, bookable=bookable),
+        }
+    tech = scheduler.book_first(skill, service_tier, start, minutes, bookable)
+    if tech:
+        end = start + timedelta(minutes=minutes)
+        return tech, {
+            "schedule_status": "booked",
+            "scheduled_start": start.isoformat(),
+            "scheduled_end": end.isoformat(),
+        }
+    return None, {
+        "schedule_status": "unavailable",
+        "next_slots": scheduler.next_slots(skill, service_tier, start, minutes, bookable=bookable),
+    }
+
+
+def _no_technician(
+    scheduler: Scheduler | None,
+    intent: str,
+    skill: str,
+    service_tier: str,
+    locale: dict,
+    registry: TechRegistry | None,
+    eta_minutes: int,
+) -> dict:
+    schedule = {"schedule_status": "no_technician_free", "next_slots": []}
+    if scheduler is not None:
+        # Openings are searched from when a job sent out now would be over, since
+        # everyone who could go is on one.
+        minutes = job_minutes(intent, locale)
+        after = datetime.now(scheduler.tz) + timedelta(minutes=eta_minutes + minutes)
+        bookable = _bookable(registry) if registry is not None else None
+        schedule["next_slots"] = scheduler.next_slots(
+            skill, service_tier, after, minutes, bookable=bookable
+        )
+    return schedule
+
+
+def _offer(schedule: dict, scheduler: Scheduler | None, otherwise: str) -> str:
+    if scheduler is None or not schedule.get("next_slots"):
+        return otherwise
+    # Several technicians can open up at the same time; offer each time once.
+    openings = list(
+        dict.fromkeys(
+            f"{parse_when(slot['start'], scheduler.tz):%A %d %B at %H:%M}"
+            for slot in schedule["next_slots"]
+        )
+    )
+    return f"The next openings are {', '.join(openings)}. Which one suits you?"
+
+
+def _free_now(scheduler: Scheduler, minutes: int) -> Callable[[str], bool]:
+    # Sending someone now needs them on shift with nothing in their calendar until the
+    # job is done, the same as booking them for now would.
+    now = datetime.now(scheduler.tz)
+
+    def free(tech_id: str) -> bool:
+        return scheduler.is_free(tech_id, now, minutes)
+
+    return free
+
+
+def _bookable(registry: TechRegistry) -> Callable[[str], bool]:
+    # The calendar comes from the roster file; PATCH /techs only reaches the registry.
+    def bookable(tech_id: str) -> bool:
+        tech = registry.get(tech_id)
+        return tech is not None and tech.get("current_status") == AVAILABLE
+
+    return bookable
@@ -0,0 +1,331 @@
+from __future__ import annotations
+
+import heapq
+import threading
+from bisect import bisect_right
+from datetime import datetime, timedelta, timezone
+from typing import Callable, Iterator
+
+DEFAULT_JOB_MINUTES = {
+    "emergency_repair": 120,
+    "maintenance": 90,
+    "general_inquiry": 60,
+}
+# How far ahead next_slots will search before giving up.
+SEARCH_HORIZON_DAYS = 60
+
+
+def parse_utc_offset(value: str | None) -> timezone:
+    if not value:
+        return timezone.utc
+    sign = -1 if value.startswith("-") else 1
+    hours, _, minutes = value.lstrip("+-").partition(":")
+    return timezone(sign * timedelta(hours=int(hours), minutes=int(minutes or 0)))
+
+
+def parse_when(when_iso: str, tz: timezone) -> datetime:
+    when = datetime.fromisoformat(when_iso.replace("Z", "+00:00"))
+    if when.tzinfo is None:
+        when = when.replace(tzinfo=tz)
+    return when
+
+
+def job_minutes(intent: str, locale: dict) -> int:
+    durations = {**DEFAULT_JOB_MINUTES, **locale.get("job_duration_minutes", {})}
+    return int(durations.get(intent, 60))
+
+
+class _Calendar:
+    def __init__(self, hours: dict[str, tuple[int, int] | None]) -> None:
+        self.starts: list[float] = []
+        self.ends: list[float] = []
+        self.hours = hours
+
+    def load(self, intervals) -> None:
+        for start, end in sorted(i for i in intervals if i[1] > i[0]):
+            if self.ends and start <= self.ends[-1]:
+                self.ends[-1] = max(self.ends[-1], end)
+            else:
+                self.starts.append(start)
+                self.ends.append(end)
+
+    def add(self, start: float, end: float) -> None:
+        # Keep intervals merged so each probe needs a single bisect.
+        i = bisect_right(self.starts, start) - 1
+        if i >= 0 and self.ends[i] >= start:
+            start = self.starts[i]
+            end = max(end, self.ends[i])
+            del self.starts[i]
+            del self.ends[i]
+        else:
+            i += 1
+        while i < len(self.starts) and self.starts[i] <= end:
+            end = max(end, self.ends[i])
+            del self.starts[i]
+            del self.ends[i]
+        self.starts.insert(i, start)
+        self.ends.insert(i, end)
+
+    def remove(self, start: float, end: float) -> None:
+        # Only called for a booked slot, which never overlaps another interval; it may
+        # have been merged with ones that touch it, so split those back out.
+        i = bisect_right(self.starts, start) - 1
+        if i < 0 or self.ends[i] < end:
+            return
+        before = (self.starts[i], start)
+        after = (end, self.ends[i])
+        del self.starts[i]
+        del self.ends[i]
+        for piece_start, piece_end in (after, before):
+            if piece_end > piece_start:
+                self.starts.insert(i, piece_start)
+                self.ends.insert(i, piece_end)
+
+    def conflict_end(self, start: float, end: float) -> float | None:
+        i = bisect_right(self.starts, start) - 1
+        if i >= 0 and self.ends[i] > start:
+            return self.ends[i]
+        if i + 1 < len(self.starts) and self.starts[i + 1] < end:
+            return self.ends[i + 1]
+        return None
+
+
+class Scheduler:
+    def __init__(self, techs: dict, locale: dict) -> None:
+        self.tz = parse_utc_offset(locale.get("utc_offset"))
+        # Offsets are fixed, so shift windows are worked out in plain seconds.
+        self._offset = self.tz.utcoffset(None).total_seconds()
+        self._lock = threading.RLock()
+        self._techs: dict[str, dict] = {}
+        self._calendars: dict[str, _Calendar] = {}
+        self._by_skill_tier: dict[tuple[str, str], list[str]] = {}
+        # Bookings made since the roster was loaded, so they can outlive this scheduler.
+        self._booked: list[tuple[str, float, int]] = []
+        # Set once a reloaded scheduler has taken over; requests still holding this one
+        # book, cancel and look up through it so no booking lands where it will be lost.
+        self._successor: Scheduler | None = None
+        default_hours = locale.get("business_hours", {})
+        for tech in techs.get("technicians", []):
+            tech_id = tech.get("tech_id")
+            if tech_id is None:
+                continue
+            self._techs[tech_id] = tech
+            calendar = _Calendar(_parse_hours(tech.get("working_hours") or default_hours))
+            calendar.load(
+                (parse_when(e["start"], self.tz).timestamp(), parse_when(e["end"], self.tz).timestamp())
+                for e in tech.get("calendar", [])
+            )
+            self._calendars[tech_id] = calendar
+            for skill in tech.get("skills", []):
+                for tier in tech.get("service_tiers_allowed", []):
+                    self._by_skill_tier.setdefault((skill, tier), []).append(tech_id)
+
+    def is_free(self, tech_id: str, start: datetime, minutes: int) -> bool:
+        successor = self._successor
+        if successor is not None:
+            return successor.is_free(tech_id, start, minutes)
+        begin = start.timestamp()
+        end = begin + minutes * 60
+        with self._lock:
+            calendar = self._calendars.get(tech_id)
+            if calendar is None:
+                return False
+            return _on_shift(calendar, begin, end, self._offset) and (
+                calendar.conflict_end(begin, end) is None
+            )
+
+    def first_free(
+        self,
+        skill: str,
+        service_tier: str,
+        start: datetime,
+        minutes: int,
+        bookable: Callable[[str], bool] | None = None,
+    ) -> dict | None:
+        for tech_id in self._candidates(skill, service_tier, bookable):
+            if self.is_free(tech_id, start, minutes):
+                return self._techs[tech_id]
+        return None
+
+    def book_first(
+        self,
+        skill: str,
+        service_tier: str,
+        start: datetime,
+        minutes: int,
+        bookable: Callable[[str], bool] | None = None,
+    ) -> dict | None:
+        # book() checks and takes the slot under one lock, so of two requests for the
+        # same slot only one gets each technician; the other moves on to the next.
+        for tech_id in self._candidates(skill, service_tier, bookable):
+            if self.book(tech_id, start, minutes):
+                return self._techs[tech_id]
+        return None
+
+    def next_slots(
+        self,
+        skill: str,
+        service_tier: str,
+        after: datetime,
+        minutes: int,
+        k: int = 3,
+        bookable: Callable[[str], bool] | None = None,
+    ) -> list[dict]:
+        successor = self._successor
+        if successor is not None:
+            return successor.next_slots(skill, service_tier, after, minutes, k, bookable)
+        per_tech = (
+            self._labelled_slots(tech_id, after, minutes)
+            for tech_id in self._candidates(skill, service_tier, bookable)
+        )
+        slots = []
+        for start, tech_id in heapq.merge(*per_tech):
+            slots.append(
+                {
+                    "tech_id": tech_id,
+                    "start": datetime.fromtimestamp(start, self.tz).isoformat(),
+                    "end": datetime.fromtimestamp(start + minutes * 60, self.tz).isoformat(),
+                }
+            )
+            if len(slots) >= k:
+                break
+        return slots
+
+    def _labelled_slots(
+        self, tech_id: str, after: datetime, minutes: int
+    ) -> Iterator[tuple[float, str]]:
+        # A generator of its own binds tech_id per technician; a nested generator
+        # expression would read it late and label every slot with the last one.
+        for start in self._iter_slots(tech_id, after, minutes):
+            yield start, tech_id
+
+    def _iter_slots(self, tech_id: str, after: datetime, minutes: int) -> Iterator[float]:
+        calendar = self._calendars.get(tech_id)
+        if calendar is None:
+            return
+        duration = minutes * 60
+        cursor = after.timestamp()
+        horizon = cursor + SEARCH_HORIZON_DAYS * 86400
+        while cursor < horizon:
+            window = _shift_window(calendar, cursor, self._offset)
+            if window is None:
+                return
+            begin, close = window
+            cursor = max(cursor, begin)
+            if cursor + duration > close:
+                cursor = close
+                continue
+            with self._lock:
+                blocked_until = calendar.conflict_end(cursor, cursor + duration)
+            if blocked_until is not None:
+                cursor = blocked_until
+                continue
+            yield cursor
+            cursor += duration
+
+    def book(self, tech_id: str, start: datetime, minutes: int) -> bool:
+        with self._lock:
+            if self._successor is not None:
+                return self._successor.book(tech_id, start, minutes)
+            if not self.is_free(tech_id, start, minutes):
+                return False
+            begin = start.timestamp()
+            self._calendars[tech_id].add(begin, begin + minutes * 60)
+            self._booked.append((tech_id, begin, minutes))
+            return True
+
+    def cancel(self, tech_id: str, begin: float, minutes: int) -> bool:
+        with self._lock:
+            if self._successor is not None:
+                return self._successor.cancel(tech_id, begin, minutes)
+            try:
+                self._booked.remove((tech_id, begin, minutes))
+            except ValueError:
+                return False
+            self._calendars[tech_id].remove(begin, begin + minutes * 60)
+            return True
+
+    def bookings(self) -> list[tuple[str, float, int]]:
+        with self._lock:
+            if self._successor is not None:
+                return self._successor.bookings()
+            return list(self._booked)
+
+    def restore(self, bookings: list[tuple[str, float, int]]) -> None:
+        for tech_id, begin, minutes in bookings:
+            self.book(tech_id, datetime.fromtimestamp(begin, self.tz), minutes)
+
+    def hand_over(self, successor: Scheduler) -> None:
+        # The copy and the switch happen under one lock, so a booking made here either
+        # is copied or goes straight to the successor; none falls in between.
+        with self._lock:
+            if self._successor is not None:
+                self._successor.hand_over(successor)
+                return
+            successor.restore(self._booked)
+            self._successor = successor
+
+    def _candidates(
+        self, skill: str, service_tier: str, bookable: Callable[[str], bool] | None
+    ) -> list[str]:
+        tech_ids = self._by_skill_tier.get((skill, service_tier), [])
+        if bookable is None:
+            return tech_ids
+        return [tech_id for tech_id in tech_ids if bookable(tech_id)]
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "technicians": len(self._calendars),
+                "busy_intervals": sum(len(c.starts) for c in self._calendars.values()),
+            }
+
+
+def _parse_hours(working_hours: dict) -> dict[str, tuple[int, int] | None]:
+    parsed: dict[str, tuple[int, int] | None] = {}
+    for key in ("weekday", "weekend"):
+        value = working_hours.get(key)
+        if not value:
+            parsed[key] = None
+            continue
+        opens, _, closes = value.partition("-")
+        parsed[key] = (_minutes(opens), _minutes(closes))
+    return parsed
+
+
+def _minutes(hhmm: str) -> int:
+    hours, _, minutes = hhmm.strip().partition(":")
+    return int(hours) * 60 + int(minutes or 0)
+
+
+def _day_window(calendar: _Calendar, moment: float, offset: float) -> tuple[float, float] | None:
+    # The local day holding moment; 1 January 1970 was a Thursday (weekday 3).
+    day = (moment + offset) // 86400
+    hours = calendar.hours["weekend" if (day + 3) % 7 >= 5 else "weekday"]
+    if not hours:
+        return None
+    midnight = day * 86400 - offset
+    return midnight + hours[0] * 60, midnight + hours[1] * 60
+
+
+def _on_shift(calendar: _Calendar, begin: float, end: float, offset: float) -> bool:
+    window = _day_window(calendar, begin, offset)
+    if window is None or begin < window[0]:
+        return False
+    # A shift that runs to midnight and picks up again at 00:00 is one stretch.
+    while end > window[1]:
+        following = _day_window(calendar, window[1], offset)
+        if following is None or following[0] != window[1]:
+            return False
+        window = following
+    return True
+
+
+def _shift_window(calendar: _Calendar, cursor: float, offset: float) -> tuple[float, float] | None:
+    day = cursor
+    for _ in range(8):
+        window = _day_window(calendar, day, offset)
+        if window is not None and cursor < window[1]:
+            return window
+        day = ((day + offset) // 86400 + 1) * 86400 - offset
+    return None
@@ -0,0 +1,162 @@
+from __future__ import annotations
+
+import threading
+from bisect import bisect_left
+from typing import Callable, Iterator
+
+AVAILABLE = "available"
+
+
+class TechRegistry:
+    def __init__(self, techs: dict) -> None:
+        self._lock = threading.RLock()
+        self._records: list[dict] = []
+        self._ordinals: dict[str, int] = {}
+        # Buckets hold roster ordinals in sorted order so the first entry is
+        # always the technician the roster lists first. They are tuples, replaced
+        # whole on update, so a reader can keep one without copying it.
+        self._by_key: dict[tuple[str, str, str], tuple[int, ...]] = {}
+        self._by_status: dict[str, tuple[int, ...]] = {}
+        # Live changes since the roster was loaded, so they can outlive this registry.
+        self._updates: dict[str, dict] = {}
+        # Bumped whenever a bucket changes, so positions in ranked() can be remembered.
+        self.version = 0
+        by_key: dict[tuple[str, str, str], list[int]] = {}
+        by_status: dict[str, list[int]] = {}
+        for tech in techs.get("technicians", []):
+            ordinal = len(self._records)
+            record = dict(tech)
+            self._records.append(record)
+            if record.get("tech_id") is not None:
+                self._ordinals[record["tech_id"]] = ordinal
+            # Ordinals arrive in order, so appending keeps each bucket sorted.
+            for key in self._keys(record):
+                by_key.setdefault(key, []).append(ordinal)
+            by_status.setdefault(record.get("current_status"), []).append(ordinal)
+        self._by_key = {key: tuple(bucket) for key, bucket in by_key.items()}
+        self._by_status = {status: tuple(bucket) for status, bucket in by_status.items()}
+
+    def __len__(self) -> int:
+        return len(self._records)
+
+    def find(
+        self, skill: str, service_tier: str, bookable: Callable[[str], bool] | None = None
+    ) -> dict:
+        if bookable is not None:
+            # Only someone the caller can actually send, else nobody.
+            ranked = self.ranked(skill, service_tier)
+            return next((tech for tech in ranked if bookable(tech["tech_id"])), {})
+        with self._lock:
+            bucket = self._by_key.get((skill, service_tier, AVAILABLE))
+            if bucket:
+                return self._records[bucket[0]]
+            bucket = self._by_status.get(AVAILABLE)
+            if bucket:
+                return self._records[bucket[0]]
+            return self._records[0] if self._records else {}
+
+    def ranked(self, skill: str, service_tier: str, skip: int = 0) -> Iterator[dict]:
+        # Same preference as find: matching technicians first, then anyone available.
+        # The buckets are immutable, so holding them is a consistent snapshot that costs
+        # nothing to take; a caller that stops at the first candidate does O(1) work.
+        with self._lock:
+            matching = self._by_key.get((skill, service_tier, AVAILABLE), ())
+            available = self._by_status.get(AVAILABLE, ())
+            records = self._records
+        for ordinal in matching[skip:]:
+            yield records[ordinal]
+        skip -= len(matching)
+        seen = set(matching)
+        for ordinal in available:
+            if ordinal not in seen:
+                if skip > 0:
+                    skip -= 1
+                    continue
+                yield records[ordinal]
+
+    def get(self, tech_id: str) -> dict | None:
+        with self._lock:
+            ordinal = self._ordinals.get(tech_id)
+            return self._records[ordinal] if ordinal is not None else None
+
+    def update(
+        self,
+        tech_id: str,
+        current_status: str | None = None,
+        base_location: dict | None = None,
+    ) -> dict | None:
+        with self._lock:
+            ordinal = self._ordinals.get(tech_id)
+            if ordinal is None:
+                return None
+            old = self._records[ordinal]
+            # Records are replaced, never mutated, so readers holding one stay consistent.
+            record = dict(old)
+            if current_status is not None:
+                record["current_status"] = current_status
+            if base_location is not None:
+                record["base_location"] = dict(base_location)
+            if record.get("current_status") != old.get("current_status"):
+                self._unindex(ordinal, old)
+                self._index(ordinal, record)
+                self.version += 1
+            self._records[ordinal] = record
+            changes = self._updates.setdefault(tech_id, {})
+            if current_status is not None:
+                changes["current_status"] = current_status
+            if base_location is not None:
+                changes["base_location"] = dict(base_location)
+            return record
+
+    def updates(self) -> dict[str, dict]:
+        with self._lock:
+            return {tech_id: dict(changes) for tech_id, changes in self._updates.items()}
+
+    def apply(self, updates: dict[str, dict]) -> None:
+        for tech_id, changes in updates.items():
+            self.update(tech_id, **changes)
+
+    def technicians(self) -> list[dict]:
+        with self._lock:
+            return list(self._records)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "technicians": len(self._records),
+                "by_status": {s: len(b) for s, b in self._by_status.items() if b},
+            }
+
+    def _keys(self, record: dict) -> list[tuple[str, str, str]]:
+        status = record.get("current_status")
+        return [
+            (skill, tier, status)
+            for skill in record.get("skills", [])
+            for tier in record.get("service_tiers_allowed", [])
+        ]
+
+    def _index(self, ordinal: int, record: dict) -> None:
+        for key in self._keys(record):
+            self._by_key[key] = _with(self._by_key.get(key, ()), ordinal)
+        status = record.get("current_status")
+        self._by_status[status] = _with(self._by_status.get(status, ()), ordinal)
+
+    def _unindex(self, ordinal: int, record: dict) -> None:
+        for key in self._keys(record):
+            self._by_key[key] = _without(self._by_key.get(key, ()), ordinal)
+        status = record.get("current_status")
+        self._by_status[status] = _without(self._by_status.get(status, ()), ordinal)
+
+
+def _with(bucket: tuple[int, ...], ordinal: int) -> tuple[int, ...]:
+    pos = bisect_left(bucket, ordinal)
+    if pos < len(bucket) and bucket[pos] == ordinal:
+        return bucket
+    return bucket[:pos] + (ordinal,) + bucket[pos:]
+
+
+def _without(bucket: tuple[int, ...], ordinal: int) -> tuple[int, ...]:
+    pos = bisect_left(bucket, ordinal)
+    if pos < len(bucket) and bucket[pos] == ordinal:
+        return bucket[:pos] + bucket[pos + 1:]
+    return bucket
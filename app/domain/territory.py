@@ -0,0 +1,80 @@
+from __future__ import annotations
+
+from .keywords import KeywordMatcher
+
+UNKNOWN_TERRITORY = {
+    "territory_code": "UNKNOWN",
+    "zone_id": "B",
+    "service_tier": "standard",
+    "multiplier": 1.0,
+}
+
+
+class TerritoryIndex:
+    def __init__(self, territory: dict) -> None:
+        self._areas: list[dict] = []
+        self._by_code: dict[str, int] = {}
+        self._keyword_areas: dict[str, list[int]] = {}
+        self._default: dict | None = None
+        default_zone_id = territory.get("default_zone_id", "B")
+
+        for zone in territory.get("zones", []):
+            areas = zone.get("areas", [])
+            if self._default is None and zone.get("zone_id") == default_zone_id:
+                self._default = _result(zone, areas[0] if areas else {})
+            for area in areas:
+                ordinal = len(self._areas)
+                self._areas.append(_result(zone, area))
+                self._by_code.setdefault(area.get("territory_code"), ordinal)
+                for keyword in {k.strip().lower() for k in area.get("keywords", [])}:
+                    if keyword:
+                        self._keyword_areas.setdefault(keyword, []).append(ordinal)
+
+        self._rules: list[tuple[list[frozenset[str]], int]] = []
+        for rule in territory.get("overrides", []):
+            ordinal = self._by_code.get(rule.get("territory_code"))
+            if ordinal is None:
+                continue
+            clauses = [
+                frozenset(t.strip().lower() for t in clause) for clause in rule.get("match_any", [])
+            ]
+            self._rules.append(([c for c in clauses if c], ordinal))
+
+        rule_terms = {t for clauses, _ in self._rules for clause in clauses for t in clause}
+        self._matcher = KeywordMatcher(
+            {"area": self._keyword_areas.keys(), "rule": rule_terms}
+        )
+
+    def __len__(self) -> int:
+        return len(self._areas)
+
+    def resolve(self, message: str) -> dict:
+        found = self._matcher.find(message)
+
+        for clauses, ordinal in self._rules:
+            if any(clause <= found for clause in clauses):
+                return dict(self._areas[ordinal])
+
+        scores: dict[int, int] = {}
+        for keyword in found:
+            for ordinal in self._keyword_areas.get(keyword, ()):
+                scores[ordinal] = scores.get(ordinal, 0) + 1
+        if scores:
+            # Ties go to the area listed first in the catalog.
+            best = min(scores, key=lambda ordinal: (-scores[ordinal], ordinal))
+            return dict(self._areas[best])
+
+        return dict(self._default or UNKNOWN_TERRITORY)
+
+    def area(self, territory_code: str) -> dict | None:
+        ordinal = self._by_code.get(territory_code)
+        return dict(self._areas[ordinal]) if ordinal is not None else None
+
+
+def _result(zone: dict, area: dict) -> dict:
+    return {
+        "territory_code": area.get("territory_code"),
+        "zone_id": zone.get("zone_id"),
+        "service_tier": zone.get("service_tier"),
+        "multiplier": zone.get("multiplier", 1.0),
+    }
@@ -1,61 +1,32 @@
-def validate_territory(message: str, territory: dict) -> dict:
-    message_lower = message.lower()
-    zones = territory.get("zones", [])
-    # Hard overrides for demo-deterministic behavior
-    if "airport" in message_lower or (
-        "cold room" in message_lower and ("warehouse" in message_lower or "flower" in message_lower)
-    ):
-        for zone in zones:
-            if zone.get("zone_id") == "A":
-                for area in zone.get("areas", []):
-                    if area.get("territory_code") == "EBB-A-001":
-                        return {
-                            "territory_code": area.get("territory_code"),
-                            "zone_id": zone.get("zone_id"),
-                            "service_tier": zone.get("service_tier"),
-                            "multiplier": zone.get("multiplier", 1.0),
-                        }
-    best = None
-    best_score = -1
-    for zone in zones:
-        for area in zone.get("areas", []):
-            keywords = area.get("keywords", [])
-            score = sum(1 for k in keywords if k in message_lower)
-            if score > best_score:
-                best_score = score
-                best = (zone, area)
+from typing import Callable
 
-    # Default to Zone B first area if no match
-    if best and best_score > 0:
-        zone, area = best
-        return {
-            "territory_code": area.get("territory_code"),
-            "zone_id": zone.get("zone_id"),
-            "service_tier": zone.get("service_tier"),
-            "multiplier": zone.get("multiplier", 1.0),
-        }
+from .technicians import TechRegistry
+from .territory import TerritoryIndex
 
-    for zone in zones:
-        if zone.get("zone_id") == "B":
-            area = zone.get("areas", [{}])[0]
-            return {
-                "territory_code": area.get("territory_code"),
-                "zone_id": zone.get("zone_id"),
-                "service_tier": zone.get("service_tier"),
-                "multiplier": zone.get("multiplier", 1.0),
-            }
 
-    # Fallback if data is malformed
-    return {
-        "territory_code": "UNKNOWN",
-        "zone_id": "B",
-        "service_tier": "standard",
-        "multiplier": 1.0,
-    }
+def build_territory_index(territory: dict) -> TerritoryIndex:
+    return TerritoryIndex(territory)
+
+
+def validate_territory(
+    message: str, territory: dict, index: TerritoryIndex | None = None
+) -> dict:
+    index = index or build_territory_index(territory)
+    return index.resolve(message)
 
 
-def check_tech_availability(skill: str, service_tier: str, techs: dict) -> dict:
+def check_tech_availability(
+    skill: str,
+    service_tier: str,
+    techs: dict,
+    registry: TechRegistry | None = None,
+    bookable: Callable[[str], bool] | None = None,
+) -> dict:
+    if registry is not None:
+        return registry.find(skill, service_tier, bookable)
     technicians = techs.get("technicians", [])
+    if bookable is not None:
+        technicians = [tech for tech in technicians if bookable(tech.get("tech_id"))]
     for tech in technicians:
         if (
             tech.get("current_status") == "available"
@@ -68,6 +39,8 @@ def check_tech_availability(skill: str, service_tier: str, techs: dict) -> dict:
         if tech.get("current_status") == "available":
             return tech
 
+    if bookable is not None:
+        return {}
     return technicians[0] if technicians else {}
 
 
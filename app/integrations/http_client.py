@@ -0,0 +1,158 @@
+from __future__ import annotations
+
+import asyncio
+import random
+import ssl
+import time
+from abc import ABC, abstractmethod
+from functools import lru_cache
+
+import httpx
+
+RETRY_STATUS_CODES = {429, 500, 502, 503, 504}
+RETRY_EXCEPTIONS = (httpx.ConnectError, httpx.ConnectTimeout, httpx.RemoteProtocolError)
+
+
+class _RetryingTransport(ABC):
+    def __init__(
+        self,
+        pool_size: int = 20,
+        keepalive_seconds: float = 30.0,
+        connect_timeout: float = 5.0,
+        read_timeout: float = 60.0,
+        max_retries: int = 2,
+        backoff_base: float = 0.25,
+        backoff_max: float = 4.0,
+    ) -> None:
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.client = self._build_client(
+            limits=_limits(pool_size, keepalive_seconds),
+            timeout=_timeout(connect_timeout, read_timeout),
+        )
+
+    @abstractmethod
+    def _build_client(self, limits: httpx.Limits, timeout: httpx.Timeout):
+        ...
+
+    def _should_retry(self, resp: httpx.Response, attempt: int) -> bool:
+        return resp.status_code in RETRY_STATUS_CODES and attempt < self.max_retries
+
+    def _delay(self, attempt: int, retry_after: float | None) -> float:
+        if retry_after is not None:
+            return min(retry_after, self.backoff_max)
+        return backoff_delay(attempt, self.backoff_base, self.backoff_max)
+
+
+class PooledTransport(_RetryingTransport):
+    def _build_client(self, limits: httpx.Limits, timeout: httpx.Timeout) -> httpx.Client:
+        return httpx.Client(limits=limits, timeout=timeout, verify=_ssl_context())
+
+    def request(self, method: str, url: str, **kwargs) -> httpx.Response:
+        attempt = 0
+        while True:
+            try:
+                resp = self.client.request(method, url, **kwargs)
+            except RETRY_EXCEPTIONS:
+                if attempt >= self.max_retries:
+                    raise
+                delay = None
+            else:
+                if not self._should_retry(resp, attempt):
+                    return resp
+                delay = _retry_after(resp)
+                resp.close()
+            time.sleep(self._delay(attempt, delay))
+            attempt += 1
+
+    def post(self, url: str, **kwargs) -> httpx.Response:
+        return self.request("POST", url, **kwargs)
+
+    def close(self) -> None:
+        self.client.close()
+
+
+class AsyncPooledTransport(_RetryingTransport):
+    def _build_client(self, limits: httpx.Limits, timeout: httpx.Timeout) -> httpx.AsyncClient:
+        return httpx.AsyncClient(limits=limits, timeout=timeout, verify=_ssl_context())
+
+    async def request(self, method: str, url: str, **kwargs) -> httpx.Response:
+        attempt = 0
+        while True:
+            try:
+                resp = await self.client.request(method, url, **kwargs)
+            except RETRY_EXCEPTIONS:
+                if attempt >= self.max_retries:
+                    raise
+                delay = None
+            else:
+                if not self._should_retry(resp, attempt):
+                    return resp
+                delay = _retry_after(resp)
+                await resp.aclose()
+            await asyncio.sleep(self._delay(attempt, delay))
+            attempt += 1
+
+    async def post(self, url: str, **kwargs) -> httpx.Response:
+        return await self.request("POST", url, **kwargs)
+
+    async def aclose(self) -> None:
+        await self.client.aclose()
+
+
+def build_transport(settings) -> PooledTransport:
+    return _build(PooledTransport, settings, settings.HTTP_POOL_SIZE)
+
+
+def build_async_transport(settings) -> AsyncPooledTransport:
+    return _build(AsyncPooledTransport, settings, settings.HTTP_ASYNC_POOL_SIZE)
+
+
+def _build(cls, settings, pool_size: int):
+    return cls(
+        pool_size=pool_size,
+        keepalive_seconds=settings.HTTP_KEEPALIVE_SECONDS,
+        connect_timeout=settings.HTTP_CONNECT_TIMEOUT,
+        read_timeout=settings.HTTP_READ_TIMEOUT,
+        max_retries=settings.HTTP_MAX_RETRIES,
+        backoff_base=settings.HTTP_BACKOFF_BASE,
+    )
+
+
+@lru_cache(maxsize=1)
+def _ssl_context() -> ssl.SSLContext:
+    # Loading the CA bundle is the bulk of client construction; build it once per process.
+    return httpx.create_ssl_context()
+
+
+def backoff_delay(attempt: int, base: float, cap: float) -> float:
+    # Full jitter: spread retries uniformly so workers do not retry in lockstep.
+    return random.uniform(0, min(cap, base * (2 ** attempt)))
+
+
+def _retry_after(resp: httpx.Response) -> float | None:
+    value = resp.headers.get("Retry-After")
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        return None
+
+
+def _limits(pool_size: int, keepalive_seconds: float) -> httpx.Limits:
+    return httpx.Limits(
+        max_connections=pool_size,
+        max_keepalive_connections=pool_size,
+        keepalive_expiry=keepalive_seconds,
+    )
+
+
+def _timeout(connect_timeout: float, read_timeout: float) -> httpx.Timeout:
+    return httpx.Timeout(
+        connect=connect_timeout,
+        read=read_timeout,
+        write=connect_timeout,
+        pool=connect_timeout,
+    )
@@ -0,0 +1,156 @@
+from __future__ import annotations
+
+import asyncio
+import threading
+import time
+from dataclasses import dataclass, field
+
+import httpx
+
+from ..metrics import count_upstream_error, timed
+
+IAM_TOKEN_URL = "https://iam.cloud.ibm.com/identity/token"
+
+
+@dataclass
+class _TokenEntry:
+    token: str | None = None
+    expires_at: float = 0.0
+    lock: threading.Lock = field(default_factory=threading.Lock)
+    refreshing: bool = False
+
+
+class IAMTokenManager:
+    def __init__(
+        self,
+        token_url: str = IAM_TOKEN_URL,
+        refresh_margin_seconds: float = 300.0,
+        min_valid_seconds: float = 30.0,
+        timeout: float = 30.0,
+        transport=None,
+    ) -> None:
+        self.token_url = token_url
+        self.transport = transport
+        self.refresh_margin_seconds = refresh_margin_seconds
+        self.min_valid_seconds = min_valid_seconds
+        self.timeout = timeout
+        self._entries: dict[str, _TokenEntry] = {}
+        self._entries_lock = threading.Lock()
+        self._counter_lock = threading.Lock()
+        self._counters = {"hits": 0, "misses": 0, "refreshes": 0, "errors": 0}
+
+    def get_token(self, api_key: str) -> str:
+        entry = self._entry(api_key)
+        token = self._cached(api_key, entry)
+        if token:
+            return token
+
+        self._count("misses")
+        # Concurrent callers queue on the entry lock and reuse the first fetch.
+        with entry.lock:
+            if entry.token and entry.expires_at - time.time() > self.min_valid_seconds:
+                return entry.token
+            self._refresh(api_key, entry)
+            return entry.token
+
+    async def aget_token(self, api_key: str) -> str:
+        token = self._cached(api_key, self._entry(api_key))
+        if token:
+            return token
+        # Misses are rare once warm; fetch on a worker thread to keep the loop free.
+        return await asyncio.to_thread(self.get_token, api_key)
+
+    def invalidate(self, api_key: str) -> None:
+        entry = self._entry(api_key)
+        with entry.lock:
+            entry.token = None
+            entry.expires_at = 0.0
+
+    def stats(self) -> dict:
+        with self._counter_lock:
+            counters = dict(self._counters)
+        now = time.time()
+        with self._entries_lock:
+            entries = list(self._entries.values())
+        counters["cached_keys"] = sum(1 for e in entries if e.token and e.expires_at > now)
+        return counters
+
+    def _entry(self, api_key: str) -> _TokenEntry:
+        entry = self._entries.get(api_key)
+        if entry is None:
+            with self._entries_lock:
+                entry = self._entries.setdefault(api_key, _TokenEntry())
+        return entry
+
+    def _cached(self, api_key: str, entry: _TokenEntry) -> str | None:
+        now = time.time()
+        if not entry.token or entry.expires_at - now <= self.min_valid_seconds:
+            return None
+        self._count("hits")
+        if entry.expires_at - now <= self.refresh_margin_seconds:
+            self._schedule_refresh(api_key, entry)
+        return entry.token
+
+    def _count(self, name: str) -> None:
+        with self._counter_lock:
+            self._counters[name] += 1
+
+    def _schedule_refresh(self, api_key: str, entry: _TokenEntry) -> None:
+        with self._entries_lock:
+            if entry.refreshing:
+                return
+            entry.refreshing = True
+        threading.Thread(
+            target=self._background_refresh, args=(api_key, entry), daemon=True
+        ).start()
+
+    def _background_refresh(self, api_key: str, entry: _TokenEntry) -> None:
+        try:
+            with entry.lock:
+                if entry.expires_at - time.time() > self.refresh_margin_seconds:
+                    return
+                self._refresh(api_key, entry)
+        except Exception:
+            # The cached token stays usable; the next caller past expiry retries.
+            pass
+        finally:
+            with self._entries_lock:
+                entry.refreshing = False
+
+    def _refresh(self, api_key: str, entry: _TokenEntry) -> None:
+        try:
+            with timed("iam"):
+                token, expires_at = self._fetch(api_key)
+        except Exception as exc:
+            self._count("errors")
+            kind = "timeout" if isinstance(exc, httpx.TimeoutException) else "error"
+            count_upstream_error("iam", kind)
+            raise
+        entry.token = token
+        entry.expires_at = expires_at
+        self._count("refreshes")
+
+    def _fetch(self, api_key: str) -> tuple[str, float]:
+        data = {
+            "grant_type": "urn:ibm:params:oauth:grant-type:apikey",
+            "apikey": api_key,
+        }
+        headers = {"Content-Type": "application/x-www-form-urlencoded"}
+        if self.transport is not None:
+            resp = self.transport.post(self.token_url, data=data, headers=headers)
+        else:
+            resp = httpx.post(self.token_url, data=data, headers=headers, timeout=self.timeout)
+        resp.raise_for_status()
+        return _parse_token_response(resp.json())
+
+
+def _parse_token_response(body: dict) -> tuple[str, float]:
+    token = body["access_token"]
+    if body.get("expiration"):
+        expires_at = float(body["expiration"])
+    else:
+        expires_at = time.time() + float(body.get("expires_in", 3600))
+    return token, expires_at
+
+
+token_manager = IAMTokenManager()
@@ -0,0 +1,59 @@
+from __future__ import annotations
+
+from ..cache import TTLCache, normalize_text
+from ..singleflight import SingleFlight
+from .nlu_client import analyze_text_async, nlu_to_signals
+
+
+class CachedNLU:
+    def __init__(self, client, limiter, cache: TTLCache | None) -> None:
+        self.client = client
+        self.limiter = limiter
+        self.cache = cache
+        self.flight = SingleFlight()
+        self.hits = 0
+        self.misses = 0
+
+    async def signals(self, text: str) -> dict:
+        key = normalize_text(text)
+        if self.cache is not None:
+            compact = self.cache.get(key)
+            if compact is not None:
+                self.hits += 1
+                return _expand(compact)
+        self.misses += 1
+        compact, _ = await self.flight.do(key, lambda: self._analyze(key, text))
+        return _expand(compact)
+
+    async def _analyze(self, key: str, text: str) -> tuple[tuple[str, ...], tuple[str, ...]]:
+        async with self.limiter.slot("nlu"):
+            nlu_json = await analyze_text_async(self.client, text, self.limiter.executor("nlu"))
+        signals = nlu_to_signals(nlu_json)
+        # Keep only the extracted terms; the raw NLU payload is several KB per entry.
+        compact = (tuple(signals["keywords"]), tuple(signals["entities"]))
+        if self.cache is not None:
+            self.cache.set(key, compact)
+        return compact
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "size": len(self.cache) if self.cache is not None else 0,
+            "coalesced": self.flight.shared,
+            "upstream_calls": self.flight.leaders,
+            "sdk_loaded": self.client.loaded,
+        }
+
+
+def _expand(compact: tuple[tuple[str, ...], tuple[str, ...]]) -> dict:
+    return {"keywords": list(compact[0]), "entities": list(compact[1])}
+
+
+def build_cached_nlu(client, limiter, settings) -> CachedNLU:
+    cache = None
+    if settings.NLU_CACHE_SIZE > 0:
+        cache = TTLCache(settings.NLU_CACHE_SIZE, settings.NLU_CACHE_TTL_SECONDS)
+    return CachedNLU(client, limiter, cache)
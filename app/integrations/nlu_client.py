@@ -1,24 +1,62 @@
-from ibm_cloud_sdk_core.authenticators import IAMAuthenticator
-from ibm_watson import NaturalLanguageUnderstandingV1
-from ibm_watson.natural_language_understanding_v1 import (
-    EntitiesOptions,
-    Features,
-    KeywordsOptions,
-)
+from __future__ import annotations
 
+import asyncio
+import threading
+from concurrent.futures import Executor
+from typing import TYPE_CHECKING
 
-def build_nlu_client(api_key: str | None, url: str | None, version: str) -> NaturalLanguageUnderstandingV1:
+if TYPE_CHECKING:
+    from ibm_watson import NaturalLanguageUnderstandingV1
+
+
+class NLUClient:
+    # ibm_watson pulls in every Watson service module (~0.25s), so the SDK is
+    # imported and the service built on the first analyze call, not at startup.
+    def __init__(self, api_key: str, url: str, version: str, iam_url: str | None = None) -> None:
+        self.api_key = api_key
+        self.url = url
+        self.version = version
+        self.iam_url = iam_url
+        self._service: NaturalLanguageUnderstandingV1 | None = None
+        self._lock = threading.Lock()
+
+    @property
+    def loaded(self) -> bool:
+        return self._service is not None
+
+    def service(self) -> NaturalLanguageUnderstandingV1:
+        if self._service is None:
+            with self._lock:
+                if self._service is None:
+                    self._service = self._build()
+        return self._service
+
+    def _build(self) -> NaturalLanguageUnderstandingV1:
+        from ibm_cloud_sdk_core.authenticators import IAMAuthenticator
+        from ibm_watson import NaturalLanguageUnderstandingV1
+
+        authenticator = IAMAuthenticator(self.api_key, url=self.iam_url or None)
+        nlu = NaturalLanguageUnderstandingV1(version=self.version, authenticator=authenticator)
+        nlu.set_service_url(self.url)
+        return nlu
+
+
+def build_nlu_client(
+    api_key: str | None, url: str | None, version: str, iam_url: str | None = None
+) -> NLUClient:
     if not api_key or not url:
         raise RuntimeError("Missing NLU_API_KEY or NLU_URL")
+    return NLUClient(api_key, url, version, iam_url)
 
-    authenticator = IAMAuthenticator(api_key)
-    nlu = NaturalLanguageUnderstandingV1(version=version, authenticator=authenticator)
-    nlu.set_service_url(url)
-    return nlu
 
+def analyze_text(nlu: NLUClient, text: str) -> dict:
+    from ibm_watson.natural_language_understanding_v1 import (
+        EntitiesOptions,
+        Features,
+        KeywordsOptions,
+    )
 
-def analyze_text(nlu: NaturalLanguageUnderstandingV1, text: str) -> dict:
-    response = nlu.analyze(
+    response = nlu.service().analyze(
         text=text,
         features=Features(
             keywords=KeywordsOptions(limit=8),
@@ -28,6 +66,13 @@ def analyze_text(nlu: NaturalLanguageUnderstandingV1, text: str) -> dict:
     return response
 
 
+async def analyze_text_async(
+    nlu: NLUClient, text: str, executor: Executor | None = None
+) -> dict:
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(executor, analyze_text, nlu, text)
+
+
 def nlu_to_signals(nlu_json: dict) -> dict:
     keywords = [k.get("text", "").lower() for k in nlu_json.get("keywords", [])]
     entities = [e.get("text", "").lower() for e in nlu_json.get("entities", [])]
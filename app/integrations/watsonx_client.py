@@ -1,25 +1,21 @@
 from __future__ import annotations
 
+import json
 import time
-from typing import Any
+from typing import Any, AsyncIterator
 
-import requests
+import httpx
 
-IAM_TOKEN_URL = "https://iam.cloud.ibm.com/identity/token"
+from ..metrics import observe, timed
+from .http_client import AsyncPooledTransport
+from .iam_token import IAMTokenManager, token_manager
 
-
-def _get_iam_token(api_key: str) -> str:
-    data = {
-        "grant_type": "urn:ibm:params:oauth:grant-type:apikey",
-        "apikey": api_key,
-    }
-    headers = {"Content-Type": "application/x-www-form-urlencoded"}
-    resp = requests.post(IAM_TOKEN_URL, data=data, headers=headers, timeout=30)
-    resp.raise_for_status()
-    return resp.json()["access_token"]
+# Stands in for the technician's name in the prompt, so one generated reply can be
+# reused whoever is sent; callers fill in the name before showing it.
+TECH_PLACEHOLDER = "[technician]"
 
 
-def generate_message(
+async def agenerate_message(
     api_key: str,
     base_url: str,
     project_id: str,
@@ -27,20 +23,109 @@ def generate_message(
     user_message: str,
     metadata: dict,
     version: str,
+    transport: AsyncPooledTransport,
+    tokens: IAMTokenManager | None = None,
+    snippets: list[str] | None = None,
 ) -> str:
+    check_config(api_key, base_url, project_id, model_id, version)
+    tokens = tokens or token_manager
+    token = await tokens.aget_token(api_key)
+    url, payload, headers = _build_request(
+        token, base_url, project_id, model_id, user_message, metadata, version, snippets
+    )
+    with timed("llm"):
+        resp = await transport.post(url, json=payload, headers=headers)
+    if resp.status_code == 401:
+        tokens.invalidate(api_key)
+    if not resp.is_success:
+        raise _status_error(resp, resp.text)
+    return _parse_response(resp.json())
+
+
+async def astream_message(
+    api_key: str,
+    base_url: str,
+    project_id: str,
+    model_id: str,
+    user_message: str,
+    metadata: dict,
+    version: str,
+    transport: AsyncPooledTransport,
+    tokens: IAMTokenManager | None = None,
+    snippets: list[str] | None = None,
+) -> AsyncIterator[str]:
+    check_config(api_key, base_url, project_id, model_id, version)
+    tokens = tokens or token_manager
+    token = await tokens.aget_token(api_key)
+    url, payload, headers = _build_request(
+        token, base_url, project_id, model_id, user_message, metadata, version, snippets
+    )
+    url = url.replace("/text/generation?", "/text/generation_stream?", 1)
+    headers["Accept"] = "text/event-stream"
+    start = time.perf_counter()
+    try:
+        async with transport.client.stream("POST", url, json=payload, headers=headers) as resp:
+            if resp.status_code == 401:
+                tokens.invalidate(api_key)
+            if not resp.is_success:
+                body = (await resp.aread()).decode("utf-8", "replace")
+                raise _status_error(resp, body)
+            async for line in resp.aiter_lines():
+                if not line.startswith("data:"):
+                    continue
+                try:
+                    data = json.loads(line[5:].strip())
+                except ValueError:
+                    continue
+                for result in data.get("results", []):
+                    chunk = result.get("generated_text", "")
+                    if chunk:
+                        yield chunk
+    finally:
+        observe("llm", time.perf_counter() - start)
+
+
+def _status_error(resp: httpx.Response, body: str) -> httpx.HTTPStatusError:
+    # Keeps the status on the exception so the breaker can tell 4xx from 5xx.
+    return httpx.HTTPStatusError(
+        f"watsonx error {resp.status_code}: {body}", request=resp.request, response=resp
+    )
+
+
+def check_config(
+    api_key: str, base_url: str, project_id: str, model_id: str, version: str
+) -> None:
     if not api_key or not base_url or not project_id or not model_id or not version:
         raise RuntimeError(
             "Missing WATSONX_API_KEY, WATSONX_URL, WATSONX_PROJECT_ID, "
             "WATSONX_MODEL_ID, or WATSONX_VERSION"
         )
 
-    token = _get_iam_token(api_key)
+
+def _build_request(
+    token: str,
+    base_url: str,
+    project_id: str,
+    model_id: str,
+    user_message: str,
+    metadata: dict,
+    version: str,
+    snippets: list[str] | None = None,
+) -> tuple[str, dict[str, Any], dict[str, str]]:
     url = f"{base_url.rstrip('/')}/ml/v1/text/generation?version={version}"
+    reference = ""
+    if snippets:
+        reference = (
+            "Reference notes from our manuals and safety SOPs (use only if relevant):\n"
+            + "".join(f"- {snippet}\n" for snippet in snippets)
+        )
     prompt = (
         "System: You are a helpful dispatch assistant. Write 2 to 4 short sentences, "
         "maximum 60 words. Must include ETA minutes and ask for a location pin or nearby landmark. "
         "Be empathetic and action-focused. Do not add extra commentary. "
+        "Write the technician exactly as given in the dispatch details. "
         "Return only the message text.\n"
+        f"{reference}"
         f"User message: {user_message}\n"
         f"Dispatch details: {metadata}\n"
         "Message:"
@@ -61,11 +146,10 @@ def generate_message(
         "Authorization": f"Bearer {token}",
         "Content-Type": "application/json",
     }
-    start = time.time()
-    resp = requests.post(url, json=payload, headers=headers, timeout=60)
-    if not resp.ok:
-        raise RuntimeError(f"watsonx error {resp.status_code}: {resp.text}")
-    data = resp.json()
+    return url, payload, headers
+
+
+def _parse_response(data: dict) -> str:
     results = data.get("results", [])
     if not results:
         raise RuntimeError("No generation results from watsonx.ai")
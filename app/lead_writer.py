@@ -0,0 +1,281 @@
+from __future__ import annotations
+
+import asyncio
+import glob
+import json
+import logging
+import os
+import queue
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+
+from sqlalchemy import select
+
+from .db import Lead, SessionLocal, insert_leads
+from .metrics import observe
+
+logger = logging.getLogger(__name__)
+
+_STOP = object()
+
+
+class LeadWriter:
+    def __init__(
+        self,
+        batch_size: int = 200,
+        flush_interval: float = 0.05,
+        max_queue: int = 10000,
+        enqueue_timeout: float = 2.0,
+        max_attempts: int = 3,
+        session_factory=SessionLocal,
+        spill_path: str | None = None,
+    ) -> None:
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.enqueue_timeout = enqueue_timeout
+        self.max_attempts = max_attempts
+        # Callers already hold a lead_id, so a batch the database keeps refusing is
+        # written here and replayed on the next start instead of being thrown away.
+        self.spill_path = Path(spill_path) if spill_path else None
+        self._session_factory = session_factory
+        self._queue: queue.Queue = queue.Queue(maxsize=max_queue)
+        self._thread: threading.Thread | None = None
+        self._stopping = threading.Event()
+        self._stats_lock = threading.Lock()
+        self._stats = {
+            "enqueued": 0,
+            "flushed": 0,
+            "batches": 0,
+            "errors": 0,
+            "spilled": 0,
+            "replayed": 0,
+            "dropped": 0,
+            "backpressure_waits": 0,
+            "last_flush_ms": 0.0,
+            "max_flush_ms": 0.0,
+            "total_flush_ms": 0.0,
+        }
+
+    def start(self) -> None:
+        if self._thread is not None:
+            return
+        self._stopping.clear()
+        self._thread = threading.Thread(target=self._run, name="lead-writer", daemon=True)
+        self._thread.start()
+
+    async def asubmit(self, row: dict) -> None:
+        try:
+            self._queue.put_nowait(row)
+        except queue.Full:
+            self._count("backpressure_waits")
+            # Raises queue.Full if the writer cannot catch up within the timeout.
+            await asyncio.to_thread(self._queue.put, row, True, self.enqueue_timeout)
+        self._count("enqueued")
+
+    def stop(self, timeout: float | None = 30.0) -> None:
+        if self._thread is None:
+            return
+        self._stopping.set()
+        try:
+            # Wakes a writer idling on an empty queue; with a full one it is busy anyway
+            # and sees the event once the queue drains.
+            self._queue.put_nowait(_STOP)
+        except queue.Full:
+            pass
+        self._thread.join(timeout)
+        if self._thread.is_alive():
+            # The writer is stuck, most likely on a database that stopped answering;
+            # what it has not taken yet goes to the spill file for the next start.
+            rows = []
+            while True:
+                try:
+                    item = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is not _STOP:
+                    rows.append(item)
+            logger.error(
+                "Lead writer did not stop within %ss; %s queued leads left to spill",
+                timeout,
+                len(rows),
+            )
+            if rows:
+                self._spill(rows)
+        self._thread = None
+
+    def stats(self) -> dict:
+        with self._stats_lock:
+            stats = dict(self._stats)
+        total = stats.pop("total_flush_ms")
+        stats["avg_flush_ms"] = round(total / stats["batches"], 3) if stats["batches"] else 0.0
+        stats["queue_depth"] = self._queue.qsize()
+        return stats
+
+    def _run(self) -> None:
+        self._replay()
+        stopping = False
+        while not stopping:
+            batch: list[dict] = []
+            try:
+                item = self._queue.get(timeout=self.flush_interval)
+            except queue.Empty:
+                stopping = self._stopping.is_set()
+                continue
+            deadline = time.monotonic() + self.flush_interval
+            while True:
+                if item is _STOP:
+                    stopping = True
+                else:
+                    batch.append(item)
+                if stopping or len(batch) >= self.batch_size:
+                    break
+                remaining = deadline - time.monotonic()
+                try:
+                    item = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+                except queue.Empty:
+                    break
+            if stopping:
+                # Drain whatever arrived before shutdown so no accepted lead is lost.
+                while True:
+                    try:
+                        item = self._queue.get_nowait()
+                    except queue.Empty:
+                        break
+                    if item is not _STOP:
+                        batch.append(item)
+            for start in range(0, len(batch), self.batch_size):
+                self._flush(batch[start:start + self.batch_size])
+
+    def _flush(self, rows: list[dict]) -> bool:
+        if not rows:
+            return True
+        for attempt in range(1, self.max_attempts + 1):
+            start = time.perf_counter()
+            db = self._session_factory()
+            try:
+                insert_leads(db, rows)
+                db.commit()
+            except Exception:
+                db.rollback()
+                self._count("errors")
+                logger.exception("Lead flush failed (attempt %s/%s)", attempt, self.max_attempts)
+                time.sleep(min(0.05 * 2 ** attempt, 1.0))
+                continue
+            finally:
+                db.close()
+            elapsed_ms = (time.perf_counter() - start) * 1000
+            observe("db_commit", elapsed_ms / 1000)
+            with self._stats_lock:
+                self._stats["flushed"] += len(rows)
+                self._stats["batches"] += 1
+                self._stats["last_flush_ms"] = round(elapsed_ms, 3)
+                self._stats["max_flush_ms"] = round(max(self._stats["max_flush_ms"], elapsed_ms), 3)
+                self._stats["total_flush_ms"] += elapsed_ms
+            return True
+        self._spill(rows)
+        return False
+
+    def _spill(self, rows: list[dict]) -> None:
+        if self.spill_path is None:
+            self._count("dropped", len(rows))
+            return
+        try:
+            with self.spill_path.open("a", encoding="utf-8") as f:
+                f.write("".join(json.dumps(row, default=str) + "\n" for row in rows))
+                f.flush()
+                os.fsync(f.fileno())
+        except OSError:
+            logger.exception("Spilling %s leads to %s failed", len(rows), self.spill_path)
+            self._count("dropped", len(rows))
+            return
+        logger.error(
+            "Spilled %s leads to %s; they are replayed on the next start",
+            len(rows),
+            self.spill_path,
+        )
+        self._count("spilled", len(rows))
+
+    def _replay(self) -> None:
+        if self.spill_path is None:
+            return
+        # Renaming claims the file, so of several workers starting together only one
+        # replays it; anything that fails again is spilled to a fresh file. A worker
+        # that died mid-replay leaves its claimed file behind, so those go first,
+        # starting with one a previous process with our pid left under our name.
+        claimed = self.spill_path.with_name(f"{self.spill_path.name}.{os.getpid()}.replay")
+        for path in [claimed, *self._abandoned(), self.spill_path]:
+            try:
+                os.replace(path, claimed)
+            except FileNotFoundError:
+                continue
+            self._replay_file(claimed)
+
+    def _abandoned(self) -> list[Path]:
+        prefix = f"{self.spill_path.name}."
+        abandoned = []
+        for path in self.spill_path.parent.glob(f"{glob.escape(prefix)}*.replay"):
+            pid = path.name[len(prefix):-len(".replay")]
+            if pid.isdigit() and int(pid) != os.getpid() and not _alive(int(pid)):
+                abandoned.append(path)
+        return abandoned
+
+    def _replay_file(self, claimed: Path) -> None:
+        rows = []
+        with claimed.open(encoding="utf-8") as f:
+            for line in f:
+                try:
+                    row = json.loads(line)
+                except ValueError:
+                    # A line cut short by a crash while spilling.
+                    logger.warning("Skipping an unreadable line in %s", claimed)
+                    continue
+                if row.get("created_at"):
+                    row["created_at"] = datetime.fromisoformat(row["created_at"])
+                rows.append(row)
+        for start in range(0, len(rows), self.batch_size):
+            batch = self._unsaved(rows[start:start + self.batch_size])
+            if self._flush(batch):
+                self._count("replayed", len(batch))
+        claimed.unlink()
+        logger.info("Replayed %s spilled leads from %s", len(rows), claimed)
+
+    def _unsaved(self, rows: list[dict]) -> list[dict]:
+        # A batch can reach the database and still report an error; replaying it must
+        # not insert, or count in the rollups, the same lead twice.
+        db = self._session_factory()
+        try:
+            saved = set(db.scalars(select(Lead.id).where(Lead.id.in_([r["id"] for r in rows]))))
+        except Exception:
+            return rows
+        finally:
+            db.close()
+        return [row for row in rows if row["id"] not in saved]
+
+    def _count(self, name: str, amount: int = 1) -> None:
+        with self._stats_lock:
+            self._stats[name] += amount
+
+
+def _alive(pid: int) -> bool:
+    if os.name != "posix":
+        # Signal 0 only probes on POSIX; elsewhere os.kill would end the process.
+        return True
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def build_lead_writer(settings) -> LeadWriter:
+    return LeadWriter(
+        batch_size=settings.LEAD_BATCH_SIZE,
+        flush_interval=settings.LEAD_FLUSH_INTERVAL_MS / 1000,
+        max_queue=settings.LEAD_QUEUE_SIZE,
+        enqueue_timeout=settings.LEAD_ENQUEUE_TIMEOUT,
+        spill_path=settings.LEAD_SPILL_PATH or None,
+    )
@@ -0,0 +1,159 @@
+from __future__ import annotations
+
+import base64
+import csv
+import io
+import json
+from datetime import datetime, timedelta
+from typing import Iterator
+
+from sqlalchemy import select, tuple_
+from sqlalchemy.orm import Session
+
+from .db import ROLLUP_DIMENSIONS, Lead, LeadRollup
+
+LEAD_FILTERS = ("priority", "status", "zone_id", "intent", "tech_assigned")
+EXPORT_COLUMNS = (
+    "id",
+    "created_at",
+    "customer_message",
+    "intent",
+    "priority",
+    "revenue_tier",
+    "territory_code",
+    "zone_id",
+    "service_tier",
+    "tech_assigned",
+    "quote_min",
+    "quote_max",
+    "status",
+)
+EXPORT_BATCH_SIZE = 1000
+
+
+def encode_cursor(created_at: datetime, lead_id: str) -> str:
+    raw = f"{created_at.isoformat()}|{lead_id}".encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> tuple[datetime, str]:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        created_at, _, lead_id = base64.urlsafe_b64decode(padded).decode("utf-8").partition("|")
+        return datetime.fromisoformat(created_at), lead_id
+    except (ValueError, UnicodeDecodeError) as exc:
+        raise ValueError("Invalid cursor") from exc
+
+
+def page_leads(
+    db: Session,
+    limit: int = 50,
+    cursor: str | None = None,
+    since: datetime | None = None,
+    until: datetime | None = None,
+    **filters: str | None,
+) -> tuple[list[Lead], str | None]:
+    query = select(Lead)
+    for name in LEAD_FILTERS:
+        value = filters.get(name)
+        if value is not None:
+            query = query.where(getattr(Lead, name) == value)
+    if since is not None:
+        query = query.where(Lead.created_at >= since)
+    if until is not None:
+        query = query.where(Lead.created_at < until)
+    if cursor:
+        query = query.where(tuple_(Lead.created_at, Lead.id) < decode_cursor(cursor))
+    query = query.order_by(Lead.created_at.desc(), Lead.id.desc()).limit(limit + 1)
+
+    leads = list(db.scalars(query))
+    next_cursor = None
+    if len(leads) > limit:
+        leads = leads[:limit]
+        last = leads[-1]
+        next_cursor = encode_cursor(last.created_at, last.id)
+    return leads, next_cursor
+
+
+def _rollup_totals(rollup: LeadRollup) -> dict:
+    return {
+        "count": rollup.count,
+        "quote_min_sum": rollup.quote_min_sum,
+        "quote_max_sum": rollup.quote_max_sum,
+    }
+
+
+def lead_stats(db: Session, hours: int = 24, now: datetime | None = None) -> dict:
+    # Reads only rollup rows: the cost follows the number of distinct values and
+    # hours asked for, never the number of leads.
+    now = now or datetime.utcnow()
+    since = (now - timedelta(hours=hours - 1)).strftime("%Y-%m-%dT%H:00")
+    stats: dict = {"total": {"count": 0, "quote_min_sum": 0, "quote_max_sum": 0}}
+    for name in ROLLUP_DIMENSIONS:
+        stats[f"by_{name}"] = {}
+    rollups = db.scalars(select(LeadRollup).where(LeadRollup.dimension != "hour"))
+    for rollup in rollups:
+        if rollup.dimension == "all":
+            stats["total"] = _rollup_totals(rollup)
+        elif rollup.dimension in ROLLUP_DIMENSIONS and rollup.count:
+            stats[f"by_{rollup.dimension}"][rollup.value or "none"] = _rollup_totals(rollup)
+    hourly = db.scalars(
+        select(LeadRollup)
+        .where(LeadRollup.dimension == "hour", LeadRollup.value >= since)
+        .order_by(LeadRollup.value)
+    )
+    stats["hourly"] = [{"hour": rollup.value, **_rollup_totals(rollup)} for rollup in hourly]
+    return stats
+
+
+def iter_export_rows(
+    db: Session,
+    since: datetime | None = None,
+    until: datetime | None = None,
+    cursor: str | None = None,
+    batch_size: int = EXPORT_BATCH_SIZE,
+) -> Iterator[tuple]:
+    # Oldest first, so a cursor taken from the last row received resumes the export.
+    query = select(*(getattr(Lead, name) for name in EXPORT_COLUMNS))
+    if since is not None:
+        query = query.where(Lead.created_at >= since)
+    if until is not None:
+        query = query.where(Lead.created_at < until)
+    if cursor:
+        query = query.where(tuple_(Lead.created_at, Lead.id) > decode_cursor(cursor))
+    query = query.order_by(Lead.created_at, Lead.id).execution_options(yield_per=batch_size)
+    # Plain tuples streamed in batches: no ORM objects and no full result in memory.
+    yield from db.execute(query).tuples()
+
+
+def export_ndjson(rows: Iterator[tuple], batch_size: int = EXPORT_BATCH_SIZE) -> Iterator[str]:
+    lines = []
+    for row in rows:
+        record = dict(zip(EXPORT_COLUMNS, row))
+        record["created_at"] = row[1].isoformat()
+        record["cursor"] = encode_cursor(row[1], row[0])
+        lines.append(json.dumps(record, ensure_ascii=False))
+        if len(lines) >= batch_size:
+            yield "\n".join(lines) + "\n"
+            lines.clear()
+    if lines:
+        yield "\n".join(lines) + "\n"
+
+
+def export_csv(rows: Iterator[tuple], batch_size: int = EXPORT_BATCH_SIZE) -> Iterator[str]:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(EXPORT_COLUMNS + ("cursor",))
+    pending = 0
+    for row in rows:
+        created_at = row[1]
+        writer.writerow(
+            (row[0], created_at.isoformat(), *row[2:], encode_cursor(created_at, row[0]))
+        )
+        pending += 1
+        if pending >= batch_size:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+            pending = 0
+    yield buffer.getvalue()
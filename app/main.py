@@ -2,9 +2,20 @@ from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
 from .api import router
-from .data.load import load_locale, load_techs, load_territory
+from .cache import build_message_cache
+from .coalesce import build_chat_coalescer
+from .concurrency import build_stage_limiter
+from .data.registry import build_locale_registry
 from .db import init_db
+from .integrations.http_client import build_async_transport, build_transport
+from .integrations.iam_token import IAMTokenManager
+from .integrations.nlu_cache import build_cached_nlu
 from .integrations.nlu_client import build_nlu_client
+from .lead_writer import build_lead_writer
+from .metrics import ServerTimingMiddleware
+from .rag.lazy import build_rag_store
+from .reservations import build_reservations
+from .resilience import build_breakers
 from .settings import settings
 
 app = FastAPI(title="Universal Dispatcher API")
@@ -12,18 +23,46 @@ app = FastAPI(title="Universal Dispatcher API")
 
 @app.on_event("startup")
 def startup() -> None:
-    app.state.locale = load_locale()
-    app.state.territory = load_territory()
-    app.state.techs = load_techs()
+    app.state.locales = build_locale_registry(settings)
+    app.state.locales.start()
     app.state.settings = settings
+    app.state.transport = build_transport(settings)
+    app.state.async_transport = build_async_transport(settings)
+    app.state.stage_limiter = build_stage_limiter(settings)
+    app.state.message_cache = build_message_cache(settings)
+    app.state.chat_coalescer = build_chat_coalescer(settings)
+    app.state.reservations = build_reservations(settings)
+    app.state.breakers = build_breakers(settings)
+    app.state.rag_store = build_rag_store(settings)
+    app.state.token_manager = IAMTokenManager(
+        token_url=settings.WATSONX_IAM_URL,
+        transport=app.state.transport,
+    )
     app.state.nlu_client = None
     if settings.NLU_API_KEY and settings.NLU_URL:
         app.state.nlu_client = build_nlu_client(
             api_key=settings.NLU_API_KEY,
             url=settings.NLU_URL,
             version=settings.NLU_VERSION,
+            iam_url=settings.NLU_IAM_URL,
+        )
+    app.state.nlu = None
+    if app.state.nlu_client:
+        app.state.nlu = build_cached_nlu(
+            app.state.nlu_client, app.state.stage_limiter, settings
         )
     init_db()
+    app.state.lead_writer = build_lead_writer(settings)
+    app.state.lead_writer.start()
+
+
+@app.on_event("shutdown")
+async def shutdown() -> None:
+    app.state.locales.stop()
+    app.state.lead_writer.stop()
+    await app.state.async_transport.aclose()
+    app.state.transport.close()
+    app.state.stage_limiter.shutdown()
 
 
 if settings.APP_ENV == "dev":
@@ -35,4 +74,5 @@ if settings.APP_ENV == "dev":
         allow_headers=["*"],
     )
 
+app.add_middleware(ServerTimingMiddleware)
 app.include_router(router)
@@ -6,6 +6,8 @@ class ChatRequest(BaseModel):
     message: str
     when_iso: Optional[str] = None
     channel: Optional[str] = None
+    use_cache: Optional[bool] = True
+    session_id: Optional[str] = None
 
 
 class ChatResponse(BaseModel):
@@ -15,8 +17,27 @@ class ChatResponse(BaseModel):
     tech_card: Optional[Dict[str, Any]] = None
 
 
+class ChatBatchRequest(BaseModel):
+    messages: list[ChatRequest]
+
+
+class ChatBatchItem(BaseModel):
+    index: int
+    ok: bool
+    response: Optional[ChatResponse] = None
+    error: Optional[str] = None
+
+
+class ChatBatchResponse(BaseModel):
+    results: list[ChatBatchItem]
+    succeeded: int
+    failed: int
+
+
 class SkillSignals(BaseModel):
     message: str
+    channel: Optional[str] = None
+    session_id: Optional[str] = None
     nlu_keywords: Optional[list[str]] = None
     nlu_entities: Optional[list[str]] = None
 
@@ -27,6 +48,23 @@ class SkillTriageResponse(BaseModel):
     revenue_tier: str
 
 
+class SkillTriageBatchRequest(BaseModel):
+    items: list[SkillSignals]
+
+
+class SkillTriageBatchItem(BaseModel):
+    index: int
+    ok: bool
+    result: Optional[SkillTriageResponse] = None
+    error: Optional[str] = None
+
+
+class SkillTriageBatchResponse(BaseModel):
+    results: list[SkillTriageBatchItem]
+    succeeded: int
+    failed: int
+
+
 class SkillTerritoryResponse(BaseModel):
     territory_code: str
     zone_id: str
@@ -36,11 +74,26 @@ class SkillTerritoryResponse(BaseModel):
 
 class SkillAssignResponse(BaseModel):
     tech_id: Optional[str]
-    eta_minutes: int
+    eta_minutes: Optional[int]
     service_tier: str
+    reservation_id: Optional[str] = None
+    reservation_expires_at: Optional[str] = None
+    reservation_status: Optional[str] = None
 
 
 class SkillQuoteResponse(BaseModel):
     quote_min: int
     quote_max: int
     currency: str
+
+
+class SkillDispatchResponse(BaseModel):
+    triage: SkillTriageResponse
+    territory: SkillTerritoryResponse
+    assignment: SkillAssignResponse
+    quote: SkillQuoteResponse
+
+
+class TechUpdate(BaseModel):
+    current_status: Optional[str] = None
+    base_location: Optional[Dict[str, Any]] = None
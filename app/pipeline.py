@@ -0,0 +1,629 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+import queue
+import uuid
+from datetime import datetime
+from typing import AsyncIterator
+
+from .cache import cache_key, normalize_text
+from .data.snapshot import DataSnapshot
+from .db import SessionLocal, insert_leads
+from .domain.orchestrator import DISPATCH_INTENTS, DispatchContext, handle_chat
+from .integrations.watsonx_client import (
+    TECH_PLACEHOLDER,
+    agenerate_message,
+    astream_message,
+    check_config,
+)
+from .metrics import timed
+from .reservations import TechReservations
+from .resilience import (
+    Deadline,
+    DeadlineExceeded,
+    fallback_path,
+    guarded_call,
+    upstream_failure,
+)
+
+logger = logging.getLogger(__name__)
+
+SAFETY_PREFIX = "If safe, switch off the unit and keep clear of smoke or sparks. "
+# Differ from one dispatch to the next, so they are kept out of the prompt and the reply
+# cache key; the technician's name is filled into the reply when it is sent.
+REQUEST_ONLY_METADATA = (
+    "reservation_id",
+    "reservation_expires_at",
+    "reservation_status",
+    "tech_assigned",
+    "tech_name",
+)
+
+
+def empty_signals() -> dict:
+    return {"keywords": [], "entities": []}
+
+
+def request_deadline(settings, timeout_ms: str | None = None) -> Deadline:
+    budget_ms = settings.CHAT_BUDGET_MS
+    if timeout_ms:
+        try:
+            budget_ms = min(budget_ms, max(0.0, float(timeout_ms)))
+        except ValueError:
+            pass
+    return Deadline(budget_ms / 1000)
+
+
+async def run_nlu(
+    state, message: str, deadline: Deadline | None = None
+) -> tuple[dict, str | None]:
+    if not state.nlu:
+        return empty_signals(), None
+    # NLU only enriches triage, so it must leave the LLM its share of the budget.
+    reserve = state.settings.CHAT_LLM_RESERVE_MS / 1000
+    try:
+        with timed("nlu"):
+            signals = await guarded_call(
+                state.breakers["nlu"], lambda: state.nlu.signals(message), deadline, reserve
+            )
+        return signals, None
+    except Exception as exc:
+        return empty_signals(), str(exc)
+
+
+async def locale_data(state, locale: str) -> DataSnapshot:
+    data = state.locales.peek(locale)
+    if data is None:
+        # First use of a cold locale reads and compiles its files; keep that off the loop.
+        data = await asyncio.to_thread(state.locales.snapshot, locale)
+    return data
+
+
+async def prepare_dispatch(
+    state,
+    locale: str,
+    message: str,
+    when_iso: str | None,
+    deadline: Deadline | None = None,
+    session_id: str | None = None,
+) -> tuple[dict, dict, str | None]:
+    data = await locale_data(state, locale)
+    signals, nlu_error = await run_nlu(state, message, deadline)
+    args = (data, locale, message, when_iso, signals, state.reservations, session_id)
+    context = dispatch_context(*args)
+    if state.reservations is not None and context.triage["intent"] in DISPATCH_INTENTS:
+        # The lease is a write that can wait on another worker's lock; keep it off the loop.
+        # Other replies only read the store, and a WAL reader never waits on a writer.
+        response = await asyncio.to_thread(triage, *args, context)
+    else:
+        response = triage(*args, context)
+    return response, signals, nlu_error
+
+
+def dispatch_context(
+    data: DataSnapshot,
+    locale: str,
+    message: str,
+    when_iso: str | None,
+    signals: dict,
+    reservations: TechReservations | None = None,
+    session_id: str | None = None,
+) -> DispatchContext:
+    return DispatchContext(
+        message,
+        data.locale,
+        data.territory,
+        data.techs,
+        signals=signals,
+        triage_matcher=data.triage_matcher,
+        territory_index=data.territory_index,
+        tech_registry=data.tech_registry,
+        reservations=reservations,
+        locale_name=locale,
+        conversation=session_id,
+        scheduler=data.scheduler,
+    )
+
+
+def triage(
+    data: DataSnapshot,
+    locale: str,
+    message: str,
+    when_iso: str | None,
+    signals: dict,
+    reservations: TechReservations | None = None,
+    session_id: str | None = None,
+    context: DispatchContext | None = None,
+) -> dict:
+    with timed("orchestrator"):
+        response = handle_chat(
+            message=message,
+            when_iso=when_iso,
+            locale=data.locale,
+            territory=data.territory,
+            techs=data.techs,
+            signals=signals,
+            triage_matcher=data.triage_matcher,
+            territory_index=data.territory_index,
+            tech_registry=data.tech_registry,
+            scheduler=data.scheduler,
+            context=context,
+            reservations=reservations,
+            locale_name=locale,
+            conversation=session_id,
+        )
+    # Part of the metadata, so cached replies are never shared across cities.
+    response["metadata"]["locale"] = locale
+    return response
+
+
+def check_watsonx_config(settings) -> None:
+    check_config(
+        settings.WATSONX_API_KEY,
+        settings.WATSONX_URL,
+        settings.WATSONX_PROJECT_ID,
+        settings.WATSONX_MODEL_ID,
+        settings.WATSONX_VERSION,
+    )
+
+
+async def retrieve_snippets(
+    state, message: str, deadline: Deadline | None = None
+) -> list[str]:
+    store = state.rag_store
+    if store is None:
+        return []
+    settings = state.settings
+    search = asyncio.to_thread(store.query, message, settings.RAG_TOP_K, settings.RAG_MIN_SCORE)
+    try:
+        # A slow search over a large index must not spend the budget the LLM call needs;
+        # without snippets the call below still runs, or falls back, on time.
+        hits = await (search if deadline is None else deadline.run(search))
+    except DeadlineExceeded:
+        logger.warning("RAG retrieval ran out of the request budget")
+        return []
+    except Exception:
+        logger.exception("RAG retrieval failed")
+        return []
+    return [hit["text"][: settings.RAG_SNIPPET_CHARS] for hit in hits]
+
+
+async def run_llm(
+    state, message: str, metadata: dict, deadline: Deadline | None = None
+) -> str:
+    settings = state.settings
+    # A missing configuration is not an upstream failure and must not trip the breaker.
+    check_watsonx_config(settings)
+    snippets = await retrieve_snippets(state, message, deadline)
+
+    async def call() -> str:
+        async with state.stage_limiter.slot("llm"):
+            return await agenerate_message(
+                api_key=settings.WATSONX_API_KEY,
+                base_url=settings.WATSONX_URL,
+                project_id=settings.WATSONX_PROJECT_ID,
+                model_id=settings.WATSONX_MODEL_ID,
+                user_message=message,
+                metadata=prompt_metadata(metadata),
+                version=settings.WATSONX_VERSION,
+                transport=state.async_transport,
+                tokens=state.token_manager,
+                snippets=snippets,
+            )
+
+    return await guarded_call(state.breakers["watsonx"], call, deadline)
+
+
+async def generate_reply(
+    state,
+    message: str,
+    metadata: dict,
+    use_cache: bool = True,
+    deadline: Deadline | None = None,
+) -> tuple[str, str]:
+    cache = state.message_cache
+    if cache is None or not use_cache:
+        return await run_llm(state, message, metadata, deadline), "bypass"
+    key = await reply_cache_key(state, message, metadata)
+    cached = await cache.aget(key)
+    if cached is not None:
+        return cached, "hit"
+    text = await run_llm(state, message, metadata, deadline)
+    await cache.aset(key, text)
+    return text, "miss"
+
+
+def keeps_template(metadata: dict) -> bool:
+    # A booking outcome (booked, unavailable, no technician free, a bad time) has to
+    # reach the customer as stated, openings and all; the LLM is asked for an ETA
+    # and would word it as a dispatch.
+    return bool(metadata.get("schedule_status"))
+
+
+async def complete_reply(
+    state,
+    message: str,
+    response: dict,
+    use_cache: bool = True,
+    deadline: Deadline | None = None,
+) -> None:
+    metadata = response["metadata"]
+    if keeps_template(metadata):
+        metadata["watsonx_used"] = False
+        metadata["response_path"] = "template"
+        return
+    try:
+        agent_message, cache_status = await generate_reply(
+            state, message, metadata, use_cache=use_cache, deadline=deadline
+        )
+        agent_message = fill_technician(agent_message, metadata)
+        response["agent_message"] = apply_safety_prefix(agent_message, metadata)
+        metadata["watsonx_used"] = True
+        metadata["llm_cache"] = cache_status
+        metadata["response_path"] = "cache" if cache_status == "hit" else "llm"
+    except Exception as exc:
+        # handle_chat already built a templated agent_message; keep it as the reply.
+        metadata["watsonx_error"] = str(exc)
+        metadata["watsonx_used"] = False
+        metadata["response_path"] = fallback_path(exc)
+
+
+async def dispatch_batch(
+    state, items: list, concurrency: int, locale: str | None = None
+) -> list[dict]:
+    settings = state.settings
+    limit = asyncio.Semaphore(concurrency)
+
+    # Each item gets its own budget once it is admitted, so queueing behind the rest
+    # of the batch does not eat into it.
+    async def nlu(message: str) -> tuple[dict, str | None]:
+        async with limit:
+            return await run_nlu(state, message, request_deadline(settings))
+
+    async def reply(item, response: dict) -> None:
+        async with limit:
+            await complete_reply(
+                state,
+                item.message,
+                response,
+                use_cache=item.use_cache is not False,
+                deadline=request_deadline(settings),
+            )
+
+    # A locale from the X-Locale header is already resolved and applies to every item.
+    locales = [
+        locale or state.locales.resolve(None, item.channel, item.message) for item in items
+    ]
+    data: dict[str, DataSnapshot | Exception] = {}
+    for name in dict.fromkeys(locales):
+        try:
+            data[name] = await locale_data(state, name)
+        except Exception as exc:
+            data[name] = exc
+    nlu_results = await asyncio.gather(*(nlu(item.message) for item in items))
+
+    # Triage, territory and technician matching are CPU-only, so the whole batch
+    # goes through them in one pass instead of interleaving with upstream waits.
+    results: list[dict] = []
+    dispatched: list[tuple[int, dict]] = []
+
+    def triage_all() -> None:
+        for index, item in enumerate(items):
+            try:
+                locale_snapshot = data[locales[index]]
+                if isinstance(locale_snapshot, Exception):
+                    raise locale_snapshot
+                response = triage(
+                    locale_snapshot,
+                    locales[index],
+                    item.message,
+                    item.when_iso,
+                    nlu_results[index][0],
+                    state.reservations,
+                    item.session_id,
+                )
+            except Exception as exc:
+                results.append({"index": index, "ok": False, "error": str(exc)})
+                continue
+            results.append({"index": index, "ok": True, "response": response})
+            dispatched.append((index, response))
+
+    if state.reservations is None:
+        triage_all()
+    else:
+        # One lease write per item; run them in a thread rather than back to back on the loop.
+        await asyncio.to_thread(triage_all)
+
+    try:
+        await asyncio.gather(
+            *(reply(items[index], response) for index, response in dispatched)
+        )
+        rows = []
+        for index, response in dispatched:
+            signals, nlu_error = nlu_results[index]
+            attach_signals(response["metadata"], signals, nlu_error)
+            row = lead_row(items[index].message, response["metadata"])
+            response["metadata"]["lead_id"] = row["id"]
+            rows.append(row)
+        if rows:
+            await state.stage_limiter.run_blocking("db", commit_leads, rows)
+    except BaseException as exc:
+        for _, response in dispatched:
+            await release_reservation(state, response["metadata"])
+        if not isinstance(exc, Exception):
+            raise
+        for result in results:
+            if result["ok"]:
+                result["ok"] = False
+                result["error"] = f"Lead not saved: {exc}"
+                result["response"]["metadata"].pop("lead_id", None)
+    return results
+
+
+async def stream_llm(state, message: str, metadata: dict) -> AsyncIterator[str]:
+    settings = state.settings
+    snippets = await retrieve_snippets(state, message)
+    async with state.stage_limiter.slot("llm"):
+        async for chunk in astream_message(
+            api_key=settings.WATSONX_API_KEY,
+            base_url=settings.WATSONX_URL,
+            project_id=settings.WATSONX_PROJECT_ID,
+            model_id=settings.WATSONX_MODEL_ID,
+            user_message=message,
+            metadata=prompt_metadata(metadata),
+            version=settings.WATSONX_VERSION,
+            transport=state.async_transport,
+            tokens=state.token_manager,
+            snippets=snippets,
+        ):
+            yield chunk
+
+
+async def stream_chat(
+    state,
+    locale: str,
+    message: str,
+    when_iso: str | None,
+    use_cache: bool = True,
+    deadline: Deadline | None = None,
+    session_id: str | None = None,
+) -> AsyncIterator[str]:
+    response, signals, nlu_error = await prepare_dispatch(
+        state, locale, message, when_iso, deadline, session_id
+    )
+    metadata = response["metadata"]
+    try:
+        yield sse_event(
+            "metadata",
+            {
+                "metadata": metadata,
+                "ui_trigger": response["ui_trigger"],
+                "tech_card": response["tech_card"],
+            },
+        )
+
+        # Tokens cannot be taken back once sent, so the safety prefix goes out first
+        # instead of being added after checking the generated text.
+        prefix = SAFETY_PREFIX if metadata.get("safety_alert") else ""
+        if prefix:
+            yield sse_event("token", {"text": prefix})
+
+        templated = keeps_template(metadata)
+        cache = state.message_cache if use_cache and not templated else None
+        key = await reply_cache_key(state, message, metadata) if cache is not None else None
+        cached = await cache.aget(key) if cache is not None else None
+        # parts keeps the text as generated, placeholder and all, for the reply cache.
+        parts: list[str] = []
+        filler = TechnicianFiller(metadata)
+        if templated:
+            template = response["agent_message"]
+            if prefix and template.startswith(prefix):
+                template = template[len(prefix):]
+            parts.append(template)
+            yield sse_event("token", {"text": template})
+            metadata["watsonx_used"] = False
+            metadata["response_path"] = "template"
+        elif cached is not None:
+            parts.append(cached)
+            yield sse_event("token", {"text": fill_technician(cached, metadata)})
+            metadata["watsonx_used"] = True
+            metadata["llm_cache"] = "hit"
+            metadata["response_path"] = "cache"
+        else:
+            breaker = state.breakers["watsonx"]
+            chunks = stream_llm(state, message, metadata)
+            try:
+                check_watsonx_config(state.settings)
+                # Only the wait for the first token is bounded by the budget; once text is
+                # flowing the client sees progress and the stream runs to completion.
+                try:
+                    first = await guarded_call(breaker, chunks.__anext__, deadline)
+                except StopAsyncIteration:
+                    first = ""
+                if first:
+                    parts.append(first)
+                    if text := filler.feed(first):
+                        yield sse_event("token", {"text": text})
+                async for chunk in chunks:
+                    parts.append(chunk)
+                    if text := filler.feed(chunk):
+                        yield sse_event("token", {"text": text})
+                text = "".join(parts).strip()
+                if not text:
+                    raise RuntimeError("Empty response from watsonx.ai")
+                if cache is not None:
+                    await cache.aset(key, text)
+                metadata["watsonx_used"] = True
+                metadata["llm_cache"] = "miss" if cache is not None else "bypass"
+                metadata["response_path"] = "llm"
+            except Exception as exc:
+                if parts and upstream_failure(exc):
+                    breaker.record_failure()
+                metadata["watsonx_error"] = str(exc)
+                metadata["watsonx_used"] = False
+                metadata["response_path"] = fallback_path(exc)
+                if not parts:
+                    fallback = response["agent_message"]
+                    if prefix and fallback.startswith(prefix):
+                        fallback = fallback[len(prefix):]
+                    parts = [fallback]
+                    yield sse_event("token", {"text": fallback})
+            finally:
+                await chunks.aclose()
+        if rest := filler.flush():
+            yield sse_event("token", {"text": rest})
+
+        response["agent_message"] = prefix + fill_technician("".join(parts).strip(), metadata)
+        attach_signals(metadata, signals, nlu_error)
+        lead = lead_row(message, metadata)
+        await persist_lead(state, lead)
+        metadata["lead_id"] = lead["id"]
+    except BaseException:
+        # The client went away or the lead was not saved: nobody is being sent.
+        await release_reservation(state, metadata)
+        raise
+    yield sse_event("done", response)
+
+
+def sse_event(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
+
+async def reply_cache_key(state, message: str, metadata: dict) -> str:
+    store = state.rag_store
+    if store is None:
+        return message_cache_key(message, metadata)
+    # Replies quote retrieved snippets, so a re-ingest must not keep serving answers
+    # built from the old text. The ingest CLI may have written from another process;
+    # that is checked for at most once per RAG_REFRESH_SECONDS, not on every reply.
+    if store.due():
+        await asyncio.to_thread(store.refresh)
+    return message_cache_key(message, metadata, store.version)
+
+
+def message_cache_key(message: str, metadata: dict, rag_version: int | None = None) -> str:
+    return cache_key(
+        "agent_message", normalize_text(message), prompt_metadata(metadata), rag_version
+    )
+
+
+def prompt_metadata(metadata: dict) -> dict:
+    prompt = {k: v for k, v in metadata.items() if k not in REQUEST_ONLY_METADATA}
+    if metadata.get("tech_assigned"):
+        prompt["technician"] = TECH_PLACEHOLDER
+    return prompt
+
+
+def fill_technician(agent_message: str, metadata: dict) -> str:
+    return agent_message.replace(TECH_PLACEHOLDER, metadata.get("tech_name") or "a technician")
+
+
+class TechnicianFiller:
+    # Fills the name into streamed text. The placeholder can be split across chunks, so
+    # a trailing piece that could still become one is held back until the next chunk.
+    def __init__(self, metadata: dict) -> None:
+        self.metadata = metadata
+        self._pending = ""
+
+    def feed(self, chunk: str) -> str:
+        text = self._pending + chunk
+        start = text.rfind(TECH_PLACEHOLDER[0])
+        tail = text[start:] if start != -1 else ""
+        if tail and len(tail) < len(TECH_PLACEHOLDER) and TECH_PLACEHOLDER.startswith(tail):
+            text, self._pending = text[:start], tail
+        else:
+            self._pending = ""
+        return fill_technician(text, self.metadata)
+
+    def flush(self) -> str:
+        rest, self._pending = self._pending, ""
+        return rest
+
+
+def apply_safety_prefix(agent_message: str, metadata: dict) -> str:
+    if metadata.get("safety_alert") and "switch off" not in agent_message.lower():
+        return SAFETY_PREFIX + agent_message
+    return agent_message
+
+
+def attach_signals(metadata: dict, signals: dict, nlu_error: str | None) -> None:
+    if signals["keywords"] or signals["entities"]:
+        metadata["nlu_keywords"] = signals["keywords"]
+        metadata["nlu_entities"] = signals["entities"]
+    if nlu_error:
+        metadata["nlu_error"] = nlu_error
+
+
+def lead_row(message: str, metadata: dict) -> dict:
+    return {
+        "id": str(uuid.uuid4()),
+        "created_at": datetime.utcnow(),
+        "customer_message": message,
+        "intent": metadata.get("intent"),
+        "priority": metadata.get("priority"),
+        "revenue_tier": metadata.get("revenue_tier"),
+        "territory_code": metadata.get("territory_code"),
+        "zone_id": metadata.get("zone_id"),
+        "service_tier": metadata.get("service_tier"),
+        "tech_assigned": metadata.get("tech_assigned"),
+        "quote_min": metadata.get("quote_min"),
+        "quote_max": metadata.get("quote_max"),
+        # Nobody could be sent; the lead waits for a technician to come free.
+        "status": "waiting" if metadata.get("schedule_status") == "no_technician_free" else "new",
+    }
+
+
+async def persist_lead(state, row: dict) -> None:
+    try:
+        await state.lead_writer.asubmit(row)
+    except queue.Full:
+        # The writer is saturated; fall back to a direct write rather than drop the lead.
+        await state.stage_limiter.run_blocking("db", commit_leads, [row])
+
+
+async def release_reservation(state, metadata: dict) -> None:
+    # Gives back a lease or a booked slot this request took when the request does not go
+    # through. A lease the conversation already held is left alone.
+    if metadata.get("schedule_status") == "booked":
+        try:
+            await asyncio.shield(asyncio.to_thread(cancel_booking, state, metadata))
+        except Exception:
+            logger.exception("Cancelling the booking for %s failed", metadata.get("tech_assigned"))
+        metadata["schedule_status"] = "cancelled"
+    reservations = state.reservations
+    if reservations is None or metadata.get("reservation_status") != "claimed":
+        return
+    try:
+        # Shielded so a request cancelled by a disconnecting client still releases it.
+        await asyncio.shield(
+            asyncio.to_thread(
+                reservations.release,
+                metadata["locale"],
+                metadata["tech_assigned"],
+                metadata["reservation_id"],
+            )
+        )
+    except Exception:
+        logger.exception("Releasing technician %s failed", metadata.get("tech_assigned"))
+    metadata["reservation_status"] = "released"
+
+
+def cancel_booking(state, metadata: dict) -> None:
+    # The snapshot may have been reloaded since the booking; the current one carries it.
+    scheduler = state.locales.snapshot(metadata["locale"]).scheduler
+    start = datetime.fromisoformat(metadata["scheduled_start"])
+    end = datetime.fromisoformat(metadata["scheduled_end"])
+    minutes = round((end - start).total_seconds() / 60)
+    scheduler.cancel(metadata["tech_assigned"], start.timestamp(), minutes)
+
+
+def commit_leads(rows: list[dict]) -> None:
+    db = SessionLocal()
+    try:
+        with timed("db_commit"):
+            insert_leads(db, rows)
+            db.commit()
+    finally:
+        db.close()
@@ -0,0 +1,37 @@
+from __future__ import annotations
+
+import re
+import zlib
+
+import numpy as np
+
+_TOKEN = re.compile(r"[a-z0-9]+")
+STOPWORDS = frozenset(
+    "a an and are as at be by for from has have if in is it its of on or so that the "
+    "then there these this to was were will with".split()
+)
+
+
+class HashingEmbedder:
+    def __init__(self, dim: int = 1024, bigrams: bool = True) -> None:
+        self.dim = dim
+        self.bigrams = bigrams
+
+    def features(self, text: str) -> list[str]:
+        tokens = [t for t in _TOKEN.findall(text.lower()) if t not in STOPWORDS]
+        if self.bigrams:
+            tokens.extend(f"{a} {b}" for a, b in zip(tokens, tokens[1:]))
+        return tokens
+
+    def embed(self, texts: list[str]) -> np.ndarray:
+        vectors = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            for feature in self.features(text):
+                h = zlib.crc32(feature.encode("utf-8"))
+                # The top bit picks the sign so colliding features tend to cancel out.
+                vectors[row, h % self.dim] += 1.0 if h & 0x80000000 else -1.0
+        # Sublinear term frequency, then unit length so a dot product is cosine similarity.
+        np.copysign(np.log1p(np.abs(vectors)), vectors, out=vectors)
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        np.divide(vectors, norms, out=vectors, where=norms > 0)
+        return vectors
@@ -1,2 +1,102 @@
-def ingest_documents(_paths: list[str]) -> dict:
-    return {"ingested": 0}
+from __future__ import annotations
+
+import argparse
+import hashlib
+import json
+from pathlib import Path
+from typing import Iterator
+
+from .embedding import HashingEmbedder
+from .store import VectorStore, default_store
+
+DOCUMENT_SUFFIXES = {".txt", ".md"}
+
+
+def chunk_text(text: str, max_words: int = 120, overlap: int = 30) -> list[str]:
+    chunks = []
+    for paragraph in text.split("\n\n"):
+        words = paragraph.split()
+        if not words:
+            continue
+        step = max(1, max_words - overlap)
+        for start in range(0, len(words), step):
+            chunks.append(" ".join(words[start:start + max_words]))
+            if start + max_words >= len(words):
+                break
+    return chunks
+
+
+def iter_documents(paths: list[str]) -> Iterator[Path]:
+    for raw in paths:
+        path = Path(raw)
+        if path.is_dir():
+            yield from sorted(
+                p for p in path.rglob("*") if p.is_file() and p.suffix.lower() in DOCUMENT_SUFFIXES
+            )
+        elif path.is_file():
+            yield path
+
+
+def ingest_documents(
+    paths: list[str], store: VectorStore | None = None, batch_size: int = 512
+) -> dict:
+    store = store or default_store()
+    embedder = HashingEmbedder(store.dim)
+    ingested = skipped = replaced = chunk_count = 0
+    pending_chunks: list[dict] = []
+    pending_documents: list[str] = []
+    pending_retired: list[str] = []
+
+    def flush() -> None:
+        # The old version of an edited file goes in the same write as its replacement,
+        # so a reader never sees both or neither.
+        if pending_chunks:
+            vectors = embedder.embed([chunk["text"] for chunk in pending_chunks])
+            store.append(vectors, pending_chunks, pending_documents, pending_retired)
+        elif pending_retired:
+            store.retire(pending_retired)
+        pending_chunks.clear()
+        pending_documents.clear()
+        pending_retired.clear()
+
+    for path in iter_documents(paths):
+        text = path.read_text(encoding="utf-8", errors="replace")
+        digest = hashlib.sha256(text.encode("utf-8")).hexdigest()[:32]
+        # Re-running ingestion over the same folder only appends new or edited files.
+        if store.has_document(digest) or digest in pending_documents:
+            skipped += 1
+            continue
+        previous = store.document_for(str(path))
+        if previous is not None:
+            # An edited file replaces its earlier chunks instead of adding to them.
+            pending_retired.append(previous)
+            replaced += 1
+        chunks = chunk_text(text)
+        pending_chunks.extend(
+            {"source": str(path), "document": digest, "position": n, "text": chunk}
+            for n, chunk in enumerate(chunks)
+        )
+        pending_documents.append(digest)
+        ingested += 1
+        chunk_count += len(chunks)
+        if len(pending_chunks) >= batch_size:
+            flush()
+    flush()
+    return {
+        "ingested": ingested,
+        "skipped": skipped,
+        "replaced": replaced,
+        "chunks": chunk_count,
+        "total_chunks": store.count,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Add manuals and SOPs to the RAG index")
+    parser.add_argument("paths", nargs="+", help="Files or folders of .txt/.md documents")
+    args = parser.parse_args()
+    print(json.dumps(ingest_documents(args.paths), indent=2))
+
+
+if __name__ == "__main__":
+    main()
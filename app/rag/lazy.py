@@ -0,0 +1,75 @@
+from __future__ import annotations
+
+import threading
+import time
+from pathlib import Path
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from .store import VectorStore
+
+# Mirrors store.META_FILE; importing it from there would load numpy.
+META_FILE = "meta.json"
+
+
+class LazyVectorStore:
+    # Opens the index, and with it numpy, on the first retrieval after an index exists,
+    # so workers without manuals never load either.
+    def __init__(self, settings, refresh_interval: float = 1.0) -> None:
+        self.settings = settings
+        self.directory = Path(settings.RAG_INDEX_DIR)
+        self.refresh_interval = refresh_interval
+        self._store: VectorStore | None = None
+        self._lock = threading.Lock()
+        self._checked = float("-inf")
+
+    @property
+    def version(self) -> int | None:
+        # Read on every cached reply, so it is whatever the last refresh saw.
+        store = self._store
+        return store.version if store is not None else None
+
+    def due(self) -> bool:
+        return time.monotonic() - self._checked >= self.refresh_interval
+
+    def refresh(self) -> VectorStore | None:
+        # Picks up an index the ingest CLI created or changed since the last look.
+        self._checked = time.monotonic()
+        store = self._open()
+        if store is not None:
+            store.refresh()
+        return store
+
+    def query(self, text: str, k: int, min_score: float = 0.0) -> list[dict]:
+        store = self._open()
+        if store is None:
+            return []
+        from .query import query_documents
+
+        # query_documents refreshes the store first.
+        self._checked = time.monotonic()
+        return query_documents(text, k, store, min_score)
+
+    def stats(self) -> dict:
+        store = self._store
+        if store is None:
+            return {"opened": False, "path": str(self.directory)}
+        return {"opened": True, **store.stats()}
+
+    def _open(self) -> VectorStore | None:
+        if self._store is not None:
+            return self._store
+        if not (self.directory / META_FILE).exists():
+            return None
+        with self._lock:
+            if self._store is None:
+                from .store import open_store
+
+                self._store = open_store(self.settings)
+        return self._store
+
+
+def build_rag_store(settings) -> LazyVectorStore | None:
+    if not settings.RAG_ENABLED:
+        return None
+    return LazyVectorStore(settings, settings.RAG_REFRESH_SECONDS)
@@ -1,2 +1,36 @@
-def query_documents(_query: str) -> list[dict]:
-    return []
+from __future__ import annotations
+
+from .embedding import HashingEmbedder
+from .store import VectorStore, default_store
+
+
+def query_documents(
+    query: str, k: int = 4, store: VectorStore | None = None, min_score: float = 0.0
+) -> list[dict]:
+    return query_many([query], k, store, min_score)[0]
+
+
+def query_many(
+    queries: list[str], k: int = 4, store: VectorStore | None = None, min_score: float = 0.0
+) -> list[list[dict]]:
+    store = store or default_store()
+    store.refresh()
+    if not queries or store.count == 0:
+        return [[] for _ in queries]
+    vectors = HashingEmbedder(store.dim).embed(queries)
+    results = []
+    for hits in store.search(vectors, k):
+        hits = [(chunk_id, score) for chunk_id, score in hits if score > min_score]
+        records = store.chunks([chunk_id for chunk_id, _ in hits])
+        results.append(
+            [
+                {
+                    "id": record["id"],
+                    "source": record["source"],
+                    "text": record["text"],
+                    "score": round(score, 4),
+                }
+                for record, (_, score) in zip(records, hits)
+            ]
+        )
+    return results
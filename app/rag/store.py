@@ -0,0 +1,285 @@
+from __future__ import annotations
+
+import json
+import os
+import threading
+from contextlib import contextmanager
+from functools import lru_cache
+from pathlib import Path
+from typing import Iterator
+
+import numpy as np
+
+from ..settings import settings
+
+try:
+    import fcntl
+except ImportError:
+    # Windows: appends still take turns within a process, not across processes.
+    fcntl = None
+
+VECTORS_FILE = "vectors.f32"
+CHUNKS_FILE = "chunks.jsonl"
+META_FILE = "meta.json"
+LOCK_FILE = "index.lock"
+
+
+class VectorStore:
+    def __init__(self, directory: str | Path, dim: int, block_rows: int = 65536) -> None:
+        self.directory = Path(directory)
+        self.dim = dim
+        self.block_rows = block_rows
+        self._lock = threading.Lock()
+        self._count = 0
+        self._offsets: list[int] = []
+        self._chunks_end = 0
+        # digest -> {"source", "rows": [first, stop]}; None for indexes written before
+        # row ranges were recorded.
+        self._documents: dict[str, dict | None] = {}
+        self._sources: dict[str, str] = {}
+        self._retired: list[list[int]] = []
+        self._version = 0
+        self._meta_mtime = 0
+        self._matrix: np.memmap | None = None
+        self._live: np.ndarray | None = None
+        self._load()
+
+    @property
+    def count(self) -> int:
+        return self._count
+
+    @property
+    def version(self) -> int:
+        # Bumped by every append or retire, in any process; a cached answer built on
+        # an older version may quote text that is no longer in the index.
+        return self._version
+
+    def has_document(self, digest: str) -> bool:
+        return digest in self._documents
+
+    def document_for(self, source: str) -> str | None:
+        return self._sources.get(source)
+
+    def append(
+        self,
+        vectors: np.ndarray,
+        chunks: list[dict],
+        documents: list[str] = (),
+        retire: list[str] = (),
+    ) -> range:
+        if len(vectors) != len(chunks):
+            raise ValueError("vectors and chunks must have the same length")
+        vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+        if vectors.ndim != 2 or vectors.shape[1] != self.dim:
+            raise ValueError(f"Expected vectors of shape (n, {self.dim})")
+        with self._writing():
+            first = self._count
+            vectors_path = self.directory / VECTORS_FILE
+            chunks_path = self.directory / CHUNKS_FILE
+            # meta.json is written last, so anything past its count is left over from an
+            # interrupted append and is dropped before writing.
+            sizes = ((vectors_path, first * self.dim * 4), (chunks_path, self._chunks_end))
+            for path, size in sizes:
+                if path.exists():
+                    os.truncate(path, size)
+            with vectors_path.open("ab") as f:
+                f.write(vectors.tobytes())
+            offsets = []
+            with chunks_path.open("ab") as f:
+                for n, chunk in enumerate(chunks):
+                    offsets.append(f.tell())
+                    record = {"id": first + n, **chunk}
+                    f.write(json.dumps(record, ensure_ascii=False).encode("utf-8") + b"\n")
+                chunks_end = f.tell()
+            # A document's chunks are appended together, so one row range covers them.
+            spans: dict[str, dict] = {}
+            for n, chunk in enumerate(chunks):
+                span = spans.setdefault(
+                    chunk.get("document"), {"source": chunk.get("source"), "rows": [first + n, 0]}
+                )
+                span["rows"][1] = first + n + 1
+            for digest in documents:
+                self._documents[digest] = spans.get(digest)
+            self._retire(retire)
+            self._index_sources()
+            self._write_meta(first + len(chunks))
+            self._offsets.extend(offsets)
+            self._chunks_end = chunks_end
+            self._count = first + len(chunks)
+            self._matrix = None
+            self._live = None
+        return range(first, self._count)
+
+    def retire(self, digests: list[str]) -> None:
+        with self._writing():
+            self._retire(digests)
+            self._index_sources()
+            self._write_meta(self._count)
+            self._live = None
+
+    def refresh(self) -> None:
+        # Picks up rows appended by another process, e.g. the ingest CLI.
+        try:
+            mtime = (self.directory / META_FILE).stat().st_mtime_ns
+        except FileNotFoundError:
+            return
+        if mtime != self._meta_mtime:
+            with self._lock:
+                self._load()
+
+    def search(self, queries: np.ndarray, k: int) -> list[list[tuple[int, float]]]:
+        queries = np.atleast_2d(np.asarray(queries, dtype=np.float32))
+        matrix, live = self._mapped()
+        if matrix is None or k <= 0:
+            return [[] for _ in range(len(queries))]
+        best_scores = np.empty((len(queries), 0), dtype=np.float32)
+        best_ids = np.empty((len(queries), 0), dtype=np.int64)
+        # Score the memory map block by block so a large corpus never needs a full
+        # (queries x rows) score matrix in memory at once.
+        for start in range(0, matrix.shape[0], self.block_rows):
+            block = matrix[start:start + self.block_rows]
+            scores = queries @ block.T
+            if live is not None:
+                # Rows of replaced documents stay on disk but can never be returned.
+                scores[:, ~live[start:start + block.shape[0]]] = -np.inf
+            ids = np.broadcast_to(np.arange(start, start + block.shape[0]), scores.shape)
+            scores = np.concatenate([best_scores, scores], axis=1)
+            ids = np.concatenate([best_ids, ids], axis=1)
+            if scores.shape[1] > k:
+                top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+                scores = np.take_along_axis(scores, top, axis=1)
+                ids = np.take_along_axis(ids, top, axis=1)
+            best_scores, best_ids = scores, ids
+        order = np.argsort(-best_scores, axis=1)
+        best_scores = np.take_along_axis(best_scores, order, axis=1)
+        best_ids = np.take_along_axis(best_ids, order, axis=1)
+        return [
+            [(int(i), float(s)) for i, s in zip(row_ids, row_scores) if s != -np.inf]
+            for row_ids, row_scores in zip(best_ids, best_scores)
+        ]
+
+    def chunks(self, ids: list[int]) -> list[dict]:
+        offsets = self._offsets
+        records = []
+        with (self.directory / CHUNKS_FILE).open("rb") as f:
+            for chunk_id in ids:
+                f.seek(offsets[chunk_id])
+                records.append(json.loads(f.readline()))
+        return records
+
+    def stats(self) -> dict:
+        return {
+            "chunks": self._count,
+            "documents": len(self._documents),
+            "retired_chunks": sum(stop - first for first, stop in self._retired),
+            "version": self._version,
+            "dim": self.dim,
+            "index_bytes": self._count * self.dim * 4,
+            "path": str(self.directory),
+        }
+
+    @contextmanager
+    def _writing(self) -> Iterator[None]:
+        # The API and the ingest CLI can both write the index. Writers take turns on a
+        # file lock and start from what is on disk, so none truncates rows another
+        # has just appended or writes meta.json from a stale count.
+        with self._lock:
+            self.directory.mkdir(parents=True, exist_ok=True)
+            with (self.directory / LOCK_FILE).open("ab") as lock:
+                if fcntl is not None:
+                    fcntl.flock(lock, fcntl.LOCK_EX)
+                self._load()
+                yield
+
+    def _mapped(self) -> tuple[np.memmap | None, np.ndarray | None]:
+        # The mask is taken with the matrix so both describe the same rows.
+        with self._lock:
+            if self._count == 0:
+                return None, None
+            if self._matrix is None:
+                self._matrix = np.memmap(
+                    self.directory / VECTORS_FILE,
+                    dtype=np.float32,
+                    mode="r",
+                    shape=(self._count, self.dim),
+                )
+            if self._live is None and self._retired:
+                live = np.ones(self._count, dtype=bool)
+                for first, stop in self._retired:
+                    live[first:stop] = False
+                self._live = live
+            return self._matrix, self._live
+
+    def _retire(self, digests: list[str]) -> None:
+        for digest in digests:
+            info = self._documents.pop(digest, None)
+            if info and info.get("rows"):
+                self._retired.append(list(info["rows"]))
+
+    def _index_sources(self) -> None:
+        self._sources = {
+            info["source"]: digest
+            for digest, info in self._documents.items()
+            if info and info.get("source")
+        }
+
+    def _load(self) -> None:
+        meta_path = self.directory / META_FILE
+        if not meta_path.exists():
+            return
+        mtime = meta_path.stat().st_mtime_ns
+        meta = json.loads(meta_path.read_text(encoding="utf-8"))
+        if meta["dim"] != self.dim:
+            raise ValueError(
+                f"Index at {self.directory} has dim {meta['dim']}, expected {self.dim}"
+            )
+        count = meta["count"]
+        # Rows only ever get appended, so a refresh resumes scanning where it left off.
+        if count >= self._count:
+            offsets, position = list(self._offsets), self._chunks_end
+        else:
+            offsets, position = [], 0
+        with (self.directory / CHUNKS_FILE).open("rb") as f:
+            f.seek(position)
+            while len(offsets) < count:
+                position = f.tell()
+                if not f.readline():
+                    raise ValueError(f"Index at {self.directory} is missing chunk records")
+                offsets.append(position)
+            self._chunks_end = f.tell()
+        self._count = count
+        self._offsets = offsets
+        documents = meta.get("documents", {})
+        if isinstance(documents, list):
+            documents = dict.fromkeys(documents)
+        self._documents = documents
+        self._retired = meta.get("retired", [])
+        self._version = meta.get("version", 0)
+        self._index_sources()
+        self._meta_mtime = mtime
+        self._matrix = None
+        self._live = None
+
+    def _write_meta(self, count: int) -> None:
+        path = self.directory / META_FILE
+        tmp = path.with_suffix(".tmp")
+        self._version += 1
+        meta = {
+            "dim": self.dim,
+            "count": count,
+            "version": self._version,
+            "documents": dict(sorted(self._documents.items())),
+            "retired": self._retired,
+        }
+        tmp.write_text(json.dumps(meta), encoding="utf-8")
+        os.replace(tmp, path)
+        self._meta_mtime = path.stat().st_mtime_ns
+
+
+def open_store(settings) -> VectorStore:
+    return VectorStore(settings.RAG_INDEX_DIR, settings.RAG_EMBED_DIM)
+
+
+@lru_cache(maxsize=1)
+def default_store() -> VectorStore:
+    return open_store(settings)
@@ -0,0 +1,393 @@
+from __future__ import annotations
+
+import hashlib
+import logging
+import sqlite3
+import threading
+import time
+import uuid
+from datetime import datetime, timezone
+from typing import Callable, Iterator, Protocol
+
+from .domain.technicians import TechRegistry
+
+logger = logging.getLogger(__name__)
+
+# Stays under SQLite's default limit on bound parameters per statement.
+MAX_PAGE_SIZE = 512
+
+
+class ReservationStore(Protocol):
+    def held(self, keys: list[str], now: float) -> set[str]: ...
+
+    def holding(self, holder: str, now: float) -> tuple[str, float] | None: ...
+
+    def claim(self, key: str, holder: str, expires_at: float, now: float) -> bool: ...
+
+    def release(self, key: str, holder: str | None = None) -> bool: ...
+
+    def active(self, now: float) -> int: ...
+
+
+class MemoryReservationStore:
+    # Stand-in for a single worker; every process has its own copy.
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._leases: dict[str, tuple[str, float]] = {}
+
+    def held(self, keys: list[str], now: float) -> set[str]:
+        with self._lock:
+            leases = self._leases
+            return {key for key in keys if key in leases and leases[key][1] > now}
+
+    def holding(self, holder: str, now: float) -> tuple[str, float] | None:
+        with self._lock:
+            for key, (owner, expires_at) in self._leases.items():
+                if owner == holder and expires_at > now:
+                    return key, expires_at
+            return None
+
+    def claim(self, key: str, holder: str, expires_at: float, now: float) -> bool:
+        with self._lock:
+            lease = self._leases.get(key)
+            if lease is not None and lease[1] > now:
+                return False
+            self._leases[key] = (holder, expires_at)
+            return True
+
+    def release(self, key: str, holder: str | None = None) -> bool:
+        with self._lock:
+            lease = self._leases.get(key)
+            if lease is None or (holder is not None and lease[0] != holder):
+                return False
+            del self._leases[key]
+            return True
+
+    def active(self, now: float) -> int:
+        with self._lock:
+            for key in [k for k, lease in self._leases.items() if lease[1] <= now]:
+                del self._leases[key]
+            return len(self._leases)
+
+
+class SQLiteReservationStore:
+    def __init__(self, path: str, timeout: float = 1.0) -> None:
+        self.path = path
+        self.timeout = timeout
+        self._local = threading.local()
+        self._claims = 0
+        with self._connect() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS tech_reservations ("
+                "tech_key TEXT PRIMARY KEY, holder TEXT NOT NULL, expires_at REAL NOT NULL)"
+            )
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS ix_tech_reservations_holder "
+                "ON tech_reservations (holder)"
+            )
+
+    def held(self, keys: list[str], now: float) -> set[str]:
+        placeholders = ", ".join("?" * len(keys))
+        rows = self._connect().execute(
+            f"SELECT tech_key FROM tech_reservations "
+            f"WHERE tech_key IN ({placeholders}) AND expires_at > ?",
+            (*keys, now),
+        ).fetchall()
+        return {row[0] for row in rows}
+
+    def holding(self, holder: str, now: float) -> tuple[str, float] | None:
+        row = self._connect().execute(
+            "SELECT tech_key, expires_at FROM tech_reservations "
+            "WHERE holder = ? AND expires_at > ?",
+            (holder, now),
+        ).fetchone()
+        return (row[0], row[1]) if row else None
+
+    def claim(self, key: str, holder: str, expires_at: float, now: float) -> bool:
+        conn = self._connect()
+        with conn:
+            # Compare-and-set: the row is only taken over once its lease has run out, so
+            # of two workers racing for the same technician exactly one sees a change.
+            cursor = conn.execute(
+                "INSERT INTO tech_reservations (tech_key, holder, expires_at) VALUES (?, ?, ?) "
+                "ON CONFLICT (tech_key) DO UPDATE SET "
+                "holder = excluded.holder, expires_at = excluded.expires_at "
+                "WHERE tech_reservations.expires_at <= ?",
+                (key, holder, expires_at, now),
+            )
+        self._claims += 1
+        if self._claims % 500 == 0:
+            self.prune(now)
+        return cursor.rowcount == 1
+
+    def release(self, key: str, holder: str | None = None) -> bool:
+        conn = self._connect()
+        with conn:
+            cursor = conn.execute(
+                "DELETE FROM tech_reservations WHERE tech_key = ? AND (? IS NULL OR holder = ?)",
+                (key, holder, holder),
+            )
+        return cursor.rowcount == 1
+
+    def active(self, now: float) -> int:
+        row = self._connect().execute(
+            "SELECT COUNT(*) FROM tech_reservations WHERE expires_at > ?", (now,)
+        ).fetchone()
+        return row[0]
+
+    def prune(self, now: float) -> None:
+        conn = self._connect()
+        with conn:
+            conn.execute("DELETE FROM tech_reservations WHERE expires_at <= ?", (now,))
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=self.timeout)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+
+class TechReservations:
+    def __init__(
+        self,
+        store: ReservationStore,
+        grace_seconds: float = 1800.0,
+        page_size: int = 32,
+        held_ttl_seconds: float = 1.0,
+    ) -> None:
+        self.store = store
+        self.grace_seconds = grace_seconds
+        self.page_size = max(1, page_size)
+        self.held_ttl_seconds = held_ttl_seconds
+        self._lock = threading.Lock()
+        # Technicians this worker recently saw leased, per locale, and until when to take
+        # that on trust. A fully leased roster would otherwise be read from the store on
+        # every dispatch; a lease released elsewhere is at worst passed over for
+        # held_ttl_seconds, and the compare-and-set claim keeps a stale entry from ever
+        # double-booking.
+        self._held: dict[str, dict[str, float]] = {}
+        # Per search, how many technicians at the front of the ranking the memo holds
+        # as leased, so the next walk starts past them; and searches that found
+        # everyone leased. Both are trusted for as long as the memo entries they rest on.
+        self._leading: dict[tuple[str, str, str], tuple[TechRegistry, int, int, float]] = {}
+        self._exhausted: dict[tuple[str, str, str], float] = {}
+        self._counters = {
+            "claims": 0,
+            "reused": 0,
+            "skipped": 0,
+            "conflicts": 0,
+            "exhausted": 0,
+            "releases": 0,
+            "errors": 0,
+        }
+
+    def reserve(
+        self,
+        locale: str,
+        registry: TechRegistry,
+        skill: str,
+        service_tier: str,
+        job_seconds: float,
+        conversation: str | None = None,
+        bookable: Callable[[str], bool] | None = None,
+    ) -> tuple[dict, dict | None]:
+        # bookable narrows the search to technicians the caller can send, e.g. those
+        # whose calendar is clear for the job; it is asked at most once per technician.
+        now = time.time()
+        # A conversation keeps the technician it was given, so follow-up messages and the
+        # separate /skill calls of one dispatch do not each take someone else.
+        holder = _holder(locale, conversation) if conversation else uuid.uuid4().hex
+        skipped = conflicts = unbookable = 0
+        seen = False
+        try:
+            if conversation:
+                lease = self.store.holding(holder, now)
+                tech = registry.get(_tech_id(locale, lease[0])) if lease else None
+                if tech is not None:
+                    self._count(reused=1)
+                    return tech, _reservation(holder, lease[1], "reused")
+            if self._exhausted.get((locale, skill, service_tier), 0.0) > now:
+                self._count(exhausted=1)
+                return {}, None
+            expires_at = now + job_seconds + self.grace_seconds
+            for page, remembered in self._pages(locale, registry, skill, service_tier, now):
+                seen = True
+                # One read per page filters out the leases already taken, so the writes
+                # below are only spent on technicians that were free a moment ago.
+                held = self._read_held(locale, page, now)
+                skipped += remembered + len(held)
+                for key, tech in page.items():
+                    if key in held:
+                        continue
+                    if bookable is not None and not bookable(tech["tech_id"]):
+                        unbookable += 1
+                        continue
+                    if self.store.claim(key, holder, expires_at, now):
+                        self._remember(locale, key, now)
+                        self._count(claims=1, skipped=skipped, conflicts=conflicts)
+                        return tech, _reservation(holder, expires_at, "claimed")
+                    # Another worker took it between the read and the claim; move on to
+                    # the next best match.
+                    self._remember(locale, key, now)
+                    conflicts += 1
+        except Exception:
+            # An unreachable store must not take dispatch down with it; fall back to
+            # the unreserved roster order and let the counter show it.
+            logger.exception("Technician reservation failed")
+            self._count(errors=1, skipped=skipped, conflicts=conflicts)
+            return registry.find(skill, service_tier, bookable), None
+        if not seen:
+            # Nobody is available at all, leased or not; keep the roster's answer.
+            return registry.find(skill, service_tier, bookable), None
+        if not unbookable:
+            # What bookable says can change with the job, so only a search that found
+            # everyone leased is answered from memory.
+            self._exhausted[(locale, skill, service_tier)] = now + self.held_ttl_seconds
+        self._count(exhausted=1, skipped=skipped, conflicts=conflicts)
+        return {}, None
+
+    def suggest(
+        self,
+        locale: str,
+        registry: TechRegistry,
+        skill: str,
+        service_tier: str,
+        bookable: Callable[[str], bool] | None = None,
+    ) -> dict:
+        # For replies that name a technician without sending one: the best match that
+        # is not already out on a job, and no lease taken.
+        try:
+            now = time.time()
+            if self._exhausted.get((locale, skill, service_tier), 0.0) > now:
+                return registry.find(skill, service_tier, bookable)
+            for page, _ in self._pages(locale, registry, skill, service_tier, now):
+                held = self._read_held(locale, page, now)
+                for key, tech in page.items():
+                    if key not in held and (bookable is None or bookable(tech["tech_id"])):
+                        return tech
+        except Exception:
+            logger.exception("Technician reservation lookup failed")
+        return registry.find(skill, service_tier, bookable)
+
+    def release(self, locale: str, tech_id: str, reservation_id: str | None = None) -> bool:
+        released = self.store.release(_key(locale, tech_id), reservation_id)
+        if released:
+            self._held.get(locale, {}).pop(tech_id, None)
+            for searches in (self._leading, self._exhausted):
+                for search in list(searches):
+                    if search[0] == locale:
+                        searches.pop(search, None)
+            self._count(releases=1)
+        return released
+
+    def stats(self) -> dict:
+        with self._lock:
+            stats = dict(self._counters)
+        stats["backend"] = type(self.store).__name__
+        stats["grace_seconds"] = self.grace_seconds
+        try:
+            stats["active"] = self.store.active(time.time())
+        except Exception:
+            stats["active"] = None
+        return stats
+
+    def _pages(
+        self, locale: str, registry: TechRegistry, skill: str, service_tier: str, now: float
+    ) -> Iterator[tuple[dict[str, dict], int]]:
+        # The page size bounds the first read, not the search: a mostly leased roster is
+        # still walked to the end before anyone is told nobody is free. Pages double as
+        # the walk goes on, so busy hours cost a handful of reads rather than one per
+        # page of technicians already out on jobs. Technicians remembered as leased are
+        # stepped over without a read and only counted; a run of them at the front of
+        # the ranking is not walked again until the ranking or the memo changes.
+        search = (locale, skill, service_tier)
+        version = registry.version
+        skip, trusted = 0, float("inf")
+        cursor = self._leading.get(search)
+        if cursor and cursor[0] is registry and cursor[1] == version and cursor[3] > now:
+            skip, trusted = cursor[2], cursor[3]
+        ranked = registry.ranked(skill, service_tier, skip)
+        leading = True
+        size = self.page_size
+        held = self._held.setdefault(locale, {})
+        # Technicians the cursor steps over are counted as remembered too.
+        remembered = skip
+        while True:
+            page: dict[str, dict] = {}
+            for tech in ranked:
+                tech_id = tech["tech_id"]
+                until = held.get(tech_id, 0.0)
+                if until > now:
+                    remembered += 1
+                    if leading:
+                        skip += 1
+                        trusted = min(trusted, until)
+                    continue
+                leading = False
+                page[_key(locale, tech_id)] = tech
+                if len(page) >= size:
+                    break
+            if skip:
+                self._leading[search] = (registry, version, skip, trusted)
+            if not page and not remembered:
+                return
+            yield page, remembered
+            remembered = 0
+            if len(page) < size:
+                return
+            size = min(size * 2, MAX_PAGE_SIZE)
+
+    def _read_held(self, locale: str, page: dict[str, dict], now: float) -> set[str]:
+        if not page:
+            return set()
+        held = self.store.held(list(page), now)
+        for key in held:
+            self._remember(locale, key, now)
+        return held
+
+    def _remember(self, locale: str, key: str, now: float) -> None:
+        self._held.setdefault(locale, {})[_tech_id(locale, key)] = now + self.held_ttl_seconds
+
+    def _count(self, **deltas: int) -> None:
+        with self._lock:
+            for name, delta in deltas.items():
+                self._counters[name] += delta
+
+
+def _reservation(holder: str, expires_at: float, status: str) -> dict:
+    return {
+        "reservation_id": holder,
+        "reservation_expires_at": datetime.fromtimestamp(expires_at, timezone.utc).isoformat(),
+        "reservation_status": status,
+    }
+
+
+def _holder(locale: str, conversation: str) -> str:
+    return hashlib.sha256(f"{locale}\0{conversation}".encode()).hexdigest()[:32]
+
+
+def _key(locale: str, tech_id: str) -> str:
+    # Rosters are per city, so technician ids are only unique within a locale.
+    return f"{locale}:{tech_id}"
+
+
+def _tech_id(locale: str, key: str) -> str:
+    return key[len(locale) + 1:]
+
+
+def build_reservations(settings) -> TechReservations | None:
+    if not settings.TECH_RESERVATIONS_ENABLED:
+        return None
+    if settings.TECH_RESERVATION_BACKEND == "sqlite":
+        store = SQLiteReservationStore(settings.TECH_RESERVATION_PATH)
+    else:
+        store = MemoryReservationStore()
+    return TechReservations(
+        store,
+        settings.TECH_RESERVATION_GRACE_MINUTES * 60,
+        settings.TECH_RESERVATION_PAGE_SIZE,
+        settings.TECH_RESERVATION_HELD_TTL_SECONDS,
+    )
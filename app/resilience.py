@@ -0,0 +1,199 @@
+from __future__ import annotations
+
+import asyncio
+import threading
+import time
+from typing import Awaitable, Callable, TypeVar
+
+import httpx
+
+from .metrics import count_upstream_error
+
+T = TypeVar("T")
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class DeadlineExceeded(Exception):
+    pass
+
+
+class CircuitOpenError(RuntimeError):
+    pass
+
+
+class Deadline:
+    def __init__(self, budget_seconds: float) -> None:
+        self.budget_seconds = budget_seconds
+        self.started_at = time.monotonic()
+        self.expires_at = self.started_at + budget_seconds
+
+    def remaining(self, reserve_seconds: float = 0.0) -> float:
+        return max(0.0, self.expires_at - time.monotonic() - reserve_seconds)
+
+    @property
+    def expired(self) -> bool:
+        return time.monotonic() >= self.expires_at
+
+    def elapsed_ms(self) -> int:
+        return int((time.monotonic() - self.started_at) * 1000)
+
+    async def run(self, awaitable: Awaitable[T], reserve_seconds: float = 0.0) -> T:
+        timeout = self.remaining(reserve_seconds)
+        if timeout <= 0:
+            if asyncio.iscoroutine(awaitable):
+                awaitable.close()
+            raise DeadlineExceeded("Request latency budget exhausted")
+        try:
+            return await asyncio.wait_for(awaitable, timeout)
+        except asyncio.TimeoutError as exc:
+            raise DeadlineExceeded("Request latency budget exhausted") from exc
+
+
+class CircuitBreaker:
+    def __init__(
+        self, name: str, failure_threshold: int = 5, reset_timeout: float = 30.0
+    ) -> None:
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._lock = threading.Lock()
+        self._state = CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._trial_in_flight = False
+        self._trial_started = 0.0
+        self._counters = {"successes": 0, "failures": 0, "rejected": 0, "opened": 0}
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            return self._current_state()
+
+    def allow(self) -> bool:
+        with self._lock:
+            state = self._current_state()
+            if state == CLOSED:
+                return True
+            now = time.monotonic()
+            # A trial that never reported back (e.g. cancelled) must not wedge the breaker.
+            if state == HALF_OPEN and (
+                not self._trial_in_flight or now - self._trial_started >= self.reset_timeout
+            ):
+                self._trial_in_flight = True
+                self._trial_started = now
+                return True
+            self._counters["rejected"] += 1
+            return False
+
+    def check(self) -> None:
+        if not self.allow():
+            raise CircuitOpenError(f"{self.name} circuit is open")
+
+    def record_success(self) -> None:
+        with self._lock:
+            self._counters["successes"] += 1
+            self._failures = 0
+            self._state = CLOSED
+            self._trial_in_flight = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self._counters["failures"] += 1
+            self._failures += 1
+            state = self._current_state()
+            if state == HALF_OPEN or (state == CLOSED and self._failures >= self.failure_threshold):
+                self._state = OPEN
+                self._opened_at = time.monotonic()
+                self._counters["opened"] += 1
+            self._trial_in_flight = False
+
+    def release(self) -> None:
+        # The call ended without saying anything about the upstream; only give back a
+        # half-open trial slot so the next caller can probe.
+        with self._lock:
+            self._trial_in_flight = False
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "state": self._current_state(),
+                "consecutive_failures": self._failures,
+                **self._counters,
+            }
+
+    def _current_state(self) -> str:
+        if self._state == OPEN and time.monotonic() - self._opened_at >= self.reset_timeout:
+            return HALF_OPEN
+        return self._state
+
+
+async def guarded_call(
+    breaker: CircuitBreaker,
+    call: Callable[[], Awaitable[T]],
+    deadline: Deadline | None = None,
+    reserve_seconds: float = 0.0,
+) -> T:
+    # An exhausted budget is the caller's problem, not the upstream's, so it is
+    # checked before the breaker hands out a (possibly half-open trial) slot.
+    if deadline is not None and deadline.remaining(reserve_seconds) <= 0:
+        raise DeadlineExceeded("Request latency budget exhausted")
+    if not breaker.allow():
+        count_upstream_error(breaker.name, "circuit_open")
+        raise CircuitOpenError(f"{breaker.name} circuit is open")
+    try:
+        if deadline is None:
+            result = await call()
+        else:
+            result = await deadline.run(call(), reserve_seconds)
+    except DeadlineExceeded:
+        # The caller's own budget ran out (a small X-Timeout-Ms, say); that is no
+        # evidence against the upstream and must not open the breaker for everyone.
+        breaker.release()
+        count_upstream_error(breaker.name, "deadline")
+        raise
+    except Exception as exc:
+        if upstream_failure(exc):
+            breaker.record_failure()
+        else:
+            # The upstream answered; a rejected or unusable request says nothing
+            # about its health, so it only gives back a half-open trial slot.
+            breaker.release()
+        timeout = isinstance(exc, httpx.TimeoutException)
+        count_upstream_error(breaker.name, "timeout" if timeout else "error")
+        raise
+    breaker.record_success()
+    return result
+
+
+def upstream_failure(exc: BaseException) -> bool:
+    # Only timeouts, connection errors and 5xx responses count against an upstream.
+    # OSError covers the requests exceptions the NLU SDK lets through.
+    if isinstance(exc, (httpx.TransportError, OSError)):
+        return True
+    if isinstance(exc, httpx.HTTPStatusError):
+        return exc.response.status_code >= 500
+    # ibm_watson's ApiException carries the HTTP status as code.
+    code = getattr(exc, "code", None)
+    return isinstance(code, int) and code >= 500
+
+
+def fallback_path(exc: BaseException) -> str:
+    if isinstance(exc, DeadlineExceeded):
+        return "template_deadline"
+    if isinstance(exc, CircuitOpenError):
+        return "template_breaker"
+    return "template_error"
+
+
+def build_breakers(settings) -> dict[str, CircuitBreaker]:
+    return {
+        name: CircuitBreaker(
+            name,
+            failure_threshold=settings.BREAKER_FAILURE_THRESHOLD,
+            reset_timeout=settings.BREAKER_RESET_SECONDS,
+        )
+        for name in ("nlu", "watsonx")
+    }
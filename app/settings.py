@@ -9,14 +9,84 @@ class Settings:
         load_dotenv(dotenv_path=env_path)
         self.APP_ENV = os.getenv("APP_ENV", "dev")
         self.PORT = int(os.getenv("PORT", "8000"))
+        self.DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///app.db")
+        self.LOCALE_CATALOG_PATH = os.getenv("LOCALE_CATALOG_PATH", "")
+        self.DEFAULT_LOCALE = os.getenv("DEFAULT_LOCALE", "")
+        self.LOCALE_CACHE_SIZE = int(os.getenv("LOCALE_CACHE_SIZE", "8"))
+        self.LOCALE_MEMORY_BUDGET_MB = float(os.getenv("LOCALE_MEMORY_BUDGET_MB", "256"))
+        self.LOCALE_PATH = os.getenv("LOCALE_PATH", "")
+        self.TERRITORY_PATH = os.getenv("TERRITORY_PATH", "")
+        self.ROSTER_PATH = os.getenv("ROSTER_PATH", "")
+        self.DATA_RELOAD_INTERVAL_SECONDS = float(os.getenv("DATA_RELOAD_INTERVAL_SECONDS", "2"))
         self.NLU_API_KEY = os.getenv("NLU_API_KEY", "")
         self.NLU_URL = os.getenv("NLU_URL", "")
         self.NLU_VERSION = os.getenv("NLU_VERSION", "2022-08-10")
+        self.NLU_IAM_URL = os.getenv("NLU_IAM_URL", "")
+        self.NLU_CACHE_SIZE = int(os.getenv("NLU_CACHE_SIZE", "10000"))
+        self.NLU_CACHE_TTL_SECONDS = float(os.getenv("NLU_CACHE_TTL_SECONDS", "900"))
         self.WATSONX_API_KEY = os.getenv("WATSONX_API_KEY", "")
         self.WATSONX_URL = os.getenv("WATSONX_URL", "")
         self.WATSONX_PROJECT_ID = os.getenv("WATSONX_PROJECT_ID", "")
         self.WATSONX_MODEL_ID = os.getenv("WATSONX_MODEL_ID", "")
         self.WATSONX_VERSION = os.getenv("WATSONX_VERSION", "2024-05-31")
+        self.WATSONX_IAM_URL = os.getenv(
+            "WATSONX_IAM_URL", "https://iam.cloud.ibm.com/identity/token"
+        )
+        self.HTTP_POOL_SIZE = int(os.getenv("HTTP_POOL_SIZE", "20"))
+        self.HTTP_ASYNC_POOL_SIZE = int(os.getenv("HTTP_ASYNC_POOL_SIZE", "256"))
+        self.HTTP_KEEPALIVE_SECONDS = float(os.getenv("HTTP_KEEPALIVE_SECONDS", "30"))
+        self.HTTP_CONNECT_TIMEOUT = float(os.getenv("HTTP_CONNECT_TIMEOUT", "5"))
+        self.HTTP_READ_TIMEOUT = float(os.getenv("HTTP_READ_TIMEOUT", "60"))
+        self.HTTP_MAX_RETRIES = int(os.getenv("HTTP_MAX_RETRIES", "2"))
+        self.HTTP_BACKOFF_BASE = float(os.getenv("HTTP_BACKOFF_BASE", "0.25"))
+        self.NLU_CONCURRENCY = int(os.getenv("NLU_CONCURRENCY", "32"))
+        self.LLM_CONCURRENCY = int(os.getenv("LLM_CONCURRENCY", "256"))
+        self.DB_CONCURRENCY = int(os.getenv("DB_CONCURRENCY", "4"))
+        self.LLM_CACHE_ENABLED = os.getenv("LLM_CACHE_ENABLED", "true").lower() == "true"
+        self.LLM_CACHE_SIZE = int(os.getenv("LLM_CACHE_SIZE", "5000"))
+        self.LLM_CACHE_TTL_SECONDS = float(os.getenv("LLM_CACHE_TTL_SECONDS", "600"))
+        self.LLM_CACHE_BACKEND = os.getenv("LLM_CACHE_BACKEND", "memory")
+        self.LLM_CACHE_PATH = os.getenv("LLM_CACHE_PATH", "llm_cache.db")
+        self.LEAD_BATCH_SIZE = int(os.getenv("LEAD_BATCH_SIZE", "200"))
+        self.LEAD_FLUSH_INTERVAL_MS = float(os.getenv("LEAD_FLUSH_INTERVAL_MS", "50"))
+        self.LEAD_QUEUE_SIZE = int(os.getenv("LEAD_QUEUE_SIZE", "10000"))
+        self.LEAD_ENQUEUE_TIMEOUT = float(os.getenv("LEAD_ENQUEUE_TIMEOUT", "2"))
+        self.LEAD_SPILL_PATH = os.getenv("LEAD_SPILL_PATH", "lead_spill.ndjson")
+        self.RAG_ENABLED = os.getenv("RAG_ENABLED", "true").lower() == "true"
+        self.RAG_INDEX_DIR = os.getenv("RAG_INDEX_DIR", "rag_index")
+        self.RAG_EMBED_DIM = int(os.getenv("RAG_EMBED_DIM", "1024"))
+        self.RAG_TOP_K = int(os.getenv("RAG_TOP_K", "3"))
+        self.RAG_MIN_SCORE = float(os.getenv("RAG_MIN_SCORE", "0.15"))
+        self.RAG_SNIPPET_CHARS = int(os.getenv("RAG_SNIPPET_CHARS", "400"))
+        self.RAG_REFRESH_SECONDS = float(os.getenv("RAG_REFRESH_SECONDS", "1"))
+        self.BATCH_MAX_ITEMS = int(os.getenv("BATCH_MAX_ITEMS", "500"))
+        self.BATCH_CONCURRENCY = int(os.getenv("BATCH_CONCURRENCY", "32"))
+        self.CHAT_BUDGET_MS = float(os.getenv("CHAT_BUDGET_MS", "10000"))
+        self.CHAT_LLM_RESERVE_MS = float(os.getenv("CHAT_LLM_RESERVE_MS", "4000"))
+        self.CHAT_COALESCE_ENABLED = os.getenv("CHAT_COALESCE_ENABLED", "true").lower() == "true"
+        self.CHAT_COALESCE_WINDOW_SECONDS = float(os.getenv("CHAT_COALESCE_WINDOW_SECONDS", "5"))
+        self.CHAT_IDEMPOTENCY_TTL_SECONDS = float(
+            os.getenv("CHAT_IDEMPOTENCY_TTL_SECONDS", "86400")
+        )
+        self.CHAT_COALESCE_MAX_ENTRIES = int(os.getenv("CHAT_COALESCE_MAX_ENTRIES", "10000"))
+        self.CHAT_IDEMPOTENCY_PATH = os.getenv("CHAT_IDEMPOTENCY_PATH", self.LLM_CACHE_PATH)
+        self.CHAT_IDEMPOTENCY_MAX_ENTRIES = int(
+            os.getenv("CHAT_IDEMPOTENCY_MAX_ENTRIES", "100000")
+        )
+        self.TECH_RESERVATIONS_ENABLED = (
+            os.getenv("TECH_RESERVATIONS_ENABLED", "true").lower() == "true"
+        )
+        self.TECH_RESERVATION_BACKEND = os.getenv("TECH_RESERVATION_BACKEND", "sqlite")
+        self.TECH_RESERVATION_PATH = os.getenv("TECH_RESERVATION_PATH", "reservations.db")
+        self.TECH_RESERVATION_GRACE_MINUTES = float(
+            os.getenv("TECH_RESERVATION_GRACE_MINUTES", "30")
+        )
+        self.TECH_RESERVATION_PAGE_SIZE = int(os.getenv("TECH_RESERVATION_PAGE_SIZE", "32"))
+        self.TECH_RESERVATION_HELD_TTL_SECONDS = float(
+            os.getenv("TECH_RESERVATION_HELD_TTL_SECONDS", "1")
+        )
+        self.BREAKER_FAILURE_THRESHOLD = int(os.getenv("BREAKER_FAILURE_THRESHOLD", "5"))
+        self.BREAKER_RESET_SECONDS = float(os.getenv("BREAKER_RESET_SECONDS", "30"))
 
 
 settings = Settings()
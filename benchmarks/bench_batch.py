@@ -0,0 +1,127 @@
+import argparse
+import asyncio
+import json
+import os
+import random
+import tempfile
+import time
+from pathlib import Path
+
+import httpx
+
+from .stubs import GENERATED_TEXT
+
+MESSAGES = [
+    "My AC is leaking water in Kitale, please send someone",
+    "Cold room temperature rising at our warehouse near Entebbe airport",
+    "Need a maintenance visit for the office split units in Kampala",
+    "There is smoke coming from the compressor, urgent",
+    "Quote for servicing three units at the hotel",
+    "Freezer not cooling, stock at risk in Nakawa",
+]
+
+
+def configure(workdir: Path) -> None:
+    # Must run before anything imports app.settings. Every file the app writes goes in
+    # the temporary directory, so runs neither touch nor depend on the repo's state.
+    os.environ.update(
+        DATABASE_URL=f"sqlite:///{workdir / 'bench.db'}",
+        WATSONX_API_KEY="bench",
+        WATSONX_URL="http://watsonx.bench",
+        WATSONX_PROJECT_ID="bench",
+        WATSONX_MODEL_ID="bench",
+        WATSONX_IAM_URL="http://iam.bench/identity/token",
+        LLM_CACHE_ENABLED="false",
+        LLM_CACHE_PATH=str(workdir / "llm_cache.db"),
+        CHAT_IDEMPOTENCY_PATH=str(workdir / "llm_cache.db"),
+        TECH_RESERVATION_PATH=str(workdir / "reservations.db"),
+        LEAD_SPILL_PATH=str(workdir / "lead_spill.ndjson"),
+        RAG_ENABLED="false",
+        RAG_INDEX_DIR=str(workdir / "rag_index"),
+        DATA_RELOAD_INTERVAL_SECONDS="0",
+        HTTP_MAX_RETRIES="0",
+    )
+
+
+async def install_upstream(app, latency: float) -> None:
+    def iam(request: httpx.Request) -> httpx.Response:
+        return httpx.Response(200, json={"access_token": "bench", "expires_in": 3600})
+
+    async def generation(request: httpx.Request) -> httpx.Response:
+        await asyncio.sleep(latency)
+        return httpx.Response(200, json={"results": [{"generated_text": GENERATED_TEXT}]})
+
+    # The pooled clients built at startup are replaced, so close them rather than leak
+    # their connections.
+    app.state.transport.client.close()
+    await app.state.async_transport.client.aclose()
+    app.state.transport.client = httpx.Client(transport=httpx.MockTransport(iam))
+    app.state.async_transport.client = httpx.AsyncClient(
+        transport=httpx.MockTransport(generation)
+    )
+
+
+async def per_message(client: httpx.AsyncClient, messages: list[str], concurrency: int) -> None:
+    limit = asyncio.Semaphore(concurrency)
+
+    async def send(message: str) -> None:
+        async with limit:
+            resp = await client.post("/chat", json={"message": message})
+            resp.raise_for_status()
+
+    await asyncio.gather(*(send(message) for message in messages))
+
+
+async def batched(client: httpx.AsyncClient, messages: list[str], batch_size: int) -> None:
+    for start in range(0, len(messages), batch_size):
+        chunk = messages[start:start + batch_size]
+        resp = await client.post(
+            "/chat/batch", json={"messages": [{"message": message} for message in chunk]}
+        )
+        resp.raise_for_status()
+
+
+async def run(args) -> dict:
+    from app.main import app
+
+    rng = random.Random(3)
+    messages = [f"{rng.choice(MESSAGES)} #{n}" for n in range(args.messages)]
+    results = {}
+    async with app.router.lifespan_context(app):
+        await install_upstream(app, args.llm_latency_ms / 1000)
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=300) as client:
+            for name, call in (
+                ("per_message_sequential", lambda: per_message(client, messages, 1)),
+                (
+                    f"per_message_concurrency_{args.client_concurrency}",
+                    lambda: per_message(client, messages, args.client_concurrency),
+                ),
+                (f"batch_{args.batch_size}", lambda: batched(client, messages, args.batch_size)),
+            ):
+                start = time.perf_counter()
+                await call()
+                elapsed = time.perf_counter() - start
+                results[name] = {
+                    "seconds": round(elapsed, 3),
+                    "messages_per_second": round(len(messages) / elapsed, 1),
+                }
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="/chat vs /chat/batch throughput benchmark")
+    parser.add_argument("--messages", type=int, default=500)
+    parser.add_argument("--batch-size", type=int, default=250)
+    parser.add_argument("--client-concurrency", type=int, default=8)
+    parser.add_argument("--llm-latency-ms", type=float, default=50)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        configure(Path(tmp))
+        results = asyncio.run(run(args))
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+import argparse
+import json
+import random
+import statistics
+import tempfile
+import time
+
+from app.rag.embedding import HashingEmbedder
+from app.rag.store import VectorStore
+
+VOCABULARY = (
+    "compressor evaporator condenser refrigerant isolator breaker thermostat fan coil "
+    "filter drain leak smoke sparks gas freezer chiller cold room warehouse seal door "
+    "temperature pressure valve capacitor fuse wiring voltage service inspection clean "
+    "technician safety switch unit outdoor indoor split ducted cassette remote sensor"
+).split()
+
+
+def synthetic_chunks(count: int, rng: random.Random, words: int = 80) -> list[str]:
+    return [" ".join(rng.choices(VOCABULARY, k=words)) for _ in range(count)]
+
+
+def percentile(samples: list[float], pct: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct))]
+
+
+def bench_size(size: int, args, rng: random.Random) -> dict:
+    embedder = HashingEmbedder(args.dim)
+    with tempfile.TemporaryDirectory() as tmp:
+        store = VectorStore(tmp, args.dim)
+        start = time.perf_counter()
+        for offset in range(0, size, args.append_batch):
+            texts = synthetic_chunks(min(args.append_batch, size - offset), rng)
+            store.append(embedder.embed(texts), [{"source": "synthetic", "text": t} for t in texts])
+        ingest_s = time.perf_counter() - start
+
+        # Reopen so queries go through a cold memory map, as after a restart.
+        store = VectorStore(tmp, args.dim)
+        queries = [" ".join(rng.choices(VOCABULARY, k=8)) for _ in range(args.queries)]
+        single = []
+        for query in queries:
+            start = time.perf_counter()
+            store.search(embedder.embed([query]), args.k)
+            single.append((time.perf_counter() - start) * 1000)
+
+        start = time.perf_counter()
+        for offset in range(0, len(queries), args.query_batch):
+            store.search(embedder.embed(queries[offset:offset + args.query_batch]), args.k)
+        batched_ms = (time.perf_counter() - start) * 1000 / len(queries)
+
+    return {
+        "chunks": size,
+        "index_mb": round(size * args.dim * 4 / 2**20, 1),
+        "ingest_chunks_per_s": round(size / ingest_s),
+        "query_p50_ms": round(statistics.median(single), 3),
+        "query_p95_ms": round(percentile(single, 0.95), 3),
+        f"batched_{args.query_batch}_ms_per_query": round(batched_ms, 3),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="RAG index query latency vs corpus size")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--dim", type=int, default=1024)
+    parser.add_argument("--k", type=int, default=3)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--query-batch", type=int, default=32)
+    parser.add_argument("--append-batch", type=int, default=2000)
+    args = parser.parse_args()
+
+    rng = random.Random(17)
+    results = [bench_size(size, args, rng) for size in args.sizes]
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,171 @@
+import argparse
+import json
+import multiprocessing
+import random
+import statistics
+import tempfile
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from app.domain.technicians import TechRegistry
+from app.reservations import MemoryReservationStore, SQLiteReservationStore, TechReservations
+
+from .synthetic import SKILLS, TIERS, synthetic_roster
+
+LOCALE = "BENCH"
+
+
+def lookups(requests: int, seed: int) -> list[tuple[str, str]]:
+    rng = random.Random(seed)
+    return [(rng.choice(SKILLS), rng.choice(TIERS)) for _ in range(requests)]
+
+
+def drive(
+    reservations: TechReservations, registry: TechRegistry, work: list, hold: int, lease: float
+) -> dict:
+    # Every worker ranks the roster the same way, so they all race for the same
+    # technicians; each keeps `hold` leases open and releases the oldest as it goes.
+    latencies = []
+    intervals = []
+    held: deque = deque()
+
+    def release_oldest() -> None:
+        tech_id, reservation_id, acquired = held.popleft()
+        # Stamped before the release commits, so the next holder's acquire is always later.
+        intervals.append((tech_id, acquired, time.monotonic()))
+        reservations.release(LOCALE, tech_id, reservation_id)
+
+    start = time.perf_counter()
+    for skill, tier in work:
+        began = time.perf_counter()
+        tech, reservation = reservations.reserve(LOCALE, registry, skill, tier, lease)
+        latencies.append((time.perf_counter() - began) * 1000)
+        if reservation:
+            held.append((tech["tech_id"], reservation["reservation_id"], time.monotonic()))
+        if len(held) > hold:
+            release_oldest()
+    elapsed = time.perf_counter() - start
+    while held:
+        release_oldest()
+    stats = reservations.stats()
+    return {
+        "elapsed": elapsed,
+        "latencies": latencies,
+        "intervals": intervals,
+        "counters": {k: stats[k] for k in ("claims", "skipped", "conflicts", "exhausted")},
+    }
+
+
+def sqlite_worker(path: str, roster: dict, work: list, hold: int, lease: float, queue) -> None:
+    registry = TechRegistry(roster)
+    reservations = TechReservations(SQLiteReservationStore(path, timeout=5.0), grace_seconds=0)
+    queue.put(drive(reservations, registry, work, hold, lease))
+
+
+def double_bookings(intervals: list[tuple[str, float, float]]) -> int:
+    by_tech: dict[str, list[tuple[float, float]]] = {}
+    for tech_id, acquired, released in intervals:
+        by_tech.setdefault(tech_id, []).append((acquired, released))
+    overlaps = 0
+    for spans in by_tech.values():
+        spans.sort()
+        overlaps += sum(1 for prev, cur in zip(spans, spans[1:]) if cur[0] < prev[1])
+    return overlaps
+
+
+def summarize(runs: list[dict]) -> tuple[dict, dict]:
+    latencies = sorted(ms for run in runs for ms in run["latencies"])
+    intervals = [span for run in runs for span in run["intervals"]]
+    elapsed = max(run["elapsed"] for run in runs)
+    counters = {
+        name: sum(run["counters"][name] for run in runs) for name in runs[0]["counters"]
+    }
+    metrics = {
+        "reserves_per_second": round(len(latencies) / elapsed, 1),
+        "p50_ms": round(statistics.median(latencies), 3),
+        "p95_ms": round(latencies[int(len(latencies) * 0.95) - 1], 3),
+        "double_bookings": double_bookings(intervals),
+    }
+    return metrics, counters
+
+
+def run_sqlite(
+    workdir: Path, roster: dict, workers: int, requests: int, hold: int, lease: float
+) -> list[dict]:
+    path = str(workdir / f"reservations-{workers}.db")
+    SQLiteReservationStore(path)
+    queue = multiprocessing.Queue()
+    procs = [
+        multiprocessing.Process(
+            target=sqlite_worker,
+            args=(path, roster, lookups(requests, seed), hold, lease, queue),
+        )
+        for seed in range(workers)
+    ]
+    for proc in procs:
+        proc.start()
+    runs = [queue.get() for _ in procs]
+    for proc in procs:
+        proc.join()
+    return runs
+
+
+def run_memory(roster: dict, workers: int, requests: int, hold: int, lease: float) -> list[dict]:
+    # One process: the in-memory stand-in only arbitrates between threads.
+    registry = TechRegistry(roster)
+    reservations = TechReservations(MemoryReservationStore(), grace_seconds=0)
+    with ThreadPoolExecutor(workers) as pool:
+        futures = [
+            pool.submit(drive, reservations, registry, lookups(requests, seed), hold, lease)
+            for seed in range(workers)
+        ]
+        runs = [future.result() for future in futures]
+    # The threads share one set of counters; read them once everyone has finished.
+    stats = reservations.stats()
+    for index, run in enumerate(runs):
+        run["counters"] = {k: stats[k] if index == 0 else 0 for k in run["counters"]}
+    return runs
+
+
+def run_reservations(
+    technicians: int = 200,
+    workers: int = 4,
+    requests: int = 2000,
+    hold: int = 5,
+    lease: float = 60.0,
+) -> dict:
+    roster = synthetic_roster(technicians, bookings=0)
+    results = {}
+    counters = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        scenarios = {
+            "sqlite_single": lambda: run_sqlite(Path(tmp), roster, 1, requests, hold, lease),
+            "sqlite_contended": lambda: run_sqlite(
+                Path(tmp), roster, workers, requests, hold, lease
+            ),
+            "memory_threads": lambda: run_memory(roster, workers, requests, hold, lease),
+        }
+        for name, run in scenarios.items():
+            results[name], counters[name] = summarize(run())
+    results["counters"] = counters
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Technician reservation throughput under contention"
+    )
+    parser.add_argument("--technicians", type=int, default=200)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--requests", type=int, default=2000, help="reservations per worker")
+    parser.add_argument("--hold", type=int, default=5, help="open leases per worker")
+    parser.add_argument("--lease", type=float, default=60.0)
+    args = parser.parse_args()
+    results = run_reservations(args.technicians, args.workers, args.requests, args.hold, args.lease)
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
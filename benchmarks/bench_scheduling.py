@@ -0,0 +1,62 @@
+import argparse
+import random
+import time
+from datetime import datetime, timedelta
+
+from app.domain.scheduling import Scheduler
+
+from .synthetic import SKILLS, TIERS, synthetic_roster
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Scheduling engine benchmark")
+    parser.add_argument("--technicians", type=int, default=2000)
+    parser.add_argument("--bookings", type=int, default=500)
+    parser.add_argument("--queries", type=int, default=2000)
+    args = parser.parse_args()
+
+    techs = synthetic_roster(args.technicians, args.bookings)
+    locale = {"utc_offset": "+03:00"}
+
+    start = time.perf_counter()
+    scheduler = Scheduler(techs, locale)
+    build_ms = (time.perf_counter() - start) * 1000
+
+    rng = random.Random(11)
+    tz = scheduler.tz
+    origin = datetime(2026, 2, 2, 8, 0, tzinfo=tz)
+    probes = [
+        (
+            rng.choice(SKILLS),
+            rng.choice(TIERS),
+            origin + timedelta(days=rng.randrange(90), minutes=30 * rng.randrange(20)),
+        )
+        for _ in range(args.queries)
+    ]
+    tech_ids = [t["tech_id"] for t in techs["technicians"]]
+
+    start = time.perf_counter()
+    for _, _, when in probes:
+        scheduler.is_free(rng.choice(tech_ids), when, 120)
+    is_free_us = (time.perf_counter() - start) / len(probes) * 1e6
+
+    start = time.perf_counter()
+    for skill, tier, when in probes:
+        scheduler.first_free(skill, tier, when, 120)
+    first_free_us = (time.perf_counter() - start) / len(probes) * 1e6
+
+    sample = probes[: max(1, len(probes) // 20)]
+    start = time.perf_counter()
+    for skill, tier, when in sample:
+        scheduler.next_slots(skill, tier, when, 120, k=5)
+    next_slots_us = (time.perf_counter() - start) / len(sample) * 1e6
+
+    print(f"technicians={args.technicians} bookings_per_tech={args.bookings}")
+    print(f"build: {build_ms:.1f} ms")
+    print(f"is_free: {is_free_us:.1f} us/query")
+    print(f"first_free: {first_free_us:.1f} us/query")
+    print(f"next_slots(k=5): {next_slots_us:.1f} us/query")
+
+
+if __name__ == "__main__":
+    main()
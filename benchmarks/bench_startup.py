@@ -0,0 +1,91 @@
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+HEAVY_MODULES = ("ibm_watson", "ibm_cloud_sdk_core", "numpy")
+
+# Runs in a fresh interpreter so nothing is already in sys.modules.
+CHILD = """
+import asyncio, json, sys, time
+start = time.perf_counter()
+from app.main import app
+imported = time.perf_counter()
+
+async def lifespan():
+    async with app.router.lifespan_context(app):
+        return time.perf_counter()
+
+started = asyncio.run(lifespan())
+print(json.dumps({
+    "import_ms": (imported - start) * 1000,
+    "startup_ms": (started - imported) * 1000,
+    "modules": sorted(m for m in %r if m in sys.modules),
+}))
+"""
+
+
+def scenario_env(workdir: Path, nlu: bool, rag: bool) -> dict[str, str]:
+    env = dict(
+        os.environ,
+        DATABASE_URL=f"sqlite:///{workdir / 'startup.db'}",
+        DATA_RELOAD_INTERVAL_SECONDS="0",
+        RAG_ENABLED="true" if rag else "false",
+        RAG_INDEX_DIR=str(workdir / "rag_index"),
+        TECH_RESERVATION_PATH=str(workdir / "reservations.db"),
+        NLU_API_KEY="bench" if nlu else "",
+        NLU_URL="http://nlu.bench" if nlu else "",
+    )
+    env["PYTHONPATH"] = os.pathsep.join(filter(None, [str(ROOT), env.get("PYTHONPATH")]))
+    return env
+
+
+def cold_start(env: dict[str, str]) -> dict:
+    proc = subprocess.run(
+        [sys.executable, "-c", CHILD % (HEAVY_MODULES,)],
+        cwd=ROOT,
+        env=env,
+        capture_output=True,
+        text=True,
+    )
+    if proc.returncode != 0:
+        raise RuntimeError(f"app startup failed:\n{proc.stderr}")
+    return json.loads(proc.stdout.strip().splitlines()[-1])
+
+
+def run_startup(runs: int = 5) -> dict:
+    scenarios = {
+        "bare": {"nlu": False, "rag": False},
+        "nlu": {"nlu": True, "rag": False},
+        "full": {"nlu": True, "rag": True},
+    }
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        for name, flags in scenarios.items():
+            env = scenario_env(Path(tmp), **flags)
+            samples = [cold_start(env) for _ in range(runs)]
+            results[name] = {
+                "import_ms": round(statistics.median(s["import_ms"] for s in samples), 1),
+                "startup_ms": round(statistics.median(s["startup_ms"] for s in samples), 1),
+                # The list is for reading; the count is what run.py compares, so a heavy
+                # import creeping into the bare start fails against its baseline of 0.
+                "heavy_modules": samples[0]["modules"],
+                "heavy_module_count": max(len(s["modules"]) for s in samples),
+            }
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Cold import and startup time of app.main")
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+    print(json.dumps(run_startup(args.runs), indent=2))
+
+
+if __name__ == "__main__":
+    main()
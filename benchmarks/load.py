@@ -0,0 +1,149 @@
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import tempfile
+import time
+from pathlib import Path
+
+import httpx
+
+from .stubs import StubLatency, StubUpstream
+from .synthetic import (
+    ALL_DAY,
+    synthetic_messages,
+    synthetic_roster,
+    synthetic_territory,
+    write_dataset,
+)
+
+LOCALE = {
+    "currency": "UGX",
+    "utc_offset": "+03:00",
+    "traffic": {"default_padding_minutes": 25},
+}
+
+
+def configure_environment(stub_url: str, dataset: dict[str, Path], workdir: Path) -> None:
+    # Must run before anything imports app.settings.
+    os.environ.update(
+        APP_ENV="bench",
+        DATABASE_URL=f"sqlite:///{workdir / 'bench.db'}",
+        LOCALE_PATH=str(dataset["locale"]),
+        TERRITORY_PATH=str(dataset["territory"]),
+        ROSTER_PATH=str(dataset["roster"]),
+        DATA_RELOAD_INTERVAL_SECONDS="0",
+        WATSONX_API_KEY="bench",
+        WATSONX_URL=stub_url,
+        WATSONX_PROJECT_ID="bench",
+        WATSONX_MODEL_ID="bench",
+        WATSONX_IAM_URL=f"{stub_url}/identity/token",
+        NLU_API_KEY="bench",
+        NLU_URL=stub_url,
+        NLU_IAM_URL=f"{stub_url}/identity/token",
+        RAG_ENABLED="false",
+        LLM_CACHE_PATH=str(workdir / "llm_cache.db"),
+        TECH_RESERVATION_PATH=str(workdir / "reservations.db"),
+        LEAD_SPILL_PATH=str(workdir / "lead_spill.ndjson"),
+    )
+
+
+async def drive(
+    client: httpx.AsyncClient, path: str, payloads: list[dict], concurrency: int
+) -> dict:
+    latencies: list[float] = []
+    errors = 0
+    queue = list(reversed(payloads))
+
+    async def worker() -> None:
+        nonlocal errors
+        while queue:
+            payload = queue.pop()
+            start = time.perf_counter()
+            resp = await client.post(path, json=payload)
+            latencies.append((time.perf_counter() - start) * 1000)
+            errors += resp.status_code != 200
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+    latencies.sort()
+    return {
+        "requests_per_second": round(len(payloads) / elapsed, 1),
+        "p50_ms": round(statistics.median(latencies), 2),
+        "p95_ms": round(latencies[int(len(latencies) * 0.95) - 1], 2),
+        "errors": errors,
+    }
+
+
+async def run_scenarios(requests: int, concurrency: int, messages: list[str]) -> dict:
+    from app.main import app
+
+    # Requests without a session_id are never coalesced, which keeps the scenarios that
+    # measure the full path and the reply cache honest; chat_duplicates measures it.
+    chat = [{"message": m, "use_cache": False} for m in messages[:requests]]
+    duplicates = [
+        {"message": m, "use_cache": False, "session_id": "bench-duplicates"}
+        for m in messages[: requests // 4]
+        for _ in range(4)
+    ]
+    # Skill calls are ~10x cheaper than chat; repeat them so each run lasts long enough to time.
+    skill = [{"message": m} for m in messages[:requests]] * 5
+    # A small pool of repeated messages so the reply cache serves most of the run.
+    cached = [{"message": messages[i % 50]} for i in range(requests)]
+    results = {}
+    async with app.router.lifespan_context(app):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=60) as client:
+            # Warm the IAM token and connection pools outside the measured runs.
+            await client.post("/chat", json={"message": "warm up", "use_cache": False})
+            results["chat"] = await drive(client, "/chat", chat, concurrency)
+            results["chat_cached"] = await drive(client, "/chat", cached, concurrency)
+            results["chat_duplicates"] = await drive(client, "/chat", duplicates, concurrency)
+            results["skill_triage"] = await drive(client, "/skill/triage", skill, concurrency)
+            results["skill_dispatch"] = await drive(client, "/skill/dispatch", skill, concurrency)
+    return results
+
+
+def run_load(
+    requests: int = 400,
+    concurrency: int = 32,
+    latency: StubLatency | None = None,
+    zones: int = 10,
+    areas_per_zone: int = 100,
+    technicians: int = 1000,
+) -> dict:
+    latency = latency or StubLatency(iam_ms=10, generation_ms=100, token_ms=5, nlu_ms=30)
+    territory = synthetic_territory(zones, areas_per_zone)
+    messages = synthetic_messages(territory, requests)
+    with tempfile.TemporaryDirectory() as tmp, StubUpstream(latency) as stub:
+        workdir = Path(tmp)
+        roster = synthetic_roster(technicians, bookings=10, working_hours=ALL_DAY)
+        dataset = write_dataset(workdir / "data", territory, roster, LOCALE)
+        configure_environment(stub.url, dataset, workdir)
+        results = asyncio.run(run_scenarios(requests, concurrency, messages))
+        results["upstream_calls"] = dict(stub.calls)
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="End-to-end load test against stub upstreams")
+    parser.add_argument("--requests", type=int, default=400)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--generation-ms", type=float, default=100)
+    parser.add_argument("--nlu-ms", type=float, default=30)
+    parser.add_argument("--iam-ms", type=float, default=10)
+    parser.add_argument("--failure-rate", type=float, default=0.0)
+    args = parser.parse_args()
+    latency = StubLatency(
+        iam_ms=args.iam_ms,
+        generation_ms=args.generation_ms,
+        nlu_ms=args.nlu_ms,
+        failure_rate=args.failure_rate,
+    )
+    print(json.dumps(run_load(args.requests, args.concurrency, latency), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,136 @@
+import argparse
+import json
+import subprocess
+import sys
+from pathlib import Path
+
+BASELINES = Path(__file__).with_name("baselines.json")
+
+
+def flatten(results: dict, prefix: str = "") -> dict[str, float]:
+    flat = {}
+    for key, value in results.items():
+        name = f"{prefix}{key}"
+        if isinstance(value, dict):
+            flat.update(flatten(value, f"{name}."))
+        elif isinstance(value, (int, float)):
+            flat[name] = value
+    return flat
+
+
+def higher_is_better(metric: str) -> bool:
+    return metric.endswith("_per_second")
+
+
+def run_load_round() -> dict:
+    # app.main reads its settings once per process, so every round gets a fresh interpreter.
+    proc = subprocess.run(
+        [sys.executable, "-m", "benchmarks.load"],
+        cwd=Path(__file__).resolve().parent.parent,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    results = json.loads(proc.stdout)
+    # Call counts describe the run; they are not performance metrics.
+    results.pop("upstream_calls", None)
+    return results
+
+
+def best_of(runs: list[dict[str, float]]) -> dict[str, float]:
+    # Shared machines are noisy; the best of a few runs is far more stable than any one.
+    best = {}
+    for metric in runs[0]:
+        values = [run[metric] for run in runs if metric in run]
+        # Counts are checks rather than timings; a bad run is not noise to be discarded.
+        worst = metric.endswith("_count")
+        best[metric] = max(values) if higher_is_better(metric) or worst else min(values)
+    return best
+
+
+def compare(
+    current: dict[str, float], baseline: dict[str, float], tolerance: float, tail_tolerance: float
+) -> list[str]:
+    regressions = []
+    for metric, expected in sorted(baseline.items()):
+        actual = current.get(metric)
+        if actual is None:
+            regressions.append(f"{metric}: missing from this run (baseline {expected})")
+            continue
+        allowed = tail_tolerance if metric.endswith("p95_ms") else tolerance
+        if higher_is_better(metric):
+            regressed = actual < expected * (1 - allowed)
+        else:
+            regressed = actual > expected * (1 + allowed)
+        if regressed:
+            regressions.append(f"{metric}: {actual} vs baseline {expected}")
+    return regressions
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Run the benchmark suite and compare with baselines")
+    parser.add_argument(
+        "--suite", choices=["all", "micro", "load", "startup", "reservations"], default="all"
+    )
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--tolerance", type=float, default=0.25)
+    parser.add_argument("--tail-tolerance", type=float, default=1.0)
+    parser.add_argument("--baselines", type=Path, default=BASELINES)
+    parser.add_argument("--update-baselines", action="store_true")
+    args = parser.parse_args()
+
+    runs = []
+    for _ in range(args.repeat):
+        results = {}
+        if args.suite in ("all", "micro"):
+            from .micro import run_micro
+
+            results["micro"] = run_micro()
+        if args.suite in ("all", "load"):
+            results["load"] = run_load_round()
+        if args.suite in ("all", "startup"):
+            from .bench_startup import run_startup
+
+            results["startup"] = run_startup(runs=3)
+        if args.suite in ("all", "reservations"):
+            from .bench_reservations import run_reservations
+
+            reservations = run_reservations()
+            # Claim and conflict counts describe the run; they are not performance metrics.
+            reservations.pop("counters")
+            results["reservations"] = reservations
+        runs.append(flatten(results))
+    current = best_of(runs)
+    print(json.dumps(current, indent=2))
+
+    stored = json.loads(args.baselines.read_text()) if args.baselines.exists() else {}
+    if args.update_baselines:
+        stored.update(current)
+        args.baselines.write_text(json.dumps(dict(sorted(stored.items())), indent=2) + "\n")
+        print(f"Updated {len(current)} baselines in {args.baselines}")
+        return
+
+    suites = (
+        ("micro.", "load.", "startup.", "reservations.")
+        if args.suite == "all"
+        else (f"{args.suite}.",)
+    )
+    baseline = {k: v for k, v in stored.items() if k.startswith(suites)}
+    if not baseline:
+        print(f"No baselines for this suite in {args.baselines}; run with --update-baselines")
+        return
+    regressions = compare(current, baseline, args.tolerance, args.tail_tolerance)
+    if regressions:
+        print(
+            f"\nREGRESSION: {len(regressions)} metric(s) outside tolerance "
+            f"({args.tolerance:.0%}, p95 {args.tail_tolerance:.0%}):",
+            file=sys.stderr,
+        )
+        for line in regressions:
+            print(f"  {line}", file=sys.stderr)
+        sys.exit(1)
+    print(f"\nAll {len(baseline)} metrics within {args.tolerance:.0%} of baseline")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+import asyncio
+import base64
+import hashlib
+import hmac
+import json
+import random
+import re
+import threading
+import time
+
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+GENERATED_TEXT = "[technician] is on the way, ETA 40 minutes. Please share a location pin."
+_WORD = re.compile(r"[a-z]{5,}")
+
+
+def stub_jwt(claims: dict, key: bytes = b"stub-upstream-signing-key-0123456") -> str:
+    # A plain HS256 token; the SDK only decodes the claims, so PyJWT is not needed here.
+    def segment(data: bytes) -> str:
+        return base64.urlsafe_b64encode(data).rstrip(b"=").decode()
+
+    header = segment(json.dumps({"alg": "HS256", "typ": "JWT"}).encode())
+    payload = segment(json.dumps(claims).encode())
+    signature = hmac.new(key, f"{header}.{payload}".encode(), hashlib.sha256).digest()
+    return f"{header}.{payload}.{segment(signature)}"
+
+
+class StubLatency:
+    def __init__(
+        self,
+        iam_ms: float = 20.0,
+        generation_ms: float = 300.0,
+        token_ms: float = 20.0,
+        nlu_ms: float = 80.0,
+        failure_rate: float = 0.0,
+    ) -> None:
+        self.iam_ms = iam_ms
+        self.generation_ms = generation_ms
+        self.token_ms = token_ms
+        self.nlu_ms = nlu_ms
+        self.failure_rate = failure_rate
+
+
+def build_stub_app(latency: StubLatency, calls: dict[str, int]) -> FastAPI:
+    app = FastAPI()
+    rng = random.Random(5)
+
+    async def pause(name: str, ms: float) -> bool:
+        calls[name] = calls.get(name, 0) + 1
+        await asyncio.sleep(ms / 1000)
+        return rng.random() < latency.failure_rate
+
+    @app.post("/identity/token")
+    async def iam_token():
+        await pause("iam", latency.iam_ms)
+        now = int(time.time())
+        # The IBM SDK reads the expiry out of the JWT itself, so the token must be one.
+        token = stub_jwt({"iat": now, "exp": now + 3600})
+        return {"access_token": token, "expires_in": 3600, "expiration": now + 3600}
+
+    @app.post("/ml/v1/text/generation")
+    async def generation():
+        if await pause("generation", latency.generation_ms):
+            return JSONResponse({"errors": [{"message": "stub failure"}]}, status_code=503)
+        return {"results": [{"generated_text": GENERATED_TEXT}]}
+
+    @app.post("/ml/v1/text/generation_stream")
+    async def generation_stream():
+        failed = await pause("generation_stream", latency.generation_ms / 4)
+        if failed:
+            return JSONResponse({"errors": [{"message": "stub failure"}]}, status_code=503)
+
+        async def events():
+            for word in GENERATED_TEXT.split(" "):
+                await asyncio.sleep(latency.token_ms / 1000)
+                data = json.dumps({"results": [{"generated_text": word + " "}]})
+                yield f"id: 1\nevent: message\ndata: {data}\n\n"
+
+        return StreamingResponse(events(), media_type="text/event-stream")
+
+    @app.post("/v1/analyze")
+    async def analyze(request: Request):
+        body = await request.json()
+        if await pause("nlu", latency.nlu_ms):
+            return JSONResponse({"error": "stub failure", "code": 503}, status_code=503)
+        words = list(dict.fromkeys(_WORD.findall(body.get("text", "").lower())))
+        return {
+            "language": "en",
+            "keywords": [{"text": w, "relevance": 0.9} for w in words[:8]],
+            "entities": [],
+        }
+
+    return app
+
+
+class StubUpstream:
+    def __init__(self, latency: StubLatency | None = None, port: int = 0) -> None:
+        self.latency = latency or StubLatency()
+        self.calls: dict[str, int] = {}
+        config = uvicorn.Config(
+            build_stub_app(self.latency, self.calls),
+            host="127.0.0.1",
+            port=port,
+            log_level="warning",
+            lifespan="off",
+        )
+        self._server = uvicorn.Server(config)
+        self._thread: threading.Thread | None = None
+        self.url = ""
+
+    def start(self) -> "StubUpstream":
+        self._thread = threading.Thread(target=self._server.run, name="stub-upstream", daemon=True)
+        self._thread.start()
+        while not self._server.started:
+            time.sleep(0.01)
+        port = self._server.servers[0].sockets[0].getsockname()[1]
+        self.url = f"http://127.0.0.1:{port}"
+        return self
+
+    def stop(self) -> None:
+        self._server.should_exit = True
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def __enter__(self) -> "StubUpstream":
+        return self.start()
+
+    def __exit__(self, *exc_info) -> None:
+        self.stop()
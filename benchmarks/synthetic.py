@@ -0,0 +1,110 @@
+import json
+import random
+from datetime import datetime, timedelta
+from pathlib import Path
+
+from app.domain.scheduling import parse_utc_offset
+
+SKILLS = ["hvac_ac", "cold_room"]
+TIERS = ["platinum", "gold", "standard"]
+WORKING_HOURS = {"weekday": "08:00-18:00", "weekend": "09:00-14:00"}
+# Immediate dispatch only sends technicians on shift; rosters working round the clock
+# keep a benchmark from depending on the time of day it runs.
+ALL_DAY = {"weekday": "00:00-24:00", "weekend": "00:00-24:00"}
+PROBLEMS = [
+    "my AC is leaking water",
+    "cold room temperature rising, stock at risk",
+    "need a maintenance visit for the split units",
+    "smoke coming from the compressor",
+    "please service the chiller at the warehouse",
+    "freezer not cooling since morning",
+    "hotel rooms AC not working",
+    "quote for cleaning three units",
+]
+
+
+def synthetic_roster(
+    technicians: int, bookings: int, seed: int = 7, working_hours: dict | None = None
+) -> dict:
+    rng = random.Random(seed)
+    tz = parse_utc_offset("+03:00")
+    origin = datetime(2026, 2, 2, 8, 0, tzinfo=tz)
+    roster = []
+    for n in range(technicians):
+        calendar = []
+        for _ in range(bookings):
+            start = origin + timedelta(days=rng.randrange(90), minutes=30 * rng.randrange(20))
+            calendar.append(
+                {
+                    "start": start.isoformat(),
+                    "end": (start + timedelta(minutes=30 * rng.randint(1, 6))).isoformat(),
+                }
+            )
+        roster.append(
+            {
+                "tech_id": f"TECH-{n:05d}",
+                "display_name": f"Technician {n}",
+                "skills": rng.sample(SKILLS, rng.randint(1, 2)),
+                "service_tiers_allowed": rng.sample(TIERS, rng.randint(1, 3)),
+                "current_status": rng.choice(["available", "available", "available", "busy"]),
+                "base_location": {"name": f"Depot {n % 50}"},
+                "calendar": calendar,
+                "working_hours": working_hours or WORKING_HOURS,
+            }
+        )
+    return {"technicians": roster}
+
+
+def synthetic_territory(zones: int, areas_per_zone: int, keywords_per_area: int = 4) -> dict:
+    catalog = []
+    for z in range(zones):
+        zone_id = chr(ord("A") + z % 26) + (str(z // 26) if z >= 26 else "")
+        areas = [
+            {
+                "territory_code": f"SYN-{zone_id}-{a:04d}",
+                "name": f"Area {zone_id}{a}",
+                "keywords": [f"place{z}x{a}k{k}" for k in range(keywords_per_area)],
+            }
+            for a in range(areas_per_zone)
+        ]
+        catalog.append(
+            {
+                "zone_id": zone_id,
+                "service_tier": TIERS[z % len(TIERS)],
+                "multiplier": round(1.0 + 0.1 * (z % 4), 2),
+                "areas": areas,
+            }
+        )
+    first = catalog[0]["areas"][0]
+    return {
+        "default_zone_id": catalog[-1]["zone_id"],
+        "overrides": [
+            {
+                "territory_code": first["territory_code"],
+                "match_any": [["airport"], ["cold room", "warehouse"]],
+            }
+        ],
+        "zones": catalog,
+    }
+
+
+def synthetic_messages(territory: dict, count: int, seed: int = 11) -> list[str]:
+    rng = random.Random(seed)
+    keywords = [k for zone in territory["zones"] for area in zone["areas"] for k in area["keywords"]]
+    messages = []
+    for _ in range(count):
+        place = rng.choice(keywords) if rng.random() < 0.8 else "somewhere unknown"
+        messages.append(f"{rng.choice(PROBLEMS)} near {place}")
+    return messages
+
+
+def write_dataset(directory: Path, territory: dict, roster: dict, locale: dict) -> dict[str, Path]:
+    directory.mkdir(parents=True, exist_ok=True)
+    paths = {
+        "locale": directory / "locale.json",
+        "territory": directory / "territory.json",
+        "roster": directory / "roster.json",
+    }
+    for name, data in (("locale", locale), ("territory", territory), ("roster", roster)):
+        paths[name].write_text(json.dumps(data), encoding="utf-8")
+    return paths